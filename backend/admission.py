@@ -0,0 +1,128 @@
+"""
+Admission Control
+Bounded concurrency and a bounded wait queue in front of /chat, shedding with 503 when full,
+plus a reserved priority lane for emergencies that is never shed
+"""
+
+import asyncio
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, retry_after, reason):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Lane:
+    """Slots plus FIFO waiters; a released slot is handed straight to the next waiter"""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.active = 0
+        self.waiters = deque()
+
+    def try_acquire(self):
+        if self.active < self.slots and not self.waiters:
+            self.active += 1
+            return True
+        return False
+
+    async def wait(self, timeout=None):
+        """Queue for a slot; returns False if the timeout passed first"""
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived just as we gave up: pass it on
+                self.release()
+            else:
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot changes hands; active count unchanged
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=8, max_queue=64, queue_timeout=5.0, retry_after=1, priority_slots=2):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._normal = _Lane(max_concurrent)
+        self._priority = _Lane(priority_slots)
+
+        # Counters
+        self.admitted = 0
+        self.admitted_priority = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    @classmethod
+    def from_environment(cls, max_concurrent, priority_slots):
+        """Limits from ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT and ADMISSION_RETRY_AFTER"""
+        return cls(
+            max_concurrent=int(os.environ.get("ADMISSION_MAX_CONCURRENT", max_concurrent)),
+            max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", 64)),
+            queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 5.0)),
+            retry_after=int(os.environ.get("ADMISSION_RETRY_AFTER", 1)),
+            priority_slots=priority_slots
+        )
+
+    @asynccontextmanager
+    async def admit(self, priority=False):
+        """Hold a slot for the duration of the block; raises Overloaded instead of queuing without bound"""
+        lane = self._priority if priority else self._normal
+        if not lane.try_acquire():
+            if priority:
+                # Emergencies wait only behind other emergencies and are never shed
+                await lane.wait()
+            else:
+                if len(lane.waiters) >= self.max_queue:
+                    self.shed_queue_full += 1
+                    raise Overloaded(self.retry_after, "queue full")
+                if not await lane.wait(self.queue_timeout):
+                    self.shed_timeout += 1
+                    raise Overloaded(self.retry_after, "queue timeout")
+
+        if priority:
+            self.admitted_priority += 1
+        else:
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            lane.release()
+
+    def stats(self):
+        return {
+            "max_concurrent": self._normal.slots,
+            "max_queue": self.max_queue,
+            "priority_slots": self._priority.slots,
+            "active": self._normal.active,
+            "queued": len(self._normal.waiters),
+            "priority_active": self._priority.active,
+            "priority_queued": len(self._priority.waiters),
+            "admitted": self.admitted,
+            "admitted_priority": self.admitted_priority,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout
+        }
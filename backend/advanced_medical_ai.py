@@ -4,72 +4,262 @@ Replaces unreliable small language models
 """
 
 from medical_knowledge import medical_kb
+from response_cache import ResponseCache
+from session_store import SessionStore
+from triage_deadline import DeadlineExceeded, TriageBudget
+from triage_result import TriageResult
+import os
 import random
+import time
+
+# Shorter messages are rejected; longer ones are cut (/chat, /chat/batch, /ws/chat, bulk_triage.py)
+MIN_MESSAGE_LENGTH = 3
+MAX_MESSAGE_LENGTH = 500
+
+class InvalidMessage(ValueError):
+    """A message too short to triage"""
+
+def clean_message(message):
+    """The message as triaged (trimmed, at most 500 characters); raises InvalidMessage if too short"""
+    message = message.strip()
+    if len(message) < MIN_MESSAGE_LENGTH:
+        raise InvalidMessage(f"describe symptoms (min {MIN_MESSAGE_LENGTH} characters)")
+    return message[:MAX_MESSAGE_LENGTH]
 
 class AdvancedMedicalAI:
+    # Static parts of the emergency alert
+    EMERGENCY_ACTIONS_TEXT = (
+        "**IMMEDIATE ACTION REQUIRED:**\n"
+        "• Call emergency services (1990 in Sri Lanka) or go to nearest hospital\n"
+        "• Do not wait for symptoms to improve\n"
+        "• Do not drive yourself if experiencing these symptoms\n\n"
+        "**Emergency Symptoms Detected:**\n"
+    )
+    EMERGENCY_CONTACT_TEXT = (
+        "\n**Suwa Setha Hospital Emergency Department**\n"
+        "📍 Location: SuwaSetha Hospital Colombo\n"
+        "📞 Emergency: 1990 or 0112 691 111\n"
+        "⏰ 24/7 Emergency Services Available\n\n"
+        "⚠️ THIS IS NOT A SUBSTITUTE FOR EMERGENCY MEDICAL CARE."
+    )
+    
     def __init__(self):
         self.knowledge_base = medical_kb
-        self.conversation_history = []
+        self.sessions = SessionStore(
+            max_turns=int(os.environ.get("SESSION_MAX_TURNS", 20)),
+            idle_timeout=float(os.environ.get("SESSION_IDLE_TIMEOUT", 1800)),
+            max_sessions=int(os.environ.get("SESSION_MAX_COUNT", 10000))
+        )
+        self.response_cache = ResponseCache(
+            max_size=int(os.environ.get("RESPONSE_CACHE_SIZE", 2048)),
+            ttl_seconds=float(os.environ.get("RESPONSE_CACHE_TTL", 600))
+        )
+        # Per-request time budget for process_query (TRIAGE_DEADLINE_MS)
+        self.budget = TriageBudget.from_environment()
+        self._batch_triage = None
+    
+    def set_knowledge_base(self, knowledge_base):
+        """Switch to a different knowledge base and drop responses built from the old one"""
+        self.knowledge_base = knowledge_base
+        self.response_cache.clear()
+        
+    def process_query(self, user_input: str, session_id: str = None, trace: dict = None, format: str = "markdown",
+                      started: float = None):
+        """Process medical query with advanced analysis
         
-    def process_query(self, user_input: str) -> str:
-        """Process medical query with advanced analysis"""
+        Returns the markdown reply, or with format="json" the structured result as a dict.
+        If a trace dict is passed it receives per-stage durations in seconds
+        (scan, emergency, identify or the routed analyzer's name, render), the response_type,
+        any emergencies and whether the response cache answered.
+        
+        Identification and rendering are skipped once they would overrun the time budget, counted
+        from started (the request's arrival, time.perf_counter(); default now); the reply is then
+        the knowledge base's degraded response and trace["degraded"] names the stage.
+        """
+        if trace is None:
+            trace = {}
+        deadline = self.budget.start(started)
+        try:
+            result = self.analyze_query(user_input, session_id, trace, deadline)
+            return self.render(result, format, trace, deadline)
+        except DeadlineExceeded as e:
+            # Emergencies never get here: they are decided before the first check
+            result = TriageResult.degraded(self.knowledge_base, user_input.lower().strip())
+            trace["degraded"] = e.stage
+            trace.update(result.outcome())
+            return self.render(result, format)
+    
+    def analyze_query(self, user_input, session_id=None, trace=None, deadline=None):
+        """The TriageResult for a message, without rendering it"""
+        if trace is None:
+            trace = {}
         
         # Clean and prepare input
         user_input = user_input.lower().strip()
         
-        # Check for emergencies first
-        emergencies = self.knowledge_base.check_emergency(user_input)
-        if emergencies:
-            return self._generate_emergency_response(emergencies)
-        
-        # Identify potential conditions
-        possible_conditions = self.knowledge_base.identify_condition(user_input)
-        
-        # Store in conversation history
-        self.conversation_history.append({
-            "user_input": user_input,
-            "matched_conditions": possible_conditions
-        })
-        
-        # Generate appropriate response
-        if possible_conditions:
-            # Multiple possible conditions
-            if len(possible_conditions) > 1:
-                return self._generate_differential_diagnosis(possible_conditions, user_input)
-            # Single likely condition
+        if session_id is None:
+            def compute():
+                trace["cache"] = "miss"
+                return self._analyze(user_input, trace, deadline)
+            
+            # Identical messages share one cached (or in-flight) analysis (a skipped one is not cached)
+            trace["cache"] = "hit"
+            result = self.response_cache.get_or_compute(user_input, compute)
+            trace.update(result.outcome())
+            return result
+        
+        session = self.sessions.get(session_id)
+        with session.lock:
+            result = self._analyze_in_session(session, user_input, trace, deadline)
+            
+            # Store in this session's conversation history
+            self.sessions.record(
+                session, user_input, None if result.response_type == "emergency" else result.conditions
+            )
+        
+        trace.update(result.outcome())
+        return result
+    
+    def render(self, result, format="markdown", trace=None, deadline=None):
+        """The reply for a result: markdown (rendered once per result) or the JSON dict"""
+        if format == "json":
+            return result.to_dict()
+        if result.markdown is None:
+            # Emergency alerts are always rendered, whatever the time left
+            if deadline is not None and result.response_type != "emergency":
+                deadline.check("render")
+            start = time.perf_counter()
+            result.markdown = self._render(result)
+            elapsed = time.perf_counter() - start
+            self.budget.observe("render", elapsed)
+            if trace is not None:
+                trace["render"] = elapsed
+        return result.markdown
+    
+    def process_batch(self, user_inputs, format="markdown"):
+        """Process many independent queries, scoring them together in one matrix product"""
+        # NumPy is only needed here, so it stays out of server start-up
+        from batch_triage import BatchTriage
+        
+        kb = self.knowledge_base
+        if self._batch_triage is None or self._batch_triage.knowledge_base is not kb:
+            self._batch_triage = BatchTriage(kb)
+        
+        user_inputs = [user_input.lower().strip() for user_input in user_inputs]
+        hit_sets = [kb.scan(user_input) for user_input in user_inputs]
+        results = [None] * len(user_inputs)
+        
+        # Emergencies and routed complaints (headache) keep their per-message handling
+        scored = []
+        for i, (user_input, hits) in enumerate(zip(user_inputs, hit_sets)):
+            emergencies = kb.check_emergency(user_input, hits)
+            if emergencies:
+                results[i] = TriageResult.emergency(kb, user_input, emergencies, hits)
+                continue
+            analyzer = kb.rules.route(hits)
+            if analyzer is not None:
+                possible_conditions = analyzer.evaluate(hits, kb.medical_database)
+                results[i] = TriageResult.from_matches(kb, user_input, possible_conditions, hits)
             else:
-                return self.knowledge_base.generate_advice(
-                    possible_conditions[0]["condition_id"],
-                    user_input
-                )
-        else:
-            # No specific condition matched
-            return self.knowledge_base._generate_general_advice(user_input)
+                scored.append(i)
+        
+        matches = self._batch_triage.identify_conditions([hit_sets[i] for i in scored])
+        for i, possible_conditions in zip(scored, matches):
+            results[i] = TriageResult.from_matches(kb, user_inputs[i], possible_conditions, hit_sets[i])
+        
+        return [self.render(result, format) for result in results]
     
-    def _generate_emergency_response(self, emergencies):
-        """Generate emergency response"""
-        response = "🚨 **EMERGENCY MEDICAL ALERT** 🚨\n\n"
-        response += f"Based on your description of: {', '.join(emergencies)}\n\n"
+    def _analyze_in_session(self, session, user_input, trace, deadline=None):
+        """Analyze a follow-up message against the session's accumulated symptoms; returns a TriageResult"""
+        # One knowledge base per request, even if a reload swaps it meanwhile
+        kb = self.knowledge_base
+        clock = time.perf_counter
+        
+        start = clock()
+        hits = kb.scan(user_input)
+        checkpoint = clock()
+        trace["scan"] = checkpoint - start
         
-        response += "**IMMEDIATE ACTION REQUIRED:**\n"
-        response += "• Call emergency services (1990 in Sri Lanka) or go to nearest hospital\n"
-        response += "• Do not wait for symptoms to improve\n"
-        response += "• Do not drive yourself if experiencing these symptoms\n\n"
+        # Emergencies are judged on the new message alone
+        emergencies = kb.check_emergency(user_input, hits)
+        start = clock()
+        trace["emergency"] = start - checkpoint
+        if emergencies:
+            return TriageResult.emergency(kb, user_input, emergencies, hits)
         
-        response += "**Emergency Symptoms Detected:**\n"
-        for emergency in emergencies:
-            response += f"• {emergency.title()}\n"
+        # Checked before the session's symptom state is touched, so a skipped turn leaves no trace in it
+        if deadline is not None:
+            deadline.check("identify")
+        possible_conditions = kb.identify_condition_incremental(user_input, hits, session.symptoms)
+        analyzer = kb.rules.route(hits)
+        elapsed = clock() - start
+        self.budget.observe("identify", elapsed)
+        trace["identify" if analyzer is None else analyzer.name] = elapsed
+        return TriageResult.from_matches(kb, user_input, possible_conditions, session.symptoms.phrases, hits)
+    
+    def _analyze(self, user_input, trace, deadline=None):
+        """Run the full analysis and return its TriageResult (rendering is left to the caller)"""
+        # One knowledge base per request, even if a reload swaps it meanwhile
+        kb = self.knowledge_base
+        clock = time.perf_counter
         
-        response += "\n**Suwa Setha Hospital Emergency Department**\n"
-        response += "📍 Location: SuwaSetha Hospital Colombo\n"
-        response += "📞 Emergency: 1990 or 0112 691 111\n"
-        response += "⏰ 24/7 Emergency Services Available\n\n"
+        # Single keyword scan shared by every analysis stage
+        start = clock()
+        hits = kb.scan(user_input)
+        checkpoint = clock()
+        trace["scan"] = checkpoint - start
         
-        response += "⚠️ THIS IS NOT A SUBSTITUTE FOR EMERGENCY MEDICAL CARE."
-        return response
+        # Check for emergencies first
+        emergencies = kb.check_emergency(user_input, hits)
+        start = clock()
+        trace["emergency"] = start - checkpoint
+        if emergencies:
+            return TriageResult.emergency(kb, user_input, emergencies, hits)
+        
+        if deadline is not None:
+            deadline.check("identify")
+        
+        # Identify potential conditions (routed complaints such as headache get their own analyzer)
+        analyzer = kb.rules.route(hits)
+        if analyzer is not None:
+            possible_conditions = analyzer.evaluate(hits, kb.medical_database)
+            stage = analyzer.name
+        else:
+            possible_conditions = kb.identify_condition(user_input, hits)
+            stage = "identify"
+        elapsed = clock() - start
+        self.budget.observe("identify", elapsed)
+        trace[stage] = elapsed
+        return TriageResult.from_matches(kb, user_input, possible_conditions, hits)
     
-    def _generate_differential_diagnosis(self, conditions, symptoms):
+    def _render(self, result):
+        """Generate the markdown reply for a result, from the knowledge base it was built with"""
+        kb = result.knowledge_base
+        if result.response_type == "emergency":
+            return self._generate_emergency_response(result.emergencies)
+        # Multiple possible conditions
+        if result.response_type == "differential":
+            return self._generate_differential_diagnosis(result.conditions, result.symptoms_text, kb)
+        # Single likely condition
+        if result.response_type == "single":
+            return kb.generate_advice(result.conditions[0]["condition_id"], result.symptoms_text)
+        # No specific condition matched
+        return kb.render_general_advice(result.general_sections)
+    
+    def _generate_emergency_response(self, emergencies):
+        """Generate emergency response"""
+        parts = [
+            "🚨 **EMERGENCY MEDICAL ALERT** 🚨\n\n",
+            f"Based on your description of: {', '.join(emergencies)}\n\n",
+            self.EMERGENCY_ACTIONS_TEXT
+        ]
+        parts.extend(f"• {emergency.title()}\n" for emergency in emergencies)
+        parts.append(self.EMERGENCY_CONTACT_TEXT)
+        return "".join(parts)
+    
+    def _generate_differential_diagnosis(self, conditions, symptoms, kb=None):
         """Generate response when multiple conditions are possible"""
+        kb = kb or self.knowledge_base
         response = "🏥 **Suwa Setha Hospital - Symptom Analysis**\n\n"
         response += f"Based on your symptoms: *{symptoms[:100]}...*\n\n"
         response += "**Possible Conditions to Consider:**\n\n"
@@ -86,25 +276,17 @@ class AdvancedMedicalAI:
         response += "2. Each condition has different management approaches\n"
         response += "3. Professional evaluation is needed for accurate diagnosis\n\n"
         
-        # Offer detailed info on top match
+        # Offer detailed info on top match (just the advice part, without rendering the whole page)
         top_condition = conditions[0]
         response += f"**Detailed Information for {top_condition['name']}:**\n"
-        detailed_advice = self.knowledge_base.generate_advice(
-            top_condition["condition_id"],
-            symptoms
-        )
-        
-        # Extract just the advice part
-        if "Self-Care Recommendations:" in detailed_advice:
-            advice_start = detailed_advice.find("Self-Care Recommendations:")
-            response += detailed_advice[advice_start:advice_start+500] + "...\n\n"
+        response += kb.advice_excerpt(top_condition["condition_id"]) + "...\n\n"
         
         response += "**Next Steps:**\n"
         response += "• Monitor symptoms closely\n"
         response += "• Follow general self-care recommendations\n"
         response += "• Schedule appointment at Suwa Setha Hospital for proper diagnosis\n\n"
         
-        response += self.knowledge_base.safety_disclaimer
+        response += kb.safety_disclaimer
         return response
 
 # Create global instance
@@ -0,0 +1,89 @@
+"""
+Vectorized Batch Triage
+Scores many messages at once by gathering the decision table's posting runs for every
+(message, hit phrase) pair and summing them per (message, condition) in NumPy. Work and
+memory follow the postings the batch touches, not keywords x conditions
+"""
+
+import numpy as np
+
+
+class BatchTriage:
+    def __init__(self, knowledge_base):
+        self.knowledge_base = knowledge_base
+        rules = knowledge_base.rules
+        self.condition_ids = rules.condition_ids
+        self._phrase_ids = rules.phrase_ids
+
+        # Views of the decision table's flat posting arrays (no copies): phrase id p owns
+        # entries offsets[p] to offsets[p + 1]
+        self._offsets = np.frombuffer(rules.offsets, dtype=np.intc)
+        self._conditions = np.frombuffer(rules.posting_conditions, dtype=np.intc)
+        self._weights = np.frombuffer(rules.posting_weights, dtype="l")
+
+    def score(self, hit_sets):
+        """Sparse scores: (message rows, condition numbers, scores), one entry per condition a message touches"""
+        message_rows = []
+        phrase_ids = []
+        known = self._phrase_ids
+        for row, hits in enumerate(hit_sets):
+            for phrase in hits:
+                phrase_id = known.get(phrase)
+                if phrase_id is not None:
+                    message_rows.append(row)
+                    phrase_ids.append(phrase_id)
+
+        phrase_ids = np.asarray(phrase_ids, dtype=np.intp)
+        starts = self._offsets[phrase_ids].astype(np.intp)
+        lengths = self._offsets[phrase_ids + 1] - starts
+        # Posting entry numbers of every (message, phrase) pair's run, concatenated
+        run_starts = np.cumsum(lengths) - lengths
+        entries = np.arange(lengths.sum(), dtype=np.intp) + np.repeat(starts - run_starts, lengths)
+        rows = np.repeat(np.asarray(message_rows, dtype=np.int64), lengths)
+
+        # One key per (message, condition); postings of the same pair are summed
+        condition_count = len(self.condition_ids)
+        keys, inverse = np.unique(rows * condition_count + self._conditions[entries], return_inverse=True)
+        scores = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(scores, inverse, self._weights[entries])
+        return keys // condition_count, keys % condition_count, scores
+
+    def identify_conditions(self, hit_sets):
+        """Batch equivalent of identify_condition for messages no analyzer route claims"""
+        if not hit_sets:
+            return []
+
+        kb = self.knowledge_base
+        rules = kb.rules
+        rows, conditions, scores = self.score(hit_sets)
+        # By message, then highest score, then database order (the per-message tie-break)
+        order = np.lexsort((conditions, -scores, rows))
+        rows, conditions, scores = rows[order], conditions[order], scores[order]
+        bounds = np.searchsorted(rows, np.arange(len(hit_sets) + 1))
+
+        results = []
+        for row, hits in enumerate(hit_sets):
+            start, end = bounds[row], bounds[row + 1]
+            top = [
+                (int(condition), int(score))
+                for condition, score in zip(conditions[start:end], scores[start:end])
+                if score >= rules.min_condition_score
+            ][:rules.max_matches]
+            if not top or top[0][1] < rules.min_top_score:
+                results.append([])
+                continue
+
+            matches = []
+            for condition, score in top:
+                condition_id = self.condition_ids[condition]
+                info = kb.medical_database[condition_id]
+                matches.append({
+                    "condition_id": condition_id,
+                    "name": info["name"],
+                    "match_score": score,
+                    "matched_symptoms": [symptom for symptom in info["symptoms"] if symptom in hits],
+                    "severity": info["severity"]
+                })
+            results.append(matches)
+
+        return results
@@ -0,0 +1,121 @@
+"""
+Fuzzy Matching Latency Budget
+Times typo correction per message against growing vocabularies and fails if p99 exceeds the budget
+
+Usage:
+    python benchmarks/bench_fuzzy.py --vocab 1000,10000,50000 --budget-us 4000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzy_matcher import FuzzyMatcher
+from synthetic_kb import FILLER
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+# English letter frequencies (percent), so trigram statistics resemble real words
+LETTER_WEIGHTS = [8.2, 1.5, 2.8, 4.3, 12.7, 2.2, 2.0, 6.1, 7.0, 0.2, 0.8, 4.0, 2.4,
+                  6.7, 7.5, 1.9, 0.1, 6.0, 6.3, 9.1, 2.8, 1.0, 2.4, 0.2, 2.0, 0.1]
+
+
+def _vocabulary(rng, size):
+    """Distinct words of 4-12 letters"""
+    words = set()
+    while len(words) < size:
+        length = rng.randint(4, 12)
+        words.add("".join(rng.choices(LETTERS, weights=LETTER_WEIGHTS, k=length)))
+    return sorted(words)
+
+
+def _misspell(rng, word):
+    i = rng.randrange(len(word))
+    edit = rng.choice(("substitute", "delete", "insert", "swap"))
+    if edit == "substitute":
+        return word[:i] + rng.choice(LETTERS) + word[i + 1:]
+    if edit == "delete" and len(word) > 4:
+        return word[:i] + word[i + 1:]
+    if edit == "swap" and i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(LETTERS) + word[i:]
+
+
+def _messages(rng, vocabulary, count, words):
+    """Messages mixing filler, correctly spelled and misspelled vocabulary words"""
+    messages = []
+    for _ in range(count):
+        text = []
+        while len(text) < words:
+            roll = rng.random()
+            if roll < 0.2:
+                text.append(_misspell(rng, rng.choice(vocabulary)))
+            elif roll < 0.4:
+                text.append(rng.choice(vocabulary))
+            else:
+                text.append(rng.choice(FILLER))
+        messages.append(" ".join(text))
+    return messages
+
+
+def _time_messages(matcher, messages, clear_cache):
+    """(p50, p99) microseconds per message"""
+    latencies = []
+    # Like timeit: cyclic GC passes over the big vocabulary heap are not the matcher's cost
+    gc.collect()
+    gc.disable()
+    try:
+        for message in messages:
+            if clear_cache:
+                matcher._cache.clear()
+            start = time.perf_counter_ns()
+            matcher.correct(message)
+            latencies.append(time.perf_counter_ns() - start)
+    finally:
+        gc.enable()
+    latencies.sort()
+    return (latencies[len(latencies) // 2] / 1000,
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] / 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check fuzzy matching p99 latency against a budget")
+    parser.add_argument("--vocab", default="1000,10000,50000", help="Comma-separated vocabulary sizes")
+    parser.add_argument("--words", type=int, default=20, help="Words per message")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--budget-us", type=float, default=4000.0, help="p99 budget per message (cold cache)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    over_budget = False
+
+    for size in [int(size) for size in args.vocab.split(",")]:
+        vocabulary = _vocabulary(rng, size)
+        start = time.perf_counter()
+        matcher = FuzzyMatcher(vocabulary)
+        build_seconds = time.perf_counter() - start
+
+        messages = _messages(rng, vocabulary, args.messages, args.words)
+        # Cold: every word looked up from scratch (the worst case the budget applies to);
+        # warm: corrections cached across messages, as under steady traffic
+        cold = _time_messages(matcher, messages, clear_cache=True)
+        warm = _time_messages(matcher, messages, clear_cache=False)
+
+        status = "✅" if cold[1] <= args.budget_us else "❌"
+        over_budget |= cold[1] > args.budget_us
+        print(f"{status} {size:>6} words  built in {build_seconds:.2f}s  "
+              f"cold p50 {cold[0]:8.1f}us  p99 {cold[1]:8.1f}us  "
+              f"warm p50 {warm[0]:6.1f}us  p99 {warm[1]:6.1f}us  (budget {args.budget_us:.0f}us)")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Knowledge-Base Memory Report
+Bytes per condition (in total and per component) and the private memory each forked worker adds,
+with and without gc.freeze() before the fork
+
+Usage:
+    python benchmarks/bench_memory.py --sizes 14,1000,50000 --workers 2
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from medical_knowledge import MedicalKnowledgeBase
+from synthetic_kb import generate_knowledge_data, generate_messages
+
+# Attributes reported separately, in attribution order (an object shared by two is counted once, first)
+COMPONENTS = [
+    ("database", ("medical_database",)),
+    ("rules", ("rules",)),
+    ("matcher", ("matcher",)),
+    ("fuzzy", ("fuzzy_matcher",)),
+    ("synonyms", ("synonyms",)),
+    ("templates", ("_advice_templates", "_advice_excerpts")),
+]
+
+
+def deep_size(obj, seen):
+    """Bytes reachable from obj that are not already in seen (modules, types and functions excluded)"""
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, type(sys), type(deep_size))):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, (str, bytes, int, float, bool)) and obj is not None:
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return size
+
+
+def component_sizes(knowledge_base):
+    seen = set()
+    sizes = {}
+    for name, attributes in COMPONENTS:
+        sizes[name] = sum(deep_size(getattr(knowledge_base, attribute, None), seen) for attribute in attributes)
+    sizes["other"] = deep_size(knowledge_base, seen)
+    return sizes
+
+
+def retained_bytes(path):
+    """Bytes still allocated after loading the data file into a warmed knowledge base"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    knowledge_base = MedicalKnowledgeBase.from_file(path)
+    knowledge_base.warm_templates()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return knowledge_base, retained
+
+
+def _memory_rollup():
+    """Rss / Pss / private bytes of this process (Linux /proc/self/smaps_rollup)"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    }
+
+
+def worker_private_bytes(knowledge_base, messages, workers, freeze):
+    """Fork workers that triage messages and run a full GC, as long-lived workers do; returns their private bytes"""
+    gc.collect()
+    if freeze:
+        gc.freeze()
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_fd)
+                baseline = _memory_rollup()
+                for message in messages:
+                    knowledge_base.identify_condition(message)
+                gc.collect()
+                after = _memory_rollup()
+                os.write(write_fd, json.dumps({"private": after["private"] - baseline["private"]}).encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        pipes.append((pid, read_fd))
+
+    results = []
+    for pid, read_fd in pipes:
+        with os.fdopen(read_fd) as f:
+            results.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    if freeze:
+        gc.unfreeze()
+    return sum(result["private"] for result in results) / len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report knowledge-base memory per condition and per worker")
+    parser.add_argument("--sizes", default="14,1000,50000", help="Comma-separated condition counts")
+    parser.add_argument("--workers", type=int, default=2, help="Workers forked per measurement")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages each worker triages")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    report = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        data = generate_knowledge_data(size)
+        messages = generate_messages(data, args.messages, 20)
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        del data
+        try:
+            start = time.perf_counter()
+            knowledge_base, retained = retained_bytes(f.name)
+            build_seconds = time.perf_counter() - start
+        finally:
+            os.unlink(f.name)
+
+        components = component_sizes(knowledge_base)
+        row = {
+            "conditions": size,
+            "build_seconds": round(build_seconds, 2),
+            "retained_bytes": retained,
+            "bytes_per_condition": retained / size,
+            "components": components,
+            "worker_private_bytes": worker_private_bytes(knowledge_base, messages, args.workers, freeze=False),
+            "worker_private_bytes_frozen": worker_private_bytes(knowledge_base, messages, args.workers, freeze=True)
+        }
+        report.append(row)
+
+        print(f"📦 {size:>6} conditions  {retained / 2**20:8.2f} MiB retained  "
+              f"{row['bytes_per_condition']:8.0f} B/condition  (built in {build_seconds:.2f}s)")
+        print("   " + "  ".join(f"{name} {value / size:.0f}" for name, value in components.items()) + "  (B/condition)")
+        print(f"   per forked worker after triage + full GC: {row['worker_private_bytes'] / 2**20:.2f} MiB private, "
+              f"{row['worker_private_bytes_frozen'] / 2**20:.2f} MiB with gc.freeze() before fork")
+        del knowledge_base
+        gc.collect()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Pipeline Benchmark Suite
+Times each triage stage and full process_query against growing knowledge bases and messages
+
+Usage:
+    python benchmarks/bench_pipeline.py --sizes 10,1000,50000 --words 5,20,80 --output results.json
+    python benchmarks/bench_pipeline.py --compare results.json --output new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_medical_ai import AdvancedMedicalAI
+from medical_knowledge import MedicalKnowledgeBase
+from synthetic_kb import generate_knowledge_data, generate_messages
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _stage_calls(kb, ai, messages):
+    """One zero-argument callable per message for every stage"""
+    prepared = []
+    for message in messages:
+        text = message.lower().strip()
+        hits = kb.scan(text)
+        matches = kb.identify_condition(text, hits)
+        prepared.append((text, hits, matches))
+
+    condition_ids = list(kb.medical_database)
+    differential = [(text, matches) for text, _, matches in prepared if len(matches) > 1]
+
+    return {
+        "scan": [lambda t=text: kb.scan(t) for text, _, _ in prepared],
+        # Stage timings take the shared hit set, as process_query does
+        "check_emergency": [lambda t=text, h=hits: kb.check_emergency(t, h) for text, hits, _ in prepared],
+        "identify_condition": [lambda t=text, h=hits: kb.identify_condition(t, h) for text, hits, _ in prepared],
+        "_analyze_headache_case": [lambda t=text, h=hits: kb._analyze_headache_case(t, h) for text, hits, _ in prepared],
+        # The compiled decision table on its own (routing + scoring, no scan)
+        "rules.evaluate": [lambda h=hits: kb.rules.evaluate(h, kb.medical_database) for _, hits, _ in prepared],
+        "generate_advice": [
+            lambda c=condition_ids[i % len(condition_ids)]: kb.generate_advice(c) for i in range(len(prepared))
+        ],
+        "_generate_differential_diagnosis": [
+            lambda t=text, m=matches: ai._generate_differential_diagnosis(m, t, kb) for text, matches in differential
+        ],
+        "process_query": [lambda t=text: ai.process_query(t) for text, _, _ in prepared]
+    }
+
+
+def _time_calls(calls, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for call in calls:
+            start = time.perf_counter_ns()
+            call()
+            latencies.append(time.perf_counter_ns() - start)
+    return latencies
+
+
+def _peak_memory(calls):
+    """Peak bytes allocated while running every call once"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for call in calls:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_benchmarks(sizes, word_counts, messages_per_run, repeat, seed):
+    results = []
+    builds = []
+
+    for size in sizes:
+        data = generate_knowledge_data(size, seed=seed)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        kb = MedicalKnowledgeBase(data)
+        build_seconds = time.perf_counter() - start
+        _, build_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        builds.append({
+            "kb_size": size,
+            "build_seconds": round(build_seconds, 4),
+            "build_peak_bytes": build_peak,
+            "keyword_phrases": len(kb.matcher)
+        })
+        print(f"📚 {size} conditions built in {build_seconds:.2f}s ({len(kb.matcher)} phrases)")
+
+        ai = AdvancedMedicalAI()
+        ai.set_knowledge_base(kb)
+        ai.response_cache.max_size = 0  # measure the real work, not cache hits
+
+        for words in word_counts:
+            messages = generate_messages(data, messages_per_run, words, seed=seed)
+            for stage, calls in _stage_calls(kb, ai, messages).items():
+                if not calls:
+                    continue
+                # One untimed pass warms lazily rendered templates
+                for call in calls:
+                    call()
+                latencies = sorted(_time_calls(calls, repeat))
+                total_seconds = sum(latencies) / 1e9
+                result = {
+                    "kb_size": size,
+                    "message_words": words,
+                    "stage": stage,
+                    "calls": len(latencies),
+                    "throughput_per_s": round(len(latencies) / total_seconds, 1) if total_seconds else None,
+                    "mean_us": round(statistics.fmean(latencies) / 1000, 2),
+                    "p50_us": round(_percentile(latencies, 0.50) / 1000, 2),
+                    "p95_us": round(_percentile(latencies, 0.95) / 1000, 2),
+                    "p99_us": round(_percentile(latencies, 0.99) / 1000, 2),
+                    "max_us": round(latencies[-1] / 1000, 2),
+                    "peak_alloc_bytes": _peak_memory(calls)
+                }
+                results.append(result)
+                print(f"  {size:>6} conds {words:>4} words  {stage:<34} "
+                      f"p50 {result['p50_us']:>9.2f}us  p99 {result['p99_us']:>9.2f}us  "
+                      f"{result['throughput_per_s']:>10.1f}/s  peak {result['peak_alloc_bytes'] / 1024:.1f}KiB")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "message_words": word_counts,
+            "messages_per_run": messages_per_run,
+            "repeat": repeat,
+            "seed": seed
+        },
+        "builds": builds,
+        "results": results
+    }
+
+
+def compare(baseline, current):
+    """Print p50/p99 change for every (kb_size, message_words, stage) present in both runs"""
+    key = lambda r: (r["kb_size"], r["message_words"], r["stage"])
+    previous = {key(r): r for r in baseline["results"]}
+    print("\n📊 Change vs baseline (negative is faster)")
+    for result in current["results"]:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        changes = []
+        for field in ("p50_us", "p99_us"):
+            if before[field]:
+                changes.append(f"{field} {100 * (result[field] - before[field]) / before[field]:+6.1f}%")
+        print(f"  {result['kb_size']:>6} conds {result['message_words']:>4} words  {result['stage']:<34} {'  '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the triage pipeline stage by stage")
+    parser.add_argument("--sizes", default="10,1000,50000", help="Comma-separated knowledge-base sizes")
+    parser.add_argument("--words", default="5,20,80", help="Comma-separated message lengths in words")
+    parser.add_argument("--messages", type=int, default=200, help="Messages per (size, length) run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the messages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        word_counts=[int(words) for words in args.words.split(",")],
+        messages_per_run=args.messages,
+        repeat=args.repeat,
+        seed=args.seed
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Cold-Start Budget
+Times `import main` and time-to-first-response of `python main.py` in fresh processes,
+with and without the compiled knowledge-base snapshot, and fails if cold start is over budget
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1500 --import-budget-ms 1000
+    python benchmarks/bench_startup.py --data big_kb.json --importtime 15
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, write_snapshot
+
+IMPORT_SCRIPT = (
+    "import time; start = time.perf_counter(); import main; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _environment(data_path, snapshot_path):
+    env = dict(os.environ)
+    env.update({
+        "KNOWLEDGE_BASE_PATH": data_path,
+        "KNOWLEDGE_BASE_SNAPSHOT": snapshot_path,
+        "KNOWLEDGE_BASE_POLL_SECONDS": "0",
+        "LOG_LEVEL": "error"
+    })
+    return env
+
+
+def time_import(env):
+    """Milliseconds spent in `import main` in a fresh interpreter"""
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_first_response(env, timeout=60.0):
+    """Milliseconds from spawning `python main.py` to the first successful /chat reply"""
+    port = _free_port()
+    env = dict(env, PORT=str(port))
+    body = json.dumps({"message": "I have a headache"}).encode("utf-8")
+
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"main.py exited with code {server.returncode}")
+            request = urllib.request.Request(f"http://127.0.0.1:{port}/chat", data=body,
+                                             headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError(f"no response within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def top_imports(env, count):
+    """The slowest direct imports (cumulative microseconds) from python -X importtime"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                            env=env, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self_us | cumulative_us | <indent>module"; indentation marks nesting depth
+        _, cumulative_us, module = line.split(":", 1)[1].split("|")
+        if (len(module) - len(module.lstrip())) // 2 == 1:  # imported directly by a top-level module
+            rows.append((int(cumulative_us), module.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def _measure(label, env, runs):
+    import_ms = statistics.median(time_import(env) for _ in range(runs))
+    first_response_ms = statistics.median(time_first_response(env) for _ in range(runs))
+    print(f"   {label:<18} import main {import_ms:7.1f}ms   first response {first_response_ms:7.1f}ms")
+    return import_ms, first_response_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check backend cold start against a budget")
+    parser.add_argument("--data", default=DEFAULT_KNOWLEDGE_BASE_PATH, help="Knowledge-base data file")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement (median reported)")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Time-to-first-response budget (snapshot)")
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0, help="`import main` budget (snapshot)")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="Also list the N slowest imports")
+    args = parser.parse_args()
+
+    data_path = os.path.abspath(args.data)
+    with tempfile.TemporaryDirectory() as scratch:
+        snapshot_path = os.path.join(scratch, "knowledge_base.snapshot")
+        start = time.perf_counter()
+        knowledge_base = write_snapshot(data_path, snapshot_path)
+        print(f"📦 {len(knowledge_base.medical_database)} conditions, snapshot built in "
+              f"{time.perf_counter() - start:.2f}s ({os.path.getsize(snapshot_path) / 1024:.0f} KiB)")
+
+        compiled = _measure("compiled at start", _environment(data_path, os.path.join(scratch, "missing")), args.runs)
+        snapshot_env = _environment(data_path, snapshot_path)
+        import_ms, first_response_ms = _measure("from snapshot", snapshot_env, args.runs)
+        print(f"   snapshot saves {compiled[0] - import_ms:.1f}ms of import time")
+
+        if args.importtime:
+            print("🔍 Slowest imports made by main (snapshot):")
+            for us, module in top_imports(snapshot_env, args.importtime):
+                print(f"   {us / 1000:8.1f}ms  {module}")
+
+    over_budget = False
+    for name, value, budget in (("import main", import_ms, args.import_budget_ms),
+                                ("first response", first_response_ms, args.budget_ms)):
+        status = "✅" if value <= budget else "❌"
+        over_budget |= value > budget
+        print(f"{status} {name}: {value:.1f}ms (budget {budget:.0f}ms)")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+WebSocket vs HTTP Chat Benchmark
+Per-message latency (p50/p95/p99), bytes on the wire and network round trips for the same
+conversation sent three ways: a fresh cross-origin POST (new connection + CORS preflight, what a
+browser does after its connection and preflight cache expire), a keep-alive POST, and frames on
+one /ws/chat connection. Loopback hides network delay, so each mode's round trips are also
+projected onto --rtt-ms
+
+Usage:
+    python benchmarks/bench_websocket.py --messages 500 --clients 1,8
+    python benchmarks/bench_websocket.py --url http://127.0.0.1:10000 --rtt-ms 150
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import DEFAULT_MIX, _parse_mix, _percentile, generate_corpus, spawn_server
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, load_knowledge_data
+
+ORIGIN = "http://localhost:3000"
+
+# Network round trips per message before the reply arrives (TLS would add one or two to a new connection)
+ROUND_TRIPS = {"http_new": 3, "http_keepalive": 1, "websocket": 1}
+
+
+# ==== HTTP ====
+
+async def _exchange(reader, writer, request):
+    """Send one request; returns (status, bytes received)"""
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(lines[0].split(" ", 2)[1]), len(head) + length
+
+
+def _post_request(host, body):
+    return (
+        f"POST /chat HTTP/1.1\r\nHost: {host}\r\nOrigin: {ORIGIN}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+    )
+
+
+def _preflight_request(host):
+    return (
+        f"OPTIONS /chat HTTP/1.1\r\nHost: {host}\r\nOrigin: {ORIGIN}\r\n"
+        f"Access-Control-Request-Method: POST\r\nAccess-Control-Request-Headers: content-type\r\n\r\n"
+    ).encode("ascii")
+
+
+async def http_conversation(host, port, messages, keep_alive):
+    """(status, seconds, bytes sent + received) per message; stateless, like a default /ws/chat connection"""
+    samples = []
+    connection = await asyncio.open_connection(host, port) if keep_alive else None
+    for message in messages:
+        body = json.dumps({"message": message}).encode("utf-8")
+        started = time.perf_counter()
+        if keep_alive:
+            reader, writer = connection
+            request = _post_request(host, body)
+            status, received = await _exchange(reader, writer, request)
+            wire = len(request) + received
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+            preflight = _preflight_request(host)
+            _, preflight_received = await _exchange(reader, writer, preflight)
+            request = _post_request(host, body)
+            status, received = await _exchange(reader, writer, request)
+            writer.close()
+            wire = len(preflight) + preflight_received + len(request) + received
+        samples.append((status, time.perf_counter() - started, wire))
+    if connection is not None:
+        connection[1].close()
+    return samples
+
+
+# ==== WebSocket ====
+
+def _frame_bytes(payload, masked):
+    """Size of one text frame on the wire (RFC 6455 header, plus the 4-byte mask clients add)"""
+    length = len(payload.encode("utf-8"))
+    header = 2 if length < 126 else 4 if length < 65536 else 10
+    return header + (4 if masked else 0) + length
+
+
+async def websocket_conversation(host, port, messages):
+    import websockets
+
+    samples = []
+    async with websockets.connect(f"ws://{host}:{port}/ws/chat", origin=ORIGIN, compression=None) as ws:
+        json.loads(await ws.recv())  # ready
+        for message_id, message in enumerate(messages, 1):
+            frame = json.dumps({"id": message_id, "message": message})
+            started = time.perf_counter()
+            await ws.send(frame)
+            while True:
+                reply = await ws.recv()
+                payload = json.loads(reply)
+                if payload.get("type") == "ping":
+                    await ws.send(json.dumps({"type": "pong"}))
+                    continue
+                break
+            status = payload.get("status", 200) if "error" in payload else 200
+            samples.append((status, time.perf_counter() - started,
+                            _frame_bytes(frame, True) + _frame_bytes(reply, False)))
+    return samples
+
+
+# ==== Runner ====
+
+async def run_mode(mode, host, port, corpus, clients):
+    """Every client holds its own conversation over the same messages; returns samples and elapsed seconds"""
+    async def client(index):
+        messages = corpus[index::clients] or corpus
+        if mode == "websocket":
+            return await websocket_conversation(host, port, messages)
+        return await http_conversation(host, port, messages, keep_alive=mode == "http_keepalive")
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client(index) for index in range(clients)))
+    return [sample for samples in results for sample in samples], time.perf_counter() - started
+
+
+def summarize_mode(mode, samples, elapsed, rtt_ms):
+    ok = sorted(seconds * 1000 for status, seconds, _ in samples if status == 200)
+    p50 = _percentile(ok, 0.50)
+    return {
+        "messages": len(samples),
+        "errors": len(samples) - len(ok),
+        "messages_per_second": len(ok) / elapsed,
+        "p50_ms": p50,
+        "p95_ms": _percentile(ok, 0.95),
+        "p99_ms": _percentile(ok, 0.99),
+        "bytes_per_message": sum(wire for _, _, wire in samples) / len(samples),
+        "round_trips": ROUND_TRIPS[mode],
+        "projected_p50_ms": None if p50 is None else p50 + ROUND_TRIPS[mode] * rtt_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-message cost of /chat POSTs and /ws/chat frames")
+    parser.add_argument("--url", help="Benchmark a running server instead of spawning main.py")
+    parser.add_argument("--workers", type=int, default=0, help="TRIAGE_WORKERS for the spawned server")
+    parser.add_argument("--messages", type=int, default=500, help="Messages per mode and client count")
+    parser.add_argument("--clients", default="1,8", help="Comma-separated concurrent conversations")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Message class shares")
+    parser.add_argument("--rtt-ms", type=float, default=100.0, help="Network round trip to project latency onto")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    corpus = [message for _, message in generate_corpus(
+        load_knowledge_data(DEFAULT_KNOWLEDGE_BASE_PATH), args.messages, _parse_mix(args.mix))]
+
+    process = None
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        # Cache off: every mode pays for triage, not for a cache hit on the previous mode's messages
+        process, port = spawn_server(args.workers, {"RESPONSE_CACHE_SIZE": "0"})
+        host = "127.0.0.1"
+
+    report = []
+    try:
+        for clients in [int(value) for value in args.clients.split(",")]:
+            print(f"🔌 {clients} concurrent conversation(s), {len(corpus)} messages, "
+                  f"projected onto a {args.rtt_ms:.0f} ms round trip")
+            print(f"   {'mode':<16}{'msg/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'bytes':>8}{'RTTs':>6}"
+                  f"{'@RTT p50':>10}  errors")
+            for mode in ROUND_TRIPS:
+                samples, elapsed = asyncio.run(run_mode(mode, host, port, corpus, clients))
+                row = summarize_mode(mode, samples, elapsed, args.rtt_ms)
+                report.append({"clients": clients, "mode": mode, **row})
+                print(f"   {mode:<16}{row['messages_per_second']:>8.0f}{row['p50_ms']:>8.2f}{row['p95_ms']:>8.2f}"
+                      f"{row['p99_ms']:>8.2f}{row['bytes_per_message']:>8.0f}{row['round_trips']:>6}"
+                      f"{row['projected_p50_ms']:>10.0f}  {row['errors']}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
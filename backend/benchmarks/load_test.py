@@ -0,0 +1,438 @@
+"""
+Local Load Test
+Replays symptom messages against the /chat endpoint at a fixed concurrency (closed loop)
+or a fixed arrival rate (open loop, Poisson), and sweeps worker counts to find saturation.
+Latency is reported per message class: throughput, p50/p95/p99/p999 and error rate (non-200,
+including 503 sheds, and connection failures)
+
+Usage:
+    python benchmarks/load_test.py --workers 1,2,4 --concurrency 1,4,16,64     # spawn main.py per worker count
+    python benchmarks/load_test.py --rates 50,100,200,400 --duration 20         # open loop
+    python benchmarks/load_test.py --url http://127.0.0.1:10000 --corpus ../requests.jsonl
+    python benchmarks/load_test.py --in-process --concurrency 8                 # uvicorn thread in this process
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, load_knowledge_data
+from synthetic_kb import FILLER
+
+# Share of generated traffic per class
+DEFAULT_MIX = "emergency=0.05,headache=0.25,multi_condition=0.5,no_match=0.2"
+NO_MATCH_MESSAGES = [
+    "hello", "can you help me", "what are your opening hours", "i want to book an appointment",
+    "thank you", "is the pharmacy open on sunday", "how do i get to the hospital", "who is my doctor"
+]
+
+
+# ==== Corpus ====
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, share = part.partition("=")
+        mix[name.strip()] = float(share)
+    return mix
+
+
+def generate_corpus(data, count, mix, seed=0):
+    """(class, message) pairs drawn from the knowledge base in the given class mix"""
+    rng = random.Random(seed)
+    conditions = list(data["conditions"].values())
+    headache = data["analyzers"]["headache"]
+    headache_indicators = [phrase for rule in headache["rules"] for phrase, _ in rule["indicators"]]
+    classes, weights = zip(*mix.items())
+
+    corpus = []
+    for _ in range(count):
+        kind = rng.choices(classes, weights)[0]
+        if kind == "emergency":
+            parts = [rng.choice(data["emergency_keywords"])]
+            parts += rng.sample(rng.choice(conditions)["symptoms"], k=1)
+        elif kind == "headache":
+            parts = ["headache"] + rng.sample(headache_indicators, k=rng.randint(1, 3))
+        elif kind == "multi_condition":
+            parts = []
+            for info in rng.sample(conditions, k=rng.randint(2, 3)):
+                parts += rng.sample(info["symptoms"], k=min(len(info["symptoms"]), rng.randint(1, 2)))
+        elif kind == "no_match":
+            parts = [rng.choice(NO_MATCH_MESSAGES)]
+        else:
+            raise ValueError(f"Unknown message class {kind!r}")
+
+        text = " and ".join(parts).split()
+        text += rng.sample(FILLER, k=rng.randint(0, 8))
+        corpus.append((kind, " ".join(text)))
+    return corpus
+
+
+def load_corpus(path):
+    """("replay", message) pairs from a JSONL file of {"message": ...} lines ({"body": ...} also accepted)"""
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            message = record.get("message") or record.get("body") or record.get("title")
+            if message:
+                corpus.append((record.get("class", "replay"), message))
+    return corpus
+
+
+# ==== HTTP client ====
+
+class _Connection:
+    """Minimal keep-alive HTTP/1.1 client, so the load generator costs little CPU next to the server"""
+
+    def __init__(self, reader, writer, host):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, host)
+
+    async def post(self, path, body):
+        self.writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+        )
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await self.reader.readexactly(length)
+        return status
+
+    def close(self):
+        self.writer.close()
+
+
+class _Recorder:
+    """(class, status, seconds) samples, kept only once the warm-up is over"""
+
+    def __init__(self):
+        self.samples = []
+        self.recording = False
+
+    def add(self, kind, status, seconds, record=True):
+        if record:
+            self.samples.append((kind, status, seconds))
+
+
+async def _send(connection, path, kind, message, recorder, started, record):
+    """One request; a broken connection is recorded as an error and returned as None"""
+    body = json.dumps({"message": message}).encode("utf-8")
+    try:
+        status = await connection.post(path, body)
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        recorder.add(kind, "connection_error", time.perf_counter() - started, record)
+        connection.close()
+        return None
+    recorder.add(kind, status, time.perf_counter() - started, record)
+    return connection
+
+
+# ==== Load shapes ====
+
+async def run_closed_loop(host, port, path, corpus, concurrency, duration, warmup, seed=0):
+    """`concurrency` clients each sending their next message as soon as the last one answers"""
+    recorder = _Recorder()
+    deadline = time.perf_counter() + warmup + duration
+
+    async def client(index):
+        rng = random.Random(seed * 1000003 + index)
+        connection = None
+        while time.perf_counter() < deadline:
+            if connection is None:
+                try:
+                    connection = await _Connection.open(host, port)
+                except OSError:
+                    recorder.add("connect", "connection_error", 0.0, recorder.recording)
+                    await asyncio.sleep(0.05)
+                    continue
+            kind, message = rng.choice(corpus)
+            connection = await _send(connection, path, kind, message, recorder, time.perf_counter(),
+                                     recorder.recording)
+        if connection is not None:
+            connection.close()
+
+    async def start_recording():
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+
+    await asyncio.gather(start_recording(), *(client(i) for i in range(concurrency)))
+    return recorder.samples
+
+
+async def run_open_loop(host, port, path, corpus, rate, duration, warmup, max_connections=512, seed=0):
+    """Poisson arrivals at `rate` per second whether or not earlier requests have answered
+
+    Latency runs from each request's scheduled arrival, so time spent waiting for a free
+    connection counts (no coordinated omission).
+    """
+    rng = random.Random(seed)
+    recorder = _Recorder()
+    idle = asyncio.Queue()
+    opened = 0
+    tasks = []
+
+    async def arrival(kind, message, scheduled, record):
+        nonlocal opened
+        if idle.empty() and opened < max_connections:
+            opened += 1
+            try:
+                connection = await _Connection.open(host, port)
+            except OSError:
+                opened -= 1
+                recorder.add(kind, "connection_error", time.perf_counter() - scheduled, record)
+                return
+        else:
+            connection = await idle.get()
+        connection = await _send(connection, path, kind, message, recorder, scheduled, record)
+        if connection is None:
+            opened -= 1
+        else:
+            idle.put_nowait(connection)
+
+    start = time.perf_counter()
+    scheduled = start
+    while scheduled < start + warmup + duration:
+        scheduled += rng.expovariate(rate)
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind, message = rng.choice(corpus)
+        tasks.append(asyncio.create_task(arrival(kind, message, scheduled, scheduled >= start + warmup)))
+    await asyncio.gather(*tasks)
+
+    while not idle.empty():
+        idle.get_nowait().close()
+    return recorder.samples
+
+
+# ==== Report ====
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(samples, duration):
+    """Per-class and overall throughput, latency percentiles (ms) and error rate"""
+    by_class = {}
+    for kind, status, seconds in samples:
+        by_class.setdefault(kind, []).append((status, seconds))
+    by_class["all"] = [(status, seconds) for _, status, seconds in samples]
+
+    summary = {}
+    for kind, rows in by_class.items():
+        ok = sorted(seconds * 1000 for status, seconds in rows if status == 200)
+        errors = {}
+        for status, _ in rows:
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        summary[kind] = {
+            "requests": len(rows),
+            "throughput_rps": len(ok) / duration,
+            "error_rate": (len(rows) - len(ok)) / len(rows) if rows else 0.0,
+            "errors": errors,
+            "p50_ms": _percentile(ok, 0.50),
+            "p95_ms": _percentile(ok, 0.95),
+            "p99_ms": _percentile(ok, 0.99),
+            "p999_ms": _percentile(ok, 0.999)
+        }
+    return summary
+
+
+def _format_ms(value):
+    return "      -" if value is None else f"{value:7.1f}"
+
+
+def print_summary(summary):
+    print(f"   {'class':<16}{'requests':>9}{'req/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'p999':>8}  errors")
+    for kind in sorted(summary, key=lambda kind: (kind == "all", kind)):
+        row = summary[kind]
+        errors = ", ".join(f"{status}×{count}" for status, count in sorted(row["errors"].items()))
+        print(f"   {kind:<16}{row['requests']:>9}{row['throughput_rps']:>9.1f}"
+              f"{_format_ms(row['p50_ms'])} {_format_ms(row['p95_ms'])} {_format_ms(row['p99_ms'])} "
+              f"{_format_ms(row['p999_ms'])}  {row['error_rate'] * 100:.1f}% {errors}")
+
+
+def saturation_point(points, open_loop, max_error_rate=0.01):
+    """The first load level where throughput stops keeping up (or errors start), else None"""
+    best = 0.0
+    for load, summary in points:
+        overall = summary["all"]
+        if overall["error_rate"] > max_error_rate:
+            return load
+        if open_loop and overall["throughput_rps"] < 0.95 * load:
+            return load
+        if not open_loop and best and overall["throughput_rps"] < 1.05 * best:
+            return load
+        best = max(best, overall["throughput_rps"])
+    return None
+
+
+# ==== Servers ====
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_listening(port, process=None, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"main.py exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server not listening on port {port} after {timeout:.0f}s")
+
+
+def spawn_server(workers, extra_env):
+    """`python main.py` with TRIAGE_WORKERS=workers on a free port; returns (process, port)"""
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), TRIAGE_WORKERS=str(workers), KNOWLEDGE_BASE_POLL_SECONDS="0",
+               LOG_LEVEL="warning", **extra_env)
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _wait_until_listening(port, process)
+    return process, port
+
+
+def start_in_process_server():
+    """Serve main.app with uvicorn on a background thread of this process; returns the port
+
+    Client and server then share one interpreter (and GIL), so absolute numbers are lower
+    than against a separate server; useful for profiling the app together with the load.
+    """
+    import uvicorn
+
+    os.environ.setdefault("KNOWLEDGE_BASE_POLL_SECONDS", "0")
+    os.environ.setdefault("LOG_LEVEL", "warning")
+    from main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="load-test-server", daemon=True).start()
+    _wait_until_listening(port)
+    return port
+
+
+# ==== Main ====
+
+def _int_list(text):
+    return [int(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay symptom messages against /chat and report latency")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Load an already running server instead of spawning main.py")
+    target.add_argument("--in-process", action="store_true", help="Run the app with uvicorn inside this process")
+    parser.add_argument("--workers", default="", help="TRIAGE_WORKERS values to sweep (spawned servers only)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="1,4,16,64", help="Closed-loop client counts to sweep")
+    load.add_argument("--rates", help="Open-loop arrival rates (requests/second) to sweep")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per load level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each level")
+    parser.add_argument("--corpus", help="JSONL of messages to replay (requests.jsonl-style lines also work)")
+    parser.add_argument("--messages", type=int, default=2000, help="Generated messages")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Generated class shares")
+    parser.add_argument("--data", default=DEFAULT_KNOWLEDGE_BASE_PATH, help="Knowledge base the messages come from")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for spawned servers (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write all results as JSON")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(load_knowledge_data(args.data), args.messages, _parse_mix(args.mix), args.seed)
+    if args.corpus:
+        corpus += load_corpus(args.corpus)
+    open_loop = args.rates is not None
+    levels = _int_list(args.rates if open_loop else args.concurrency)
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    if args.url:
+        parsed = urllib.parse.urlsplit(args.url)
+        targets = [(None, parsed.hostname, parsed.port or 80)]
+    elif args.in_process:
+        targets = [(None, "127.0.0.1", start_in_process_server())]
+    else:
+        targets = [(workers, None, None) for workers in _int_list(args.workers or str(os.cpu_count() or 1))]
+
+    print(f"🚦 {len(corpus)} messages, {'open loop' if open_loop else 'closed loop'} "
+          f"{args.warmup:.0f}s warm-up + {args.duration:.0f}s per level")
+    results = []
+    for workers, host, port in targets:
+        process = None
+        if workers is not None:
+            process, port = spawn_server(workers, extra_env)
+            host = "127.0.0.1"
+        try:
+            points = []
+            for level in levels:
+                if open_loop:
+                    samples = asyncio.run(run_open_loop(host, port, "/chat", corpus, level,
+                                                        args.duration, args.warmup, seed=args.seed))
+                else:
+                    samples = asyncio.run(run_closed_loop(host, port, "/chat", corpus, level,
+                                                          args.duration, args.warmup, seed=args.seed))
+                summary = summarize(samples, args.duration)
+                label = f"{level} req/s offered" if open_loop else f"{level} concurrent clients"
+                print(f"\n📊 workers={workers or 'n/a'}  {label}")
+                print_summary(summary)
+                points.append((level, summary))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+        saturated_at = saturation_point(points, open_loop)
+        peak = max(summary["all"]["throughput_rps"] for _, summary in points)
+        print(f"\n📈 workers={workers or 'n/a'}: peak {peak:.1f} req/s, "
+              + (f"saturates at {saturated_at} {'req/s' if open_loop else 'clients'}"
+                 if saturated_at is not None else "not saturated at the levels tried"))
+        results.append({
+            "workers": workers,
+            "open_loop": open_loop,
+            "peak_throughput_rps": peak,
+            "saturated_at": saturated_at,
+            "levels": [{"load": level, "classes": summary} for level, summary in points]
+        })
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"duration": args.duration, "results": results}, f, indent=1)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
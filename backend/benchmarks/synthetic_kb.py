@@ -0,0 +1,131 @@
+"""
+Synthetic Knowledge Base Generator
+Builds knowledge-base data files of any size with realistic keyword overlap
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, known_phrases, validate_knowledge_data
+
+DESCRIPTORS = [
+    "mild", "severe", "chronic", "sharp", "dull", "burning", "intermittent", "persistent",
+    "sudden", "recurring", "morning", "night", "aching", "stabbing", "radiating", "localized"
+]
+BODY_PARTS = [
+    "knee", "elbow", "wrist", "ankle", "shoulder", "hip", "jaw", "ear", "eye", "throat",
+    "stomach", "abdomen", "neck", "foot", "hand", "finger", "toe", "scalp", "gum", "tongue",
+    "lip", "nose", "sinus", "groin", "thigh", "calf", "shin", "rib", "pelvis", "bladder"
+]
+FINDINGS = [
+    "pain", "swelling", "stiffness", "itching", "rash", "numbness", "tingling", "weakness",
+    "redness", "discharge", "cramps", "tenderness", "bruising", "burning", "spasms", "dryness"
+]
+SIDES = ["left", "right", "upper", "lower", "both"]
+FILLER = (
+    "i have had this for a few days and it gets worse when i wake up sometimes "
+    "after eating or walking my mother says i should see someone about it"
+).split()
+SEVERITIES = ["mild", "moderate", "severe", "mild_moderate", "moderate_severe"]
+
+
+def _skewed_choice(rng, items):
+    """Pick with a heavy head so a few phrases are shared by many conditions"""
+    return items[int(len(items) * rng.random() ** 2.5)]
+
+
+def _symptom_pool(rng, size):
+    """Distinct symptom phrases such as 'left sharp knee pain'"""
+    phrases = [f"{part} {finding}" for part in BODY_PARTS for finding in FINDINGS]
+    phrases += [f"{descriptor} {phrase}" for descriptor in DESCRIPTORS for phrase in list(phrases)]
+    phrases += [f"{side} {phrase}" for side in SIDES for phrase in list(phrases)]
+    return rng.sample(phrases, min(size, len(phrases)))
+
+
+def generate_knowledge_data(n_conditions, seed=0, base_path=DEFAULT_KNOWLEDGE_BASE_PATH):
+    """Return a valid knowledge-base data dict with n_conditions conditions"""
+    rng = random.Random(seed)
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+
+    # Real conditions first (conditions named by analyzer rules are always kept)
+    rule_ids = list(dict.fromkeys(
+        rule["condition"] for analyzer in base["analyzers"].values() for rule in analyzer["rules"]
+    ))
+    real_ids = rule_ids + [cid for cid in base["conditions"] if cid not in rule_ids]
+    conditions = {cid: base["conditions"][cid] for cid in real_ids[:max(n_conditions, len(rule_ids))]}
+
+    real_symptoms = sorted({symptom for info in base["conditions"].values() for symptom in info["symptoms"]})
+    pool = _symptom_pool(rng, max(200, n_conditions // 2))
+
+    for i in range(len(conditions), n_conditions):
+        symptoms = set()
+        while len(symptoms) < rng.randint(3, 7):
+            # Mostly synthetic phrases, with a share of real ones so indexes overlap
+            symptoms.add(rng.choice(real_symptoms) if rng.random() < 0.15 else _skewed_choice(rng, pool))
+        related = {_skewed_choice(rng, pool) for _ in range(rng.randint(0, 3))} - symptoms
+
+        conditions[f"synthetic_{i:05d}"] = {
+            "name": f"Synthetic Condition {i:05d}",
+            "symptoms": sorted(symptoms),
+            "related_keywords": sorted(related),
+            "causes": "Synthetic benchmark condition",
+            "advice": [f"Synthetic advice step {step}" for step in range(1, 6)],
+            "duration": f"{rng.randint(1, 30)} days",
+            "when_to_see_doctor": "If symptoms persist or worsen",
+            "severity": rng.choice(SEVERITIES)
+        }
+
+    data = dict(base)
+    data["version"] = f"synthetic-{n_conditions}-{seed}"
+    data["conditions"] = conditions
+    # Synonyms of dropped conditions' phrases go with them
+    known = known_phrases(data)
+    data["synonyms"] = {
+        code: dict(table, phrases={surface: phrase for surface, phrase in table["phrases"].items() if phrase in known})
+        for code, table in base.get("synonyms", {}).items()
+    }
+    validate_knowledge_data(data)
+    return data
+
+
+def generate_messages(data, count, words, seed=0):
+    """Symptom messages of roughly `words` words drawn from the knowledge base"""
+    rng = random.Random(seed)
+    conditions = list(data["conditions"].values())
+    emergency_keywords = data["emergency_keywords"]
+    messages = []
+
+    for _ in range(count):
+        info = rng.choice(conditions)
+        parts = rng.sample(info["symptoms"], k=min(len(info["symptoms"]), rng.randint(1, 3)))
+        roll = rng.random()
+        if roll < 0.05:
+            parts.append(rng.choice(emergency_keywords))
+        elif roll < 0.25:
+            parts.append("headache")
+
+        text = " and ".join(parts).split()
+        while len(text) < words:
+            text.append(rng.choice(FILLER))
+        messages.append(" ".join(text[:max(words, 1)]))
+
+    return messages
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic knowledge-base data file")
+    parser.add_argument("conditions", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(generate_knowledge_data(args.conditions, args.seed), f, ensure_ascii=False, indent=1)
+    print(f"Wrote {args.conditions} conditions to {args.output}")
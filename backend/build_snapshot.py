@@ -0,0 +1,31 @@
+"""
+Knowledge Base Snapshot Build Step
+Compiles data/knowledge_base.json into data/knowledge_base.snapshot so server start-up
+loads indexes, rule tables and rendered templates instead of recomputing them
+
+Usage (run at deploy/build time, after pip install):
+    python build_snapshot.py [--data data/knowledge_base.json] [--output data/knowledge_base.snapshot]
+"""
+
+import argparse
+import os
+import time
+
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, DEFAULT_SNAPSHOT_PATH, write_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the compiled knowledge-base snapshot")
+    parser.add_argument("--data", default=DEFAULT_KNOWLEDGE_BASE_PATH)
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    knowledge_base = write_snapshot(args.data, args.output)
+    print(f"📦 Snapshot of knowledge base {knowledge_base.version} "
+          f"({len(knowledge_base.medical_database)} conditions) written to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s ({os.path.getsize(args.output) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
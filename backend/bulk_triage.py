@@ -0,0 +1,196 @@
+"""
+Offline Bulk Triage
+Streams exported messages (JSONL file or stdin) through the triage engine on a process pool
+and writes one JSONL result per input line, in input order, as chunks finish. No HTTP involved;
+only a fixed number of chunks is ever in memory, however long the input
+
+Usage:
+    python bulk_triage.py exports.jsonl --output results.jsonl --format json
+    cat exports.jsonl | python bulk_triage.py - --data data/knowledge_base_next.json > results.jsonl
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from advanced_medical_ai import clean_message, medical_ai
+
+
+# ========== WORKER ==========
+# Module-level so it can be pickled; forked workers share the parent's loaded knowledge base
+
+def _parse_line(line, field):
+    """The message text of one input line: a JSON object's field, or a JSON string"""
+    record = json.loads(line)
+    if isinstance(record, str):
+        return None, record
+    if not isinstance(record, dict):
+        raise ValueError("line is not a JSON object or string")
+    message = record.get(field)
+    if not isinstance(message, str):
+        raise ValueError(f"missing string field {field!r}")
+    return record.get("id"), message
+
+
+def _triage_chunk(lines, field, format):
+    """Triage (line number, raw line) pairs; returns the output text and counts by response type"""
+    output = []
+    counts = Counter()
+    for line_number, line in lines:
+        try:
+            record_id, message = _parse_line(line, field)
+            # Trimmed and cut like /chat; too-short messages are errors (InvalidMessage is a ValueError)
+            message = clean_message(message)
+        except ValueError as e:
+            counts["error"] += 1
+            output.append(json.dumps({"line": line_number, "error": str(e)}, ensure_ascii=False))
+            continue
+
+        result = {"line": line_number}
+        if record_id is not None:
+            result["id"] = record_id
+        try:
+            # The structured result is what process_query renders; its type is counted either way
+            triage = medical_ai.analyze_query(message)
+            result["result" if format == "json" else "response"] = medical_ai.render(triage, format)
+        except Exception as e:
+            counts["error"] += 1
+            output.append(json.dumps({"line": line_number, "error": f"triage failed: {e}"}, ensure_ascii=False))
+            continue
+        counts[triage.response_type] += 1
+        output.append(json.dumps(result, ensure_ascii=False))
+    output.append("")
+    return "\n".join(output), counts
+
+
+# ========== DRIVER ==========
+
+def _chunks(lines, size):
+    """(line number, line) chunks of non-blank input lines, read lazily"""
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkTriage:
+    def __init__(self, workers=None, chunk_size=256, window=None, format="json", field="message",
+                 progress_interval=5.0, progress=sys.stderr):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        # Chunks submitted but not yet written; bounds memory and keeps every worker busy
+        self.window = window or max(1, self.workers) * 2
+        self.format = format
+        self.field = field
+        self.progress_interval = progress_interval
+        self.progress = progress
+        self.counts = Counter()
+        self.messages = 0
+        self.elapsed = 0.0
+
+    def run(self, lines, output):
+        """Triage every line, writing results to output in input order; returns the summary"""
+        start = time.perf_counter()
+        last_report = start
+        chunks = _chunks(lines, self.chunk_size)
+
+        if self.workers == 0:
+            # In this process: simplest to debug and profile
+            results = (_triage_chunk(chunk, self.field, self.format) for chunk in chunks)
+            for text, counts in results:
+                last_report = self._write(output, text, counts, start, last_report)
+        else:
+            # The knowledge base is frozen out of the collector so forked workers keep sharing its pages.
+            # Fork, whatever the platform default: workers inherit this process's knowledge base
+            # (--data included); spawned ones would import the default data file instead
+            gc.collect()
+            gc.freeze()
+            pending = deque()
+            try:
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("fork")) as pool:
+                    for chunk in chunks:
+                        pending.append(pool.submit(_triage_chunk, chunk, self.field, self.format))
+                        # Results leave in submission order; a slow chunk holds back later ones, never reorders them
+                        while len(pending) >= self.window:
+                            text, counts = pending.popleft().result()
+                            last_report = self._write(output, text, counts, start, last_report)
+                    while pending:
+                        text, counts = pending.popleft().result()
+                        last_report = self._write(output, text, counts, start, last_report)
+            finally:
+                gc.unfreeze()
+
+        output.flush()
+        self.elapsed = time.perf_counter() - start
+        return self.summary()
+
+    def _write(self, output, text, counts, start, last_report):
+        output.write(text)
+        self.counts.update(counts)
+        self.messages += sum(counts.values())
+        now = time.perf_counter()
+        if self.progress is not None and now - last_report >= self.progress_interval:
+            print(f"⏳ {self.messages:,} messages  {self.messages / (now - start):,.0f} msg/s", file=self.progress)
+            return now
+        return last_report
+
+    def summary(self):
+        return {
+            "messages": self.messages,
+            "errors": self.counts.get("error", 0),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "messages_per_second": round(self.messages / self.elapsed, 1) if self.elapsed else 0.0,
+            "by_type": dict(self.counts),
+            "workers": self.workers,
+            "knowledge_base_version": medical_ai.knowledge_base.version
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Triage a JSONL export of messages offline, in input order")
+    parser.add_argument("input", help="JSONL file of {\"message\": ...} objects (or JSON strings); - for stdin")
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    parser.add_argument("--format", choices=("json", "markdown"), default="json",
+                        help="Structured triage result, or the markdown reply /chat would send")
+    parser.add_argument("--field", default="message", help="Object field holding the message text")
+    parser.add_argument("--data", help="Knowledge-base data file to triage with (e.g. a rule change under review)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count; 0 runs in this process)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Messages sent to a worker at a time")
+    parser.add_argument("--window", type=int, help="Chunks in flight (default: twice the workers)")
+    args = parser.parse_args()
+
+    if args.data:
+        from medical_knowledge import MedicalKnowledgeBase
+        medical_ai.set_knowledge_base(MedicalKnowledgeBase.from_file(args.data))
+        medical_ai.knowledge_base.warm_templates()
+
+    bulk = BulkTriage(workers=args.workers, chunk_size=args.chunk_size, window=args.window,
+                      format=args.format, field=args.field)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = bulk.run(source, output)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"✅ {summary['messages']:,} messages in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['messages_per_second']:,.0f} msg/s, {summary['workers']} workers, "
+          f"knowledge base {summary['knowledge_base_version']})", file=sys.stderr)
+    print("   " + "  ".join(f"{kind} {count:,}" for kind, count in sorted(summary["by_type"].items())),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+WebSocket Chat Sessions
+One connection per conversation on /ws/chat: compact JSON frames instead of a full HTTP
+request (and CORS preflight) per message, an optional server-side session for multi-turn
+follow-ups (?session=1 starts one, ?session_id= resumes one), application-level heartbeats
+and an idle timeout
+
+Protocol (JSON text frames):
+    server -> {"type": "ready", "session_id": "..." or null, "heartbeat": 20, "idle_timeout": 300}
+    client -> {"id": 1, "message": "sore throat and fever"}
+    server -> {"id": 1, "response": "..."}         ({"id": 1, "result": {...}} with ?format=json)
+    server -> {"id": 1, "error": "...", "status": 503, "retry_after": 1}
+    server -> {"type": "ping"}                      client -> {"type": "pong"}
+"""
+
+import asyncio
+import json
+import os
+
+from starlette.websockets import WebSocketDisconnect
+
+# Close codes (RFC 6455): normal closure, going away, try again later
+CLOSE_NORMAL, CLOSE_GOING_AWAY, CLOSE_TRY_AGAIN_LATER = 1000, 1001, 1013
+
+
+class ChatSocketError(Exception):
+    """A message the connection survives: reported to the client as an error frame"""
+
+    def __init__(self, status, detail, retry_after=None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ChatSocketServer:
+    # Frames longer than this are refused without being parsed (messages are cut to 500 characters anyway)
+    MAX_FRAME_CHARS = 4096
+
+    def __init__(self, heartbeat_interval=20.0, idle_timeout=300.0, max_connections=1000):
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.open = 0
+        self.opened = 0
+        self.rejected = 0
+        self.messages = 0
+        self.closed_idle = 0
+        self.closed_heartbeat = 0
+
+    @classmethod
+    def from_environment(cls):
+        """Configure from WS_HEARTBEAT_SECONDS, WS_IDLE_TIMEOUT and WS_MAX_CONNECTIONS"""
+        return cls(
+            heartbeat_interval=float(os.environ.get("WS_HEARTBEAT_SECONDS", 20)),
+            idle_timeout=float(os.environ.get("WS_IDLE_TIMEOUT", 300)),
+            max_connections=int(os.environ.get("WS_MAX_CONNECTIONS", 1000))
+        )
+
+    async def serve(self, websocket, handle, session_id=None):
+        """Run one connection; handle(message, session_id) returns the reply fields or raises ChatSocketError
+
+        Messages on a connection are answered one at a time, in the order they arrive.
+        """
+        if self.open >= self.max_connections:
+            # Refused at the handshake; the client falls back to HTTP
+            self.rejected += 1
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+            return
+
+        await websocket.accept()
+        self.open += 1
+        self.opened += 1
+        send_lock = asyncio.Lock()
+
+        async def send(payload):
+            async with send_lock:
+                await websocket.send_text(json.dumps(payload, ensure_ascii=False))
+
+        heartbeat = None
+        try:
+            await send({
+                "type": "ready", "session_id": session_id,
+                "heartbeat": self.heartbeat_interval, "idle_timeout": self.idle_timeout
+            })
+            heartbeat = asyncio.create_task(self._heartbeat(send))
+            await self._receive_loop(websocket, send, handle, session_id)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            self.open -= 1
+
+    async def _heartbeat(self, send):
+        """Ping so the client (and any proxy in between) sees traffic on a quiet connection"""
+        try:
+            while True:
+                await asyncio.sleep(self.heartbeat_interval)
+                await send({"type": "ping"})
+        except Exception:
+            # Connection gone; the receive loop notices and cleans up
+            return
+
+    async def _receive_loop(self, websocket, send, handle, session_id):
+        loop = asyncio.get_running_loop()
+        last_frame = last_message = loop.time()
+
+        while True:
+            # Idle: no chat message for idle_timeout. Dead: not even a pong for two heartbeats
+            idle_deadline = last_message + self.idle_timeout
+            heartbeat_deadline = last_frame + 2 * self.heartbeat_interval
+            try:
+                text = await asyncio.wait_for(
+                    websocket.receive_text(), max(0.0, min(idle_deadline, heartbeat_deadline) - loop.time())
+                )
+            except asyncio.TimeoutError:
+                if loop.time() >= idle_deadline:
+                    self.closed_idle += 1
+                    await websocket.close(code=CLOSE_NORMAL, reason="idle timeout")
+                else:
+                    self.closed_heartbeat += 1
+                    await websocket.close(code=CLOSE_GOING_AWAY, reason="heartbeat timeout")
+                return
+            last_frame = loop.time()
+
+            if len(text) > self.MAX_FRAME_CHARS:
+                await send({"error": f"Frame over {self.MAX_FRAME_CHARS} characters", "status": 413})
+                continue
+            try:
+                frame = json.loads(text)
+            except ValueError:
+                await send({"error": "Frames must be JSON objects", "status": 400})
+                continue
+            if not isinstance(frame, dict):
+                await send({"error": "Frames must be JSON objects", "status": 400})
+                continue
+
+            kind = frame.get("type")
+            if kind == "pong":
+                continue
+            if kind == "ping":
+                await send({"type": "pong"})
+                continue
+
+            message_id = frame.get("id")
+            message = frame.get("message")
+            if not isinstance(message, str):
+                await send({"id": message_id, "error": "message must be a string", "status": 400})
+                continue
+
+            last_message = last_frame
+            self.messages += 1
+            try:
+                reply = await handle(message, session_id)
+            except ChatSocketError as e:
+                error = {"id": message_id, "error": e.detail, "status": e.status}
+                if e.retry_after is not None:
+                    error["retry_after"] = e.retry_after
+                await send(error)
+                continue
+            await send({"id": message_id, **reply})
+
+    def stats(self):
+        return {
+            "open": self.open,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "messages": self.messages,
+            "closed_idle": self.closed_idle,
+            "closed_heartbeat": self.closed_heartbeat
+        }
+
+
+# Create global instance
+chat_sockets = ChatSocketServer.from_environment()
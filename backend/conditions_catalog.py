@@ -0,0 +1,108 @@
+"""
+Knowledge-Base Read Endpoints
+/conditions bodies serialized and gzip-compressed once per knowledge-base version,
+served with strong ETags so clients and CDNs revalidate instead of refetching
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+# Browsers and CDNs keep the data this long, then revalidate with If-None-Match
+CONDITIONS_MAX_AGE = int(os.environ.get("CONDITIONS_MAX_AGE", 3600))
+CACHE_CONTROL = f"public, max-age={CONDITIONS_MAX_AGE}, stale-while-revalidate={24 * 3600}"
+
+
+class SerializedDocument:
+    """One JSON body in identity and gzip encodings, each with its own strong ETag"""
+    __slots__ = ("body", "gzip_body", "etag", "gzip_etag")
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        # mtime=0 keeps the compressed bytes (and so the ETag) identical across processes
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    def matches(self, if_none_match):
+        """True if an If-None-Match header names either representation (or is *)"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+
+class ConditionsCatalog:
+    def __init__(self, knowledge_base):
+        self.knowledge_base = knowledge_base
+        self.version = knowledge_base.version
+        database = knowledge_base.medical_database
+
+        self.index = SerializedDocument({
+            "total_conditions": len(database),
+            "conditions": [info["name"] for info in database.values()],
+            "details": [
+                {"id": condition_id, "name": info["name"], "severity": info["severity"]}
+                for condition_id, info in database.items()
+            ],
+            "version": self.version,
+            "system": "Rule-Based Medical Knowledge AI"
+        })
+        self.conditions = {
+            condition_id: SerializedDocument({
+                "id": condition_id,
+                "name": info["name"],
+                "symptoms": info["symptoms"],
+                "related_keywords": info["related_keywords"],
+                "causes": info["causes"],
+                "advice": info["advice"],
+                "duration": info["duration"],
+                "when_to_see_doctor": info["when_to_see_doctor"],
+                "severity": info["severity"],
+                "severity_description": knowledge_base.SEVERITY_DESCRIPTIONS.get(info["severity"]),
+                "version": self.version
+            })
+            for condition_id, info in database.items()
+        }
+
+
+class CatalogCache:
+    """Hands out the catalog for the live knowledge base, rebuilding only after a swap"""
+
+    def __init__(self):
+        self._catalog = None
+        # Built by the reloader thread before a swap, so the first request after it
+        # does not serialize and compress every condition on the event loop
+        self._prepared = None
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def prepare(self, knowledge_base):
+        """Build the catalog for a knowledge base that is about to be swapped in"""
+        catalog = ConditionsCatalog(knowledge_base)
+        with self._lock:
+            self._prepared = catalog
+            self.builds += 1
+
+    def get(self, knowledge_base):
+        catalog = self._catalog
+        if catalog is not None and catalog.knowledge_base is knowledge_base:
+            return catalog
+        with self._lock:
+            catalog = self._catalog
+            if catalog is None or catalog.knowledge_base is not knowledge_base:
+                prepared = self._prepared
+                if prepared is not None and prepared.knowledge_base is knowledge_base:
+                    catalog, self._prepared = prepared, None
+                else:
+                    catalog = ConditionsCatalog(knowledge_base)
+                    self.builds += 1
+                self._catalog = catalog
+        return catalog
+
+
+# Create global instance
+catalog_cache = CatalogCache()
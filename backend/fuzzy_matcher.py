@@ -0,0 +1,206 @@
+"""
+Typo-Tolerant Word Correction (character trigram index)
+Maps misspelled message words ("hedache", "diarhea", "throt") onto knowledge-base words
+so the exact phrase matcher can find them. A correction keeps the first letter (typos
+rarely hit it, and "never" must not become "fever"); real words that are still one edit
+from a symptom word ("worse" / "worst", "sure" / "sore") are protected: the data file lists
+a few and data/common_words.txt holds everyday English, inflections included by stem
+"""
+
+import os
+import re
+import sys
+from array import array
+from collections import Counter
+from itertools import chain
+
+TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)?")
+
+DEFAULT_COMMON_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "common_words.txt")
+
+# Endings stripped to find the stem of an inflected word ("selling" -> "sell", "paused" -> "pause")
+INFLECTION_SUFFIXES = ("ing", "ed", "es", "er", "ly", "s", "d")
+
+
+def load_common_words(path=DEFAULT_COMMON_WORDS_PATH):
+    """Everyday words that are never corrected, one per line ('#' starts a comment)"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps count as one edit), or limit + 1 if above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    # A shared prefix or suffix never costs an edit; only the differing middle goes through the table
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        distance = len(a) + len(b)
+        return distance if distance <= limit else limit + 1
+    if limit == 1:
+        # One substitution or one adjacent swap is all that can remain
+        if len(a) == len(b) == 1 or (len(a) == len(b) == 2 and a[0] == b[1] and a[1] == b[0]):
+            return 1
+        return 2
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        # Every later row is at least this row's minimum
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+class FuzzyMatcher:
+    # Words shorter than this are never corrected ("bp", "hot", "ear")
+    MIN_WORD_LENGTH = 4
+    # Words at least this long may be two edits away
+    TWO_EDIT_LENGTH = 9
+    # Candidates (best trigram overlap first) checked with edit distance per word
+    MAX_CANDIDATES = 8
+    # Posting lists longer than this (trigrams most words share) are skipped,
+    # which bounds the work per word however large the vocabulary grows
+    MAX_POSTINGS = 64
+    # Remembered corrections; common filler words are looked up once
+    CACHE_SIZE = 50000
+
+    def __init__(self, phrases, protected_words=()):
+        words = []
+        for phrase in phrases:
+            # Interned: a one-word phrase and its vocabulary word are the same string
+            words.extend(map(sys.intern, TOKEN_PATTERN.findall(phrase)))
+        self.vocabulary = [word for word in dict.fromkeys(words) if len(word) >= self.MIN_WORD_LENGTH]
+        # Known words are left alone: vocabulary words and protected everyday words
+        self._protected = frozenset(protected_words)
+        self._known = frozenset(words) | self._protected
+
+        # (trigram, word length, first letter) -> word ids: a query only reads lists
+        # it could match, which keeps them short as the vocabulary grows
+        index = {}
+        for word_id, word in enumerate(self.vocabulary):
+            for trigram in _trigrams(word):
+                index.setdefault((trigram, len(word), word[0]), []).append(word_id)
+        # Packed word ids: reading a list touches no per-entry int objects
+        self._index = {key: array("i", word_ids) for key, word_ids in index.items()}
+        self._cache = {}
+
+    def _max_edits(self, word):
+        return 2 if len(word) >= self.TWO_EDIT_LENGTH else 1
+
+    def correct_word(self, word):
+        """The closest vocabulary word within the edit budget, or None"""
+        if word in self._known or len(word) < self.MIN_WORD_LENGTH:
+            return None
+        cached = self._cache.get(word, False)
+        if cached is not False:
+            return cached
+        return self._lookup(word)
+
+    def _lookup(self, word):
+        best = None if self._inflects_protected(word) else self._closest(word)
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[word] = best
+        return best
+
+    def _inflects_protected(self, word):
+        """True for an inflection of a protected word ("hearing", "stopped", "confuses")"""
+        protected = self._protected
+        for suffix in INFLECTION_SUFFIXES:
+            if not word.endswith(suffix):
+                continue
+            stem = word[:-len(suffix)]
+            if len(stem) < 3:
+                continue
+            # "paused" -> "pause", "stopped" -> "stop"
+            if stem in protected or stem + "e" in protected or (stem[-1] == stem[-2] and stem[:-1] in protected):
+                return True
+        return False
+
+    def _closest(self, word):
+        max_edits = self._max_edits(word)
+        trigrams = _trigrams(word)
+        # An edit destroys at most three trigrams (an adjacent swap four)
+        min_shared = max(1, len(trigrams) - 3 * max_edits - 1)
+
+        # Shared-trigram counts for every word of a reachable length (counted in C by Counter)
+        index = self._index
+        first = word[0]
+        postings = []
+        for length in range(len(word) - max_edits, len(word) + max_edits + 1):
+            skipped = 0
+            for trigram in trigrams:
+                word_ids = index.get((trigram, length, first))
+                if word_ids is None:
+                    continue
+                if len(word_ids) > self.MAX_POSTINGS:
+                    skipped += 1
+                else:
+                    postings.append(word_ids)
+            # A skipped list may have held the answer, so it counts as shared
+            min_shared = min(min_shared, max(1, len(trigrams) - 3 * max_edits - 1 - skipped))
+        shared = Counter(chain.from_iterable(postings))
+
+        candidates = sorted(
+            [word_id for word_id, count in shared.items() if count >= min_shared],
+            key=shared.__getitem__, reverse=True
+        )[:self.MAX_CANDIDATES]
+
+        best, best_distance = None, max_edits + 1
+        for word_id in candidates:
+            candidate = self.vocabulary[word_id]
+            distance = bounded_edit_distance(word, candidate, min(max_edits, best_distance - 1))
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+                if distance == 1:
+                    break
+        return best
+
+    def correct(self, text):
+        """text with misspelled words replaced, or None if nothing needed correcting"""
+        known, cache, min_length = self._known, self._cache, self.MIN_WORD_LENGTH
+        corrections = None
+
+        for word in TOKEN_PATTERN.findall(text):
+            if word in known or len(word) < min_length:
+                continue
+            correction = cache.get(word, False)
+            if correction is False:
+                correction = self._lookup(word)
+            if correction is not None:
+                if corrections is None:
+                    corrections = {}
+                corrections[word] = correction
+
+        if corrections is None:
+            return None
+        return TOKEN_PATTERN.sub(lambda match: corrections.get(match.group(), match.group()), text)
+
+    def __len__(self):
+        return len(self.vocabulary)
@@ -0,0 +1,103 @@
+"""
+Knowledge Base Hot Reload
+Watches the knowledge-base data file and swaps in a freshly compiled instance
+"""
+
+import os
+import threading
+import time
+
+import medical_knowledge
+from conditions_catalog import catalog_cache
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, MedicalKnowledgeBase
+
+
+def install_knowledge_base(knowledge_base):
+    """Make knowledge_base the live instance for medical_kb and medical_ai"""
+    from advanced_medical_ai import medical_ai
+
+    # Rebinding a name is atomic: each request reads the attribute once and
+    # keeps using that fully built instance until it finishes.
+    medical_knowledge.medical_kb = knowledge_base
+    medical_ai.set_knowledge_base(knowledge_base)
+
+
+class KnowledgeBaseReloader:
+    def __init__(self, path=DEFAULT_KNOWLEDGE_BASE_PATH, poll_interval=5.0, on_swap=install_knowledge_base):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self._last_signature = self._signature()
+        self._stop = threading.Event()
+        self._thread = None
+        self._reload_lock = threading.Lock()
+
+        # Status
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_at = None
+
+    @classmethod
+    def from_environment(cls):
+        """Poll interval from KNOWLEDGE_BASE_POLL_SECONDS (0 disables watching)"""
+        return cls(poll_interval=float(os.environ.get("KNOWLEDGE_BASE_POLL_SECONDS", 5)))
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def start(self):
+        if self.poll_interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="kb-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            signature = self._signature()
+            if signature is not None and signature != self._last_signature:
+                self._last_signature = signature
+                self.reload()
+
+    def reload(self):
+        """Validate and compile the data file, then swap it in; returns True on success"""
+        with self._reload_lock:
+            try:
+                # Everything is built off to the side; the live instance is untouched until the swap
+                knowledge_base = MedicalKnowledgeBase.from_file(self.path)
+                knowledge_base.warm_templates()
+                catalog_cache.prepare(knowledge_base)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ Knowledge base reload failed, keeping current version: {self.last_error}")
+                return False
+
+            self.on_swap(knowledge_base)
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload_at = time.time()
+            print(f"🔄 Knowledge base reloaded: version {knowledge_base.version} "
+                  f"({len(knowledge_base.medical_database)} conditions)")
+            return True
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "watching": self._thread is not None,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_at": self.last_reload_at
+        }
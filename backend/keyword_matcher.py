@@ -0,0 +1,116 @@
+"""
+Multi-Pattern Keyword Matcher (Aho-Corasick)
+Finds every knowledge-base phrase in a message with a single scan; aliases (synonyms in
+other languages) are compiled into the same automaton and report the phrase they stand for
+"""
+
+import sys
+import unicodedata
+from collections import deque
+
+
+def _is_word_character(ch):
+    # Vowel signs and viramas (category M) belong to a Sinhala / Tamil word, they are not a boundary
+    return ch.isalnum() or ch == "_" or unicodedata.category(ch)[0] == "M"
+
+
+def _occurs_as_word(text, phrase):
+    """True if phrase occurs in text with no word character directly before or after it"""
+    start = text.find(phrase)
+    while start != -1:
+        end = start + len(phrase)
+        if ((start == 0 or not _is_word_character(text[start - 1]))
+                and (end == len(text) or not _is_word_character(text[end]))):
+            return True
+        start = text.find(phrase, start + 1)
+    return False
+
+
+class KeywordMatcher:
+    def __init__(self, phrases, aliases=None, whole_word=()):
+        # Keep first-seen order, drop duplicates and empty phrases
+        self.phrases = [p for p in dict.fromkeys(phrases) if p]
+        known = set(self.phrases)
+        # alias -> phrase it reports; an alias that is itself a phrase needs no entry
+        self.aliases = {alias: phrase for alias, phrase in (aliases or {}).items() if alias and alias not in known}
+        # Whole-word aliases are emitted as a marker ("\0" + alias) and confirmed after the scan
+        self._bounded = {
+            "\0" + alias: (alias, self.aliases[alias]) for alias in whole_word if alias in self.aliases
+        }
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._build()
+
+    def _build(self):
+        """Build the trie, failure links and merged output sets"""
+        goto, output = self._goto, self._output
+        patterns = [(phrase, phrase) for phrase in self.phrases]
+        for alias, phrase in self.aliases.items():
+            patterns.append((alias, "\0" + alias if "\0" + alias in self._bounded else phrase))
+
+        for pattern, emitted in patterns:
+            state = 0
+            for ch in pattern:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    self._fail.append(0)
+                    output.append(())
+                state = next_state
+            if emitted not in output[state]:
+                output[state] = output[state] + (emitted,)
+
+        # Breadth-first pass so every failure target is finished before use
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                if output[self._fail[next_state]]:
+                    output[next_state] = output[next_state] + output[self._fail[next_state]]
+
+    def scan(self, text):
+        """Return the set of phrases that occur anywhere in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        hits = set()
+        state = 0
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                hits.update(output[state])
+
+        if self._bounded:
+            markers = self._bounded.keys() & hits
+            if markers:
+                hits -= markers
+                for marker in markers:
+                    alias, phrase = self._bounded[marker]
+                    if _occurs_as_word(text, alias):
+                        hits.add(phrase)
+
+        return frozenset(hits)
+
+    def states(self):
+        return len(self._goto)
+
+    def memory_bytes(self):
+        """Approximate bytes held by the automaton tables and alias entries"""
+        size = sys.getsizeof(self._goto) + sys.getsizeof(self._fail) + sys.getsizeof(self._output)
+        size += sum(sys.getsizeof(edges) for edges in self._goto)
+        size += sum(sys.getsizeof(emitted) for emitted in self._output if emitted)
+        size += sys.getsizeof(self.aliases) + sum(sys.getsizeof(alias) for alias in self.aliases)
+        return size
+
+    def __len__(self):
+        return len(self.phrases)
@@ -2,524 +2,555 @@
 Advanced Medical Knowledge Base - Rule-Based AI
 Provides validated medical advice for common conditions
 FIXED: Headache now correctly identifies tension headache instead of influenza
+Conditions, keywords and weights are loaded from data/knowledge_base.json
 """
 
+import gc
+import hashlib
+import json
+import os
+import pickle
+import sys
+from fuzzy_matcher import DEFAULT_COMMON_WORDS_PATH, FuzzyMatcher, load_common_words
+from keyword_matcher import KeywordMatcher
+from rule_compiler import compile_rules
+from synonyms import SynonymTable, normalize_text
+
+DEFAULT_KNOWLEDGE_BASE_PATH = os.environ.get(
+    "KNOWLEDGE_BASE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "knowledge_base.json")
+)
+
+# Compiled snapshot written by build_snapshot.py (indexes, rule tables, rendered templates)
+DEFAULT_SNAPSHOT_PATH = os.environ.get(
+    "KNOWLEDGE_BASE_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "knowledge_base.snapshot")
+)
+# Bump when the compiled structures change shape so old snapshots are rebuilt
+SNAPSHOT_FORMAT = 7
+
+SUPPORTED_SCHEMA_VERSIONS = (2,)
+
+# Typo-tolerant matching ("hedache", "sore throt"); FUZZY_MATCHING=0 turns it off
+FUZZY_MATCHING = os.environ.get("FUZZY_MATCHING", "1") != "0"
+
+def load_knowledge_data(path=DEFAULT_KNOWLEDGE_BASE_PATH):
+    """Read and validate a knowledge-base data file"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    validate_knowledge_data(data)
+    return data
+
+def _require(condition, message):
+    if not condition:
+        raise ValueError(f"Invalid knowledge base: {message}")
+
+def _is_phrase_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) and item for item in value)
+
+def validate_knowledge_data(data):
+    """Raise ValueError if the data does not describe a complete, consistent knowledge base"""
+    _require(isinstance(data, dict), "top level must be an object")
+    _require(data.get("schema_version") in SUPPORTED_SCHEMA_VERSIONS,
+             f"unsupported schema_version {data.get('schema_version')!r}")
+    _require(isinstance(data.get("version"), str) and data["version"], "version must be a non-empty string")
+    _require(_is_phrase_list(data.get("emergency_keywords")) and data["emergency_keywords"],
+             "emergency_keywords must be a non-empty list of phrases")
+    
+    conditions = data.get("conditions")
+    _require(isinstance(conditions, dict) and conditions, "conditions must be a non-empty object")
+    for condition_id, info in conditions.items():
+        _require(isinstance(info, dict), f"condition {condition_id!r} must be an object")
+        for field in ("name", "causes", "duration", "when_to_see_doctor"):
+            _require(isinstance(info.get(field), str) and info[field], f"{condition_id}.{field} must be a non-empty string")
+        _require(_is_phrase_list(info.get("symptoms")) and info["symptoms"], f"{condition_id}.symptoms must be a non-empty list")
+        _require(_is_phrase_list(info.get("advice")), f"{condition_id}.advice must be a list of strings")
+        _require(_is_phrase_list(info.get("related_keywords", [])), f"{condition_id}.related_keywords must be a list of phrases")
+        _require(info.get("severity") in MedicalKnowledgeBase.SEVERITY_DESCRIPTIONS,
+                 f"{condition_id}.severity must be one of {', '.join(MedicalKnowledgeBase.SEVERITY_DESCRIPTIONS)}")
+    
+    scoring = data.get("scoring")
+    _require(isinstance(scoring, dict), "scoring must be an object")
+    for field in ("default_symptom_weight", "name_weight", "related_keyword_weight",
+                  "min_condition_score", "min_top_score", "max_matches"):
+        _require(isinstance(scoring.get(field), int), f"scoring.{field} must be an integer")
+    _require(isinstance(scoring.get("symptom_weights"), dict)
+             and all(isinstance(weight, int) for weight in scoring["symptom_weights"].values()),
+             "scoring.symptom_weights must map phrases to integers")
+    overrides = scoring.get("condition_symptom_weights")
+    _require(isinstance(overrides, dict), "scoring.condition_symptom_weights must be an object")
+    for condition_id, weights in overrides.items():
+        _require(condition_id in conditions, f"scoring override for unknown condition {condition_id!r}")
+        _require(isinstance(weights, dict) and all(isinstance(weight, int) for weight in weights.values()),
+                 f"scoring.condition_symptom_weights.{condition_id} must map phrases to integers")
+    
+    analyzers = data.get("analyzers")
+    _require(isinstance(analyzers, dict), "analyzers must be an object")
+    for name, analyzer in analyzers.items():
+        _require(isinstance(analyzer, dict), f"analyzers.{name} must be an object")
+        _require(_is_phrase_list(analyzer.get("lead_symptoms")), f"analyzers.{name}.lead_symptoms must be a list of phrases")
+        _require(isinstance(analyzer.get("max_matches"), int), f"analyzers.{name}.max_matches must be an integer")
+        _require(isinstance(analyzer.get("rules"), list) and analyzer["rules"], f"analyzers.{name}.rules must be a non-empty list")
+        for i, rule in enumerate(analyzer["rules"]):
+            where = f"analyzers.{name}.rules[{i}]"
+            _require(isinstance(rule, dict), f"{where} must be an object")
+            _require(rule.get("condition") in conditions, f"{where} refers to unknown condition {rule.get('condition')!r}")
+            _require(isinstance(rule.get("indicators"), list) and all(
+                isinstance(pair, list) and len(pair) == 2 and isinstance(pair[0], str) and pair[0]
+                and isinstance(pair[1], int)
+                for pair in rule["indicators"]
+            ), f"{where}.indicators must be a list of [phrase, weight] pairs")
+            for field in ("base_score", "min_indicator_score"):
+                _require(isinstance(rule.get(field), int), f"{where}.{field} must be an integer")
+            for field in ("add_indicator_score", "report_indicators"):
+                _require(isinstance(rule.get(field, True), bool), f"{where}.{field} must be true or false")
+    
+    routing = data.get("routing")
+    _require(isinstance(routing, list), "routing must be a list")
+    for i, route in enumerate(routing):
+        _require(isinstance(route, dict) and isinstance(route.get("trigger"), str) and route["trigger"],
+                 f"routing[{i}].trigger must be a non-empty string")
+        _require(route.get("analyzer") in analyzers, f"routing[{i}] refers to unknown analyzer {route.get('analyzer')!r}")
+    
+    triggers = data.get("general_advice_triggers")
+    _require(isinstance(triggers, dict), "general_advice_triggers must be an object")
+    for group, words in triggers.items():
+        _require(group in MedicalKnowledgeBase.GENERAL_ADVICE_SECTIONS, f"no general advice section named {group!r}")
+        _require(_is_phrase_list(words), f"general_advice_triggers.{group} must be a list of phrases")
+    
+    fuzzy = data.get("fuzzy_matching", {})
+    _require(isinstance(fuzzy, dict), "fuzzy_matching must be an object")
+    _require(_is_phrase_list(fuzzy.get("protected_words", [])), "fuzzy_matching.protected_words must be a list of words")
+    
+    synonyms = data.get("synonyms", {})
+    _require(isinstance(synonyms, dict), "synonyms must be an object")
+    known = known_phrases(data)
+    seen = {}
+    for code, table in synonyms.items():
+        where = f"synonyms.{code}"
+        _require(isinstance(table, dict) and isinstance(table.get("name"), str) and table["name"],
+                 f"{where}.name must be a non-empty string")
+        _require(isinstance(table.get("whole_word", False), bool), f"{where}.whole_word must be true or false")
+        phrases = table.get("phrases")
+        _require(isinstance(phrases, dict) and all(
+            isinstance(surface, str) and surface.strip() and isinstance(phrase, str)
+            for surface, phrase in phrases.items()
+        ), f"{where}.phrases must map phrases to knowledge-base phrases")
+        for surface, phrase in phrases.items():
+            _require(phrase in known, f"{where}: {surface!r} stands for {phrase!r}, which no condition or rule uses")
+            # The same words may appear in several languages, but must mean the same thing in each
+            normalized = normalize_text(surface).strip()
+            _require(seen.setdefault(normalized, phrase) == phrase,
+                     f"{where}: {surface!r} stands for {phrase!r} here but {seen[normalized]!r} elsewhere")
+
+def known_phrases(data):
+    """Every phrase the matcher is built from, which synonyms may stand for"""
+    phrases = set(data["emergency_keywords"])
+    for info in data["conditions"].values():
+        phrases.update(info["symptoms"])
+        phrases.update(info.get("related_keywords", []))
+        phrases.add(info["name"].lower())
+    for analyzer in data["analyzers"].values():
+        for rule in analyzer["rules"]:
+            phrases.update(phrase for phrase, _ in rule["indicators"])
+    phrases.update(route["trigger"] for route in data["routing"])
+    for words in data["general_advice_triggers"].values():
+        phrases.update(words)
+    return phrases
+
+class ConditionRecord:
+    """One condition, slotted and with tuple fields; read like the data file's dict (info["name"])"""
+    __slots__ = ("name", "symptoms", "causes", "advice", "duration", "when_to_see_doctor", "severity",
+                 "related_keywords")
+    
+    def __init__(self, info):
+        intern = sys.intern
+        # Phrases are interned so the database, postings, automaton and fuzzy vocabulary share one copy
+        self.name = intern(info["name"])
+        self.symptoms = tuple(map(intern, info["symptoms"]))
+        self.causes = info["causes"]
+        self.advice = tuple(info["advice"])
+        self.duration = info["duration"]
+        self.when_to_see_doctor = info["when_to_see_doctor"]
+        self.severity = intern(info["severity"])
+        self.related_keywords = tuple(map(intern, info.get("related_keywords", ())))
+    
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
 class MedicalKnowledgeBase:
-    def __init__(self):
-        self.medical_database = self._build_knowledge_base()
+    # Pre-rendered general advice text, selected by the data file's general_advice_triggers
+    GENERAL_ADVICE_HEADER = (
+        "🤖 **Suwa Setha Hospital Health Assistant**\n\n"
+        "Based on your symptoms, here's general health guidance:\n\n"
+    )
+    GENERAL_ADVICE_SECTIONS = {
+        "fever": (
+            "• For fever: Rest, stay hydrated, monitor temperature\n"
+            "• Seek care if fever exceeds 102°F or persists beyond 3 days\n\n"
+        ),
+        "pain": (
+            "• For pain: Rest affected area, consider OTC pain relievers\n"
+            "• Seek care if pain is severe, sudden, or worsening\n\n"
+        ),
+        "respiratory": (
+            "• For respiratory symptoms: Stay hydrated, use humidifier\n"
+            "• Seek care if experiencing difficulty breathing\n\n"
+        ),
+        "digestive": (
+            "• For digestive symptoms: BRAT diet, clear fluids\n"
+            "• Seek care if signs of dehydration or severe pain\n\n"
+        )
+    }
+    GENERAL_WELLNESS_TEXT = (
+        # General wellness tips
+        "\n**General Wellness Recommendations:**\n"
+        "1. Stay hydrated with water throughout the day\n"
+        "2. Ensure adequate rest and sleep\n"
+        "3. Monitor symptoms for changes or worsening\n"
+        "4. Avoid self-medication without professional advice\n"
+        "5. Consider keeping a symptom diary\n\n"
+        "**When to Seek Medical Care:**\n"
+        "• Symptoms are severe or worsening\n"
+        "• New or concerning symptoms develop\n"
+        "• Symptoms persist beyond expected duration\n"
+        "• You have underlying health conditions\n\n"
+    )
+    
+    # Reply when the time budget ran out after the emergency check (see triage_deadline.py)
+    DEGRADED_HEADER = (
+        "⏱️ **Suwa Setha Hospital Health Assistant - Quick Response**\n\n"
+        "Your message was checked for emergency warning signs and none were found. "
+        "The detailed symptom analysis took longer than allowed, so this is a shortened answer. "
+        "Please send your message again in a moment for full guidance.\n"
+    )
+    
+    # Condition pages at these severities carry the emergency warning
+    URGENT_SEVERITIES = ("severe", "moderate_severe")
+    SELF_CARE_HEADING = "\n**Self-Care Recommendations:**\n"
+    
+    SEVERITY_DESCRIPTIONS = {
+        "mild": "Generally manageable with self-care",
+        "moderate": "May require medical evaluation",
+        "severe": "Requires medical attention",
+        "mild_moderate": "Monitor closely, seek care if worsens",
+        "moderate_severe": "Medical evaluation recommended"
+    }
+    
+    def __init__(self, data=None, fuzzy=None):
+        if data is None:
+            data = load_knowledge_data()
+        else:
+            validate_knowledge_data(data)
+        
+        self.version = data["version"]
+        self.medical_database = self._build_knowledge_base(data)
+        self.emergency_keywords = list(data["emergency_keywords"])
+        self.scoring = data["scoring"]
+        # Weights, thresholds, routing and analyzer rules compiled into one decision table
+        self.rules = compile_rules(data, self.medical_database)
+        self.general_advice_triggers = data["general_advice_triggers"]
+        # Sinhala, Tamil and romanized synonyms, compiled into the matcher below
+        self.synonyms = SynonymTable(data.get("synonyms", {}))
+        
         self.safety_disclaimer = "⚠️ EDUCATIONAL TOOL ONLY. Consult Suwa Setha Hospital or healthcare provider for medical advice."
         self.emergency_advice = "🚨 SEEK IMMEDIATE MEDICAL ATTENTION if experiencing: chest pain, difficulty breathing, severe pain, confusion, or loss of consciousness."
+        self.matcher = self._build_matcher()
+        self.emergency_matcher = self._build_emergency_matcher()
+        self.fuzzy_matcher = None
+        if FUZZY_MATCHING if fuzzy is None else fuzzy:
+            protected_words = data.get("fuzzy_matching", {}).get("protected_words", [])
+            self.fuzzy_matcher = FuzzyMatcher(
+                self.matcher.phrases, protected_words + self.synonyms.words() + load_common_words()
+            )
+        self._emergency_rank = {keyword: rank for rank, keyword in enumerate(self.emergency_keywords)}
+        # One-word emergencies a corrected word alone may not raise ("poisson" is not "poison")
+        self._single_word_emergencies = frozenset(
+            keyword for keyword in self.emergency_keywords if " " not in keyword
+        )
+        
+        # Static response text, rendered once instead of on every request and kept as UTF-8
+        # (one emoji would make Python store a whole page at four bytes per character). Measured
+        # at 50k conditions: 1.4 KB per condition as bytes vs 4.6 KB as str (151 MiB in total),
+        # for a ~1 us decode per reply (benchmarks/bench_memory.py)
+        self._advice_templates = {}
+        self._advice_excerpts = {}
+        self._general_advice_footer = (
+            self.GENERAL_WELLNESS_TEXT + self.emergency_advice + "\n\n" + self.safety_disclaimer
+        )
+        self.degraded_response = self.DEGRADED_HEADER + self._general_advice_footer
+    
+    def _build_matcher(self):
+        """Compile every keyword phrase used by the analysis stages into one automaton"""
+        phrases = list(self.emergency_keywords)
+        phrases.extend(self.rules.phrases())
+        
+        for words in self.general_advice_triggers.values():
+            phrases.extend(words)
+        
+        return KeywordMatcher(phrases, self.synonyms.aliases, self.synonyms.whole_word)
     
-    def _build_knowledge_base(self):
+    def _build_emergency_matcher(self):
+        """A small automaton of emergency keywords (and their synonyms) for the admission pre-screen"""
+        emergencies = set(self.emergency_keywords)
+        aliases = {alias: phrase for alias, phrase in self.synonyms.aliases.items() if phrase in emergencies}
+        return KeywordMatcher(self.emergency_keywords, aliases, self.synonyms.whole_word)
+    
+    def prescreen_emergency(self, symptoms_text):
+        """True if the message names an emergency keyword; exact matches only, cheap enough for the event loop"""
+        return bool(self.emergency_matcher.scan(normalize_text(symptoms_text)))
+    
+    def scan(self, symptoms_text):
+        """Scan a message once and return every knowledge-base phrase it contains (synonyms included)"""
+        text = normalize_text(symptoms_text)
+        hits = self.matcher.scan(text)
+        
+        # Misspelled words are corrected against the knowledge-base vocabulary and rescanned
+        if self.fuzzy_matcher is not None:
+            corrected = self.fuzzy_matcher.correct(text)
+            if corrected is not None:
+                # A multi-word emergency ("chest pian") is confirmed by its uncorrected neighbours
+                hits = hits | (self.matcher.scan(corrected) - self._single_word_emergencies)
+        
+        return hits
+    
+    @classmethod
+    def from_file(cls, path):
+        """Build a knowledge base from a data file (validated before anything is compiled)"""
+        return cls(load_knowledge_data(path))
+    
+    def _build_knowledge_base(self, data):
         """Comprehensive medical knowledge database"""
         return {
-            # ========== RESPIRATORY CONDITIONS ==========
-            "common_cold": {
-                "name": "Common Cold",
-                "symptoms": ["runny nose", "sneezing", "sore throat", "mild cough", "congestion", "mild fatigue"],
-                "causes": "Viral infection (rhinovirus, coronavirus)",
-                "advice": [
-                    "Rest and stay hydrated with warm fluids",
-                    "Use saline nasal spray for congestion",
-                    "Gargle with warm salt water for sore throat",
-                    "Over-the-counter cold medications as directed",
-                    "Use a humidifier to ease breathing"
-                ],
-                "duration": "7-10 days",
-                "when_to_see_doctor": "If symptoms last more than 10 days, fever exceeds 101°F, or breathing difficulties occur",
-                "severity": "mild"
-            },
-            
-            "influenza": {
-                "name": "Influenza (Flu)",
-                "symptoms": ["high fever", "body aches", "chills", "severe fatigue", "headache", "dry cough"],
-                "causes": "Influenza virus",
-                "advice": [
-                    "Rest and plenty of fluids",
-                    "Antiviral medication (if prescribed early)",
-                    "Over-the-counter fever reducers (acetaminophen, ibuprofen)",
-                    "Stay home to prevent spreading",
-                    "Annual flu vaccination for prevention"
-                ],
-                "duration": "1-2 weeks",
-                "when_to_see_doctor": "High fever, difficulty breathing, chest pain, or symptoms worsening",
-                "severity": "moderate"
-            },
-            
-            "bronchitis": {
-                "name": "Acute Bronchitis",
-                "symptoms": ["persistent cough", "mucus production", "chest discomfort", "mild fever", "fatigue"],
-                "causes": "Viral infection (usually), sometimes bacterial",
-                "advice": [
-                    "Increase fluid intake to thin mucus",
-                    "Use honey in warm tea to soothe cough",
-                    "Avoid smoke and irritants",
-                    "Over-the-counter cough suppressants if needed",
-                    "Rest to support immune system"
-                ],
-                "duration": "3 weeks typically",
-                "when_to_see_doctor": "Fever over 100.4°F, blood in mucus, or symptoms beyond 3 weeks",
-                "severity": "moderate"
-            },
-            
-            # ========== GASTROINTESTINAL ==========
-            "gastroenteritis": {
-                "name": "Gastroenteritis (Stomach Flu)",
-                "symptoms": ["diarrhea", "nausea", "vomiting", "abdominal cramps", "low-grade fever"],
-                "causes": "Viral or bacterial infection, food poisoning",
-                "advice": [
-                    "Oral rehydration solution or clear fluids",
-                    "BRAT diet (bananas, rice, applesauce, toast)",
-                    "Avoid dairy, fatty, or spicy foods",
-                    "Rest the digestive system with small, frequent meals",
-                    "Wash hands frequently to prevent spread"
-                ],
-                "duration": "1-3 days typically",
-                "when_to_see_doctor": "Signs of dehydration, blood in stool, fever over 102°F, or symptoms beyond 3 days",
-                "severity": "moderate"
-            },
-            
-            "acid_reflux": {
-                "name": "GERD/Acid Reflux",
-                "symptoms": ["heartburn", "regurgitation", "chest pain", "difficulty swallowing", "chronic cough"],
-                "causes": "Stomach acid flowing back into esophagus",
-                "advice": [
-                    "Eat smaller, more frequent meals",
-                    "Avoid trigger foods (spicy, fatty, citrus, chocolate)",
-                    "Don't lie down for 2-3 hours after eating",
-                    "Elevate head of bed 6-8 inches",
-                    "Over-the-counter antacids as needed"
-                ],
-                "duration": "Chronic condition",
-                "when_to_see_doctor": "Frequent symptoms, weight loss, severe pain, or difficulty swallowing",
-                "severity": "mild_moderate"
-            },
-            
-            # ========== NEUROLOGICAL ==========
-            "migraine": {
-                "name": "Migraine Headache",
-                "symptoms": ["severe headache", "sensitivity to light/sound", "nausea", "aura", "throbbing pain"],
-                "causes": "Neurological condition with various triggers",
-                "advice": [
-                    "Rest in dark, quiet room",
-                    "Cold compress on forehead or neck",
-                    "Stay hydrated",
-                    "Prescription migraine medications if diagnosed",
-                    "Identify and avoid triggers (stress, certain foods, lack of sleep)"
-                ],
-                "duration": "4-72 hours",
-                "when_to_see_doctor": "First migraine, change in pattern, or severe symptoms",
-                "severity": "moderate_severe"
-            },
-            
-            "tension_headache": {
-                "name": "Tension Headache",
-                "symptoms": ["band-like pressure around head", "tight neck muscles", "mild to moderate pain"],
-                "causes": "Muscle tension, stress, poor posture",
-                "advice": [
-                    "Gentle neck and shoulder stretches",
-                    "Stress reduction techniques",
-                    "Over-the-counter pain relievers (ibuprofen, acetaminophen)",
-                    "Apply heat to tense muscles",
-                    "Improve posture and take regular breaks"
-                ],
-                "duration": "30 minutes to several hours",
-                "when_to_see_doctor": "Frequent headaches, not relieved by OTC medications",
-                "severity": "mild_moderate"
-            },
-            
-            # ========== MUSCULOSKELETAL ==========
-            "back_pain": {
-                "name": "Non-Specific Back Pain",
-                "symptoms": ["lower back pain", "muscle stiffness", "limited mobility", "muscle spasms"],
-                "causes": "Muscle strain, poor posture, injury",
-                "advice": [
-                    "Gentle stretching and walking",
-                    "Apply ice first 48 hours, then heat",
-                    "Over-the-counter anti-inflammatories",
-                    "Improve posture and ergonomics",
-                    "Avoid heavy lifting and sudden movements"
-                ],
-                "duration": "Few days to weeks",
-                "when_to_see_doctor": "Severe pain, leg weakness, numbness, or bowel/bladder changes",
-                "severity": "mild_moderate"
-            },
-            
-            "arthritis": {
-                "name": "Osteoarthritis",
-                "symptoms": ["joint pain", "stiffness", "swelling", "reduced range of motion"],
-                "causes": "Joint wear and tear",
-                "advice": [
-                    "Low-impact exercise (swimming, cycling)",
-                    "Weight management to reduce joint stress",
-                    "Heat therapy for stiffness",
-                    "Over-the-counter pain relievers",
-                    "Assistive devices if needed"
-                ],
-                "duration": "Chronic condition",
-                "when_to_see_doctor": "Severe pain, joint deformity, or significant mobility loss",
-                "severity": "moderate"
-            },
-            
-            # ========== SKIN CONDITIONS ==========
-            "eczema": {
-                "name": "Atopic Dermatitis (Eczema)",
-                "symptoms": ["itchy skin", "red patches", "dry skin", "scaling", "inflammation"],
-                "causes": "Genetic, environmental triggers, immune system",
-                "advice": [
-                    "Moisturize regularly with fragrance-free creams",
-                    "Use mild, fragrance-free soaps",
-                    "Avoid known triggers (certain fabrics, soaps, foods)",
-                    "Cool compresses for itching",
-                    "Prescription creams for flare-ups"
-                ],
-                "duration": "Chronic with flare-ups",
-                "when_to_see_doctor": "Infected skin, severe symptoms, or not controlled with OTC treatments",
-                "severity": "mild_moderate"
-            },
-            
-            "acne": {
-                "name": "Acne Vulgaris",
-                "symptoms": ["pimples", "blackheads", "whiteheads", "oiliness", "inflammation"],
-                "causes": "Hormonal changes, bacteria, excess oil",
-                "advice": [
-                    "Gentle cleansing twice daily",
-                    "Oil-free, non-comedogenic products",
-                    "Don't pick or squeeze lesions",
-                    "Over-the-counter benzoyl peroxide or salicylic acid",
-                    "Healthy diet and stress management"
-                ],
-                "duration": "Variable, often teenage years",
-                "when_to_see_doctor": "Severe acne, scarring, or not responding to OTC treatments",
-                "severity": "mild_moderate"
-            },
-            
-            # ========== METABOLIC/CHRONIC ==========
-            "hypertension": {
-                "name": "High Blood Pressure",
-                "symptoms": ["often none", "headaches", "shortness of breath", "nosebleeds (rare)"],
-                "causes": "Various factors including diet, genetics, lifestyle",
-                "advice": [
-                    "Reduce sodium intake",
-                    "Regular aerobic exercise",
-                    "Maintain healthy weight",
-                    "Limit alcohol and caffeine",
-                    "Monitor blood pressure regularly"
-                ],
-                "duration": "Chronic condition",
-                "when_to_see_doctor": "New diagnosis, uncontrolled readings, or medication side effects",
-                "severity": "moderate_severe"
-            },
-            
-            "diabetes": {
-                "name": "Type 2 Diabetes",
-                "symptoms": ["increased thirst", "frequent urination", "fatigue", "blurred vision", "slow healing"],
-                "causes": "Insulin resistance, genetic, lifestyle factors",
-                "advice": [
-                    "Regular blood sugar monitoring",
-                    "Balanced diet with controlled carbohydrates",
-                    "Regular physical activity",
-                    "Medication adherence if prescribed",
-                    "Foot care and regular check-ups"
-                ],
-                "duration": "Chronic condition",
-                "when_to_see_doctor": "Abnormal blood sugar readings, new symptoms, or medication adjustments needed",
-                "severity": "moderate_severe"
-            },
-            
-            # ========== ALLERGIES ==========
-            "allergic_rhinitis": {
-                "name": "Hay Fever (Allergic Rhinitis)",
-                "symptoms": ["sneezing", "runny nose", "itchy eyes", "congestion", "postnasal drip"],
-                "causes": "Allergens (pollen, dust, pet dander)",
-                "advice": [
-                    "Avoid known allergens when possible",
-                    "Over-the-counter antihistamines",
-                    "Nasal corticosteroid sprays",
-                    "Saline nasal rinses",
-                    "Keep windows closed during high pollen seasons"
-                ],
-                "duration": "Seasonal or perennial",
-                "when_to_see_doctor": "Symptoms not controlled with OTC medications or affecting quality of life",
-                "severity": "mild_moderate"
-            }
+            sys.intern(condition_id): ConditionRecord(info) for condition_id, info in data["conditions"].items()
         }
     
-    def identify_condition(self, symptoms_text):
+    def identify_condition(self, symptoms_text, hits=None):
         """FIXED: Advanced symptom analysis with better headache detection"""
-        symptoms = symptoms_text.lower()
-        matches = []
-        
-        # Special handling for headache complaints
-        if "headache" in symptoms:
-            return self._analyze_headache_case(symptoms_text)
+        if hits is None:
+            hits = self.scan(symptoms_text)
         
-        # General analysis for other symptoms
-        for condition_id, info in self.medical_database.items():
-            match_score = 0
-            symptom_matches = []
-            
-            # Check for symptom keywords with intelligent weighting
-            for symptom in info["symptoms"]:
-                if symptom in symptoms:
-                    # Different weights for different symptoms
-                    if symptom == "headache":
-                        if condition_id == "influenza":
-                            match_score += 1  # Low weight: headache alone ≠ flu
-                        elif condition_id in ["tension_headache", "migraine", "hypertension"]:
-                            match_score += 4  # High weight: primary symptom
-                        else:
-                            match_score += 2  # Medium weight
-                    elif symptom in ["high fever", "body aches", "chills"]:
-                        match_score += 3  # Important flu symptoms
-                    elif symptom in ["severe headache", "throbbing pain", "aura"]:
-                        match_score += 4  # Important migraine symptoms
-                    elif symptom in ["band-like pressure", "tight neck muscles"]:
-                        match_score += 4  # Important tension headache symptoms
-                    else:
-                        match_score += 2  # Regular symptoms
-                    
-                    symptom_matches.append(symptom)
-            
-            # Check for condition name mention (high priority)
-            if info["name"].lower() in symptoms:
-                match_score += 6
-            
-            # Check for related keywords
-            related_keywords = {
-                "common_cold": ["cold", "sniffles", "stuffy nose"],
-                "influenza": ["flu", "influenza", "body ache"],
-                "bronchitis": ["bronchitis", "chest cough"],
-                "gastroenteritis": ["stomach flu", "food poisoning", "vomiting"],
-                "acid_reflux": ["gerd", "heartburn", "indigestion"],
-                "migraine": ["migraine", "aura", "sensitivity light", "throbbing"],
-                "tension_headache": ["tension headache", "stress headache", "pressure head"],
-                "back_pain": ["backache", "lower back", "spinal"],
-                "arthritis": ["joint pain", "arthritic"],
-                "eczema": ["dermatitis", "skin rash", "itchy skin"],
-                "acne": ["pimples", "blackheads", "breakout"],
-                "hypertension": ["high blood pressure", "hypertension", "bp high"],
-                "diabetes": ["high sugar", "diabetic", "blood glucose"],
-                "allergic_rhinitis": ["hay fever", "allergies", "seasonal allergies"]
-            }
-            
-            if condition_id in related_keywords:
-                for keyword in related_keywords[condition_id]:
-                    if keyword in symptoms:
-                        match_score += 2
-            
-            # Only include meaningful matches
-            if match_score >= 3:
-                matches.append({
-                    "condition_id": condition_id,
-                    "name": info["name"],
-                    "match_score": match_score,
-                    "matched_symptoms": symptom_matches,
-                    "severity": info["severity"]
-                })
-        
-        # Sort by match score
-        matches.sort(key=lambda x: x["match_score"], reverse=True)
-        
-        # If no good matches, return general advice
-        if not matches or matches[0]["match_score"] < 4:
-            return []
-        
-        return matches[:3]
+        # Routed messages (e.g. headache complaints) go to their analyzer, the rest to weighted postings
+        return self.rules.evaluate(hits, self.medical_database)
     
-    def _analyze_headache_case(self, symptoms_text):
-        """Specialized logic for headache complaints"""
-        symptoms = symptoms_text.lower()
-        matches = []
-        
-        # Check what type of headache it might be
-        headache_type = "tension_headache"  # Default: most common
-        
-        # Migraine indicators
-        migraine_indicators = [
-            ("throbbing", 3), ("pulsating", 3), ("one side", 3), 
-            ("light sensitivity", 3), ("sound sensitivity", 3), 
-            ("aura", 4), ("visual disturbance", 3), ("nausea", 2), ("vomiting", 2)
-        ]
-        
-        # Tension headache indicators
-        tension_indicators = [
-            ("pressure", 3), ("tight", 3), ("band", 3), ("stress", 2), 
-            ("tension", 3), ("both sides", 2), ("mild to moderate", 2)
-        ]
-        
-        # Calculate scores
-        migraine_score = sum(score for indicator, score in migraine_indicators if indicator in symptoms)
-        tension_score = sum(score for indicator, score in tension_indicators if indicator in symptoms)
-        
-        # Also check for other conditions that include headache
-        other_conditions = []
-        
-        # Check for flu (needs additional symptoms)
-        flu_indicators = ["fever", "body aches", "chills", "fatigue", "cough"]
-        flu_count = sum(1 for indicator in flu_indicators if indicator in symptoms)
-        
-        # Check for sinus issues
-        sinus_indicators = ["sinus", "facial pressure", "congestion", "runny nose"]
-        sinus_count = sum(1 for indicator in sinus_indicators if indicator in symptoms)
-        
-        # Determine primary headache type
-        if migraine_score >= 4:
-            matches.append({
-                "condition_id": "migraine",
-                "name": "Migraine Headache",
-                "match_score": 5 + migraine_score,
-                "matched_symptoms": ["headache"] + [ind for ind, _ in migraine_indicators if ind in symptoms],
-                "severity": "moderate_severe"
-            })
-        
-        # Always include tension headache (most common)
-        matches.append({
-            "condition_id": "tension_headache",
-            "name": "Tension Headache",
-            "match_score": 5 + tension_score,
-            "matched_symptoms": ["headache"] + [ind for ind, _ in tension_indicators if ind in symptoms],
-            "severity": "mild_moderate"
-        })
-        
-        # Include flu only if there are other flu symptoms
-        if flu_count >= 2:
-            matches.append({
-                "condition_id": "influenza",
-                "name": "Influenza (Flu)",
-                "match_score": 3 + flu_count,
-                "matched_symptoms": ["headache"] + [ind for ind in flu_indicators if ind in symptoms],
-                "severity": "moderate"
-            })
-        
-        # Include hypertension if mentioned
-        if any(word in symptoms for word in ["high blood pressure", "hypertension", "bp"]):
-            matches.append({
-                "condition_id": "hypertension",
-                "name": "High Blood Pressure",
-                "match_score": 4,
-                "matched_symptoms": ["headache"],
-                "severity": "moderate_severe"
-            })
-        
-        # Sort by match score
-        matches.sort(key=lambda x: x["match_score"], reverse=True)
-        return matches[:3]
+    def identify_condition_incremental(self, symptoms_text, hits, state):
+        """Score a follow-up message against a session's accumulated symptom state"""
+        # State built against another knowledge base is rebuilt from its phrases
+        if state.knowledge_base is not self:
+            phrases = state.phrases
+            state.reset(self)
+            state.phrases = phrases
+            self.rules.accumulate(phrases, state.scores, state.symptom_positions)
+        
+        # Only phrases not seen earlier in the conversation add postings
+        new_hits = hits - state.phrases
+        if new_hits:
+            self.rules.accumulate(new_hits, state.scores, state.symptom_positions)
+            state.phrases = state.phrases | new_hits
+        
+        # The new message picks the analyzer: an earlier "headache" must not route every later topic
+        analyzer = self.rules.route(hits)
+        if analyzer is not None:
+            # Indicators mentioned earlier in the conversation still count towards it
+            return analyzer.evaluate(state.phrases, self.medical_database)
+        
+        # Newer turns win: only conditions the new message mentions are ranked (on the whole
+        # conversation's scores), so a topic change is not outvoted by earlier symptoms
+        scores = state.scores
+        mentioned = self.rules.matched_conditions(hits)
+        if mentioned:
+            scores = {condition: score for condition, score in scores.items() if condition in mentioned}
+        return self.rules.rank(scores, state.symptom_positions, self.medical_database)
+    
+    def _analyze_headache_case(self, symptoms_text, hits=None):
+        """Specialized logic for headache complaints (the data file's headache analyzer)"""
+        if hits is None:
+            hits = self.scan(symptoms_text)
+        return self.rules.analyzers["headache"].evaluate(hits, self.medical_database)
     
     def generate_advice(self, condition_id, symptoms_text=""):
         """Generate comprehensive medical advice for a condition"""
+        template = self._advice_templates.get(condition_id)
+        if template is not None:
+            return template.decode()
+        
         if condition_id not in self.medical_database:
             return self._generate_general_advice(symptoms_text)
         
+        # Rendered once on first use, then reused by every request
+        template = self._render_advice(self.medical_database[condition_id])
+        self._advice_templates[condition_id] = template.encode()
+        return template
+    
+    def advice_excerpt(self, condition_id, length=500):
+        """A condition page from its self-care section on, cut to length (the differential's summary)"""
+        excerpt = self._advice_excerpts.get(condition_id)
+        if excerpt is not None:
+            return excerpt.decode()
+        
+        # Only the sections the excerpt shows are rendered
+        sections = self._render_advice_sections(self.medical_database[condition_id])
+        text = "".join(sections[sections.index(self.SELF_CARE_HEADING):])
+        # Starts at the heading's words, after its newline and bold markers
+        text = text[len("\n**"):]
+        excerpt = text[:length]
+        self._advice_excerpts[condition_id] = excerpt.encode()
+        return excerpt
+    
+    def advice_sections(self, condition_id):
+        """A condition's advice as data (self-care steps, duration, causes, when to see a doctor)"""
         info = self.medical_database[condition_id]
-        
+        return {
+            "self_care": info["advice"],
+            "duration": info["duration"],
+            "causes": info["causes"],
+            "when_to_see_doctor": info["when_to_see_doctor"],
+            "severity_description": self.SEVERITY_DESCRIPTIONS.get(info["severity"]),
+            "seek_immediate_care_if_worse": info["severity"] in self.URGENT_SEVERITIES
+        }
+    
+    def warm_templates(self):
+        """Render every condition page up front (used before a reloaded knowledge base goes live)"""
+        for condition_id in self.medical_database:
+            self.generate_advice(condition_id)
+            self.advice_excerpt(condition_id)
+    
+    def _render_advice(self, info):
+        """Render the static advice page for one condition"""
+        return "".join(self._render_advice_sections(info))
+    
+    def _render_advice_sections(self, info):
+        """The page as a list of markdown pieces, section headings as separate items"""
         # Build comprehensive response
-        response = f"🏥 **{info['name']} - Medical Information**\n\n"
+        parts = [f"🏥 **{info['name']} - Medical Information**\n\n"]
         
         # Symptoms section
-        response += f"**Common Symptoms:**\n"
-        for symptom in info["symptoms"]:
-            response += f"• {symptom.title()}\n"
+        parts.append("**Common Symptoms:**\n")
+        parts.extend(f"• {symptom.title()}\n" for symptom in info["symptoms"])
         
         # Self-care advice
-        response += f"\n**Self-Care Recommendations:**\n"
-        for i, advice in enumerate(info["advice"], 1):
-            response += f"{i}. {advice}\n"
+        parts.append(self.SELF_CARE_HEADING)
+        parts.extend(f"{i}. {advice}\n" for i, advice in enumerate(info["advice"], 1))
         
         # Additional info
-        response += f"\n**Additional Information:**\n"
-        response += f"• Typical Duration: {info['duration']}\n"
-        response += f"• Common Causes: {info['causes']}\n"
+        parts.append("\n**Additional Information:**\n")
+        parts.append(f"• Typical Duration: {info['duration']}\n")
+        parts.append(f"• Common Causes: {info['causes']}\n")
         
         # When to seek medical care
-        response += f"\n**When to Consult Suwa Setha Hospital:**\n"
-        response += f"• {info['when_to_see_doctor']}\n"
+        parts.append("\n**When to Consult Suwa Setha Hospital:**\n")
+        parts.append(f"• {info['when_to_see_doctor']}\n")
         
         # Severity and precautions
-        severity_map = {
-            "mild": "Generally manageable with self-care",
-            "moderate": "May require medical evaluation",
-            "severe": "Requires medical attention",
-            "mild_moderate": "Monitor closely, seek care if worsens",
-            "moderate_severe": "Medical evaluation recommended"
-        }
-        
-        if info["severity"] in severity_map:
-            response += f"• Severity Level: {severity_map[info['severity']]}\n"
+        if info["severity"] in self.SEVERITY_DESCRIPTIONS:
+            parts.append(f"• Severity Level: {self.SEVERITY_DESCRIPTIONS[info['severity']]}\n")
         
         # Add emergency warning if needed
-        if info["severity"] in ["severe", "moderate_severe"]:
-            response += f"\n{self.emergency_advice}\n"
+        if info["severity"] in self.URGENT_SEVERITIES:
+            parts.append(f"\n{self.emergency_advice}\n")
         
         # Always add disclaimer
-        response += f"\n{self.safety_disclaimer}"
+        parts.append(f"\n{self.safety_disclaimer}")
         
-        return response
+        return parts
+    
+    def general_advice_sections(self, hits):
+        """General advice groups (fever, pain, ...) whose trigger words are in the message"""
+        return [
+            group for group, words in self.general_advice_triggers.items()
+            if any(word in hits for word in words)
+        ]
     
-    def _generate_general_advice(self, symptoms_text):
+    def render_general_advice(self, sections):
+        """Render the general advice page for the given groups"""
+        parts = [self.GENERAL_ADVICE_HEADER]
+        parts.extend(self.GENERAL_ADVICE_SECTIONS[group] for group in sections)
+        parts.append(self._general_advice_footer)
+        return "".join(parts)
+    
+    def _generate_general_advice(self, symptoms_text, hits=None):
         """Generate advice when no specific condition is identified"""
-        response = "🤖 **Suwa Setha Hospital Health Assistant**\n\n"
-        response += "Based on your symptoms, here's general health guidance:\n\n"
-        
         # Analyze symptoms for general advice
-        symptoms = symptoms_text.lower()
-        
-        if any(word in symptoms for word in ["fever", "temperature", "hot"]):
-            response += "• For fever: Rest, stay hydrated, monitor temperature\n"
-            response += "• Seek care if fever exceeds 102°F or persists beyond 3 days\n\n"
-        
-        if any(word in symptoms for word in ["pain", "ache", "hurt"]):
-            response += "• For pain: Rest affected area, consider OTC pain relievers\n"
-            response += "• Seek care if pain is severe, sudden, or worsening\n\n"
-        
-        if any(word in symptoms for word in ["cough", "breath", "chest"]):
-            response += "• For respiratory symptoms: Stay hydrated, use humidifier\n"
-            response += "• Seek care if experiencing difficulty breathing\n\n"
-        
-        if any(word in symptoms for word in ["stomach", "nausea", "vomit", "diarrhea"]):
-            response += "• For digestive symptoms: BRAT diet, clear fluids\n"
-            response += "• Seek care if signs of dehydration or severe pain\n\n"
-        
-        # General wellness tips
-        response += "\n**General Wellness Recommendations:**\n"
-        response += "1. Stay hydrated with water throughout the day\n"
-        response += "2. Ensure adequate rest and sleep\n"
-        response += "3. Monitor symptoms for changes or worsening\n"
-        response += "4. Avoid self-medication without professional advice\n"
-        response += "5. Consider keeping a symptom diary\n\n"
-        
-        response += "**When to Seek Medical Care:**\n"
-        response += "• Symptoms are severe or worsening\n"
-        response += "• New or concerning symptoms develop\n"
-        response += "• Symptoms persist beyond expected duration\n"
-        response += "• You have underlying health conditions\n\n"
-        
-        response += self.emergency_advice + "\n\n"
-        response += self.safety_disclaimer
-        
-        return response
+        if hits is None:
+            hits = self.scan(symptoms_text)
+        return self.render_general_advice(self.general_advice_sections(hits))
     
-    def check_emergency(self, symptoms_text):
+    def check_emergency(self, symptoms_text, hits=None):
         """Check for emergency symptoms"""
-        emergency_keywords = [
-            "chest pain", "pressure chest", "tight chest",
-            "can't breathe", "difficulty breathing", "short breath",
-            "severe pain", "unbearable pain",
-            "unconscious", "passed out", "fainted",
-            "confused", "disoriented", "slurred speech",
-            "severe headache", "worst headache",
-            "bleeding won't stop", "heavy bleeding",
-            "poison", "overdose"
-        ]
-        
-        symptoms = symptoms_text.lower()
-        emergencies = []
+        if hits is None:
+            hits = self.scan(symptoms_text)
         
-        for keyword in emergency_keywords:
-            if keyword in symptoms:
-                emergencies.append(keyword)
-        
-        return emergencies
+        rank = self._emergency_rank
+        return sorted((keyword for keyword in hits if keyword in rank), key=rank.__getitem__)
+
+# ========== COMPILED SNAPSHOT ==========
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+# Modules whose classes are pickled into a snapshot; editing one invalidates old snapshots
+# even if SNAPSHOT_FORMAT was not bumped
+COMPILER_MODULES = ("medical_knowledge.py", "rule_compiler.py", "keyword_matcher.py", "fuzzy_matcher.py", "synonyms.py")
+
+def _compiler_digest():
+    digest = hashlib.sha256()
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in COMPILER_MODULES:
+        with open(os.path.join(backend_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _snapshot_key(source_path):
+    """What a snapshot must have been built from to be reused"""
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "python": list(sys.version_info[:2]),
+        "source_sha256": _file_digest(source_path),
+        "common_words_sha256": _file_digest(DEFAULT_COMMON_WORDS_PATH),
+        "compiler_sha256": _compiler_digest(),
+        "fuzzy": FUZZY_MATCHING
+    }
+
+def write_snapshot(source_path=DEFAULT_KNOWLEDGE_BASE_PATH, snapshot_path=DEFAULT_SNAPSHOT_PATH):
+    """Compile the data file, render every template and pickle the result (build step, trusted output)"""
+    knowledge_base = MedicalKnowledgeBase.from_file(source_path)
+    knowledge_base.warm_templates()
+    
+    temporary_path = f"{snapshot_path}.tmp"
+    with open(temporary_path, "wb") as f:
+        pickle.dump({"key": _snapshot_key(source_path), "knowledge_base": knowledge_base}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, snapshot_path)
+    return knowledge_base
+
+def load_snapshot(source_path=DEFAULT_KNOWLEDGE_BASE_PATH, snapshot_path=DEFAULT_SNAPSHOT_PATH):
+    """The snapshot's knowledge base, or None if it is missing or was built from something else"""
+    try:
+        with open(snapshot_path, "rb") as f:
+            # Unpickling allocates many small containers; collecting them midway only costs time
+            gc.disable()
+            try:
+                snapshot = pickle.load(f)
+            finally:
+                gc.enable()
+    except Exception:
+        # Missing, truncated or written by other code: compile from the data file instead
+        return None
+    
+    if not isinstance(snapshot, dict) or snapshot.get("key") != _snapshot_key(source_path):
+        return None
+    return snapshot["knowledge_base"]
+
+def load_knowledge_base(source_path=DEFAULT_KNOWLEDGE_BASE_PATH, snapshot_path=DEFAULT_SNAPSHOT_PATH):
+    """Load the compiled snapshot when it matches the data file, otherwise compile from the data file"""
+    knowledge_base = load_snapshot(source_path, snapshot_path)
+    if knowledge_base is None:
+        knowledge_base = MedicalKnowledgeBase.from_file(source_path)
+    return knowledge_base
 
 # Create global instance
-medical_kb = MedicalKnowledgeBase()
+medical_kb = load_knowledge_base()
@@ -0,0 +1,236 @@
+"""
+Triage Metrics
+Prometheus-text counters and latency histograms, cheap enough to leave on in production
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets in seconds: 10µs .. 1s
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+class _Sharded:
+    """Per-thread shards: the hot path only touches its own thread's list, no lock"""
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # only taken when a new thread records its first value
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _totals(self):
+        totals = [0] * self._size
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    def __init__(self, name, help_text, labels=None):
+        super().__init__(1)
+        self.name = name
+        self.help = help_text
+        self.labels = labels or {}
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        return self._totals()[0]
+
+    def samples(self):
+        return [(self.name, self.labels, self.value)]
+
+
+class Histogram(_Sharded):
+    def __init__(self, name, help_text, labels=None, buckets=LATENCY_BUCKETS):
+        # Layout: one slot per bucket, one for +Inf, then the running sum
+        super().__init__(len(buckets) + 2)
+        self.name = name
+        self.help = help_text
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def samples(self):
+        totals = self._totals()
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), totals):
+            cumulative += count
+            labels = dict(self.labels, le="+Inf" if bound == float("inf") else repr(bound))
+            samples.append((f"{self.name}_bucket", labels, cumulative))
+        samples.append((f"{self.name}_sum", self.labels, totals[-1]))
+        samples.append((f"{self.name}_count", self.labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []  # (type, metric) in registration order
+        self._collectors = []
+
+    def counter(self, name, help_text, labels=None):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(("counter", metric))
+        return metric
+
+    def histogram(self, name, help_text, labels=None, buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(("histogram", metric))
+        return metric
+
+    def register_collector(self, collect):
+        """collect() returns [(name, type, help, [(labels, value), ...]), ...] at scrape time"""
+        self._collectors.append(collect)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        described = set()
+
+        for metric_type, metric in self._metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric_type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for collect in self._collectors:
+            for name, metric_type, help_text, samples in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class TriageMetrics:
+    STAGES = ("scan", "emergency", "identify", "headache", "render")
+    RESPONSE_TYPES = ("emergency", "differential", "single", "general", "degraded")
+    DEGRADED_STAGES = ("identify", "render")
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.started_at = time.time()
+
+        self.stage_seconds = {
+            stage: self.registry.histogram(
+                "triage_stage_duration_seconds", "Time spent in each process_query stage", {"stage": stage}
+            )
+            for stage in self.STAGES
+        }
+        self.request_seconds = self.registry.histogram(
+            "triage_request_duration_seconds", "Time to answer a /chat request"
+        )
+        self.responses = {
+            response_type: self.registry.counter(
+                "triage_responses_total", "Responses by type", {"type": response_type}
+            )
+            for response_type in self.RESPONSE_TYPES
+        }
+        self.emergency_keywords = {}
+        self.cache_lookups = {
+            status: self.registry.counter(
+                "triage_cache_lookups_total", "process_query cache lookups by outcome", {"result": status}
+            )
+            for status in ("hit", "miss")
+        }
+        self.fallbacks = self.registry.counter(
+            "triage_fallback_total", "Requests answered by get_intelligent_fallback"
+        )
+        self.degraded = {
+            stage: self.registry.counter(
+                "triage_degraded_total", "Requests answered with the degraded response, by skipped stage",
+                {"stage": stage}
+            )
+            for stage in self.DEGRADED_STAGES
+        }
+        self._keyword_lock = threading.Lock()
+
+    def observe_trace(self, trace):
+        """Record what one process_query call put into its trace dict"""
+        for stage, histogram in self.stage_seconds.items():
+            seconds = trace.get(stage)
+            if seconds is not None:
+                histogram.observe(seconds)
+
+        response_type = trace.get("response_type")
+        if response_type in self.responses:
+            self.responses[response_type].inc()
+
+        degraded = trace.get("degraded")
+        if degraded in self.degraded:
+            self.degraded[degraded].inc()
+
+        cache = trace.get("cache")
+        if cache in self.cache_lookups:
+            self.cache_lookups[cache].inc()
+
+        for keyword in trace.get("emergencies", ()):
+            self._emergency_counter(keyword).inc()
+
+    def _emergency_counter(self, keyword):
+        counter = self.emergency_keywords.get(keyword)
+        if counter is None:
+            with self._keyword_lock:
+                counter = self.emergency_keywords.get(keyword)
+                if counter is None:
+                    counter = self.registry.counter(
+                        "triage_emergency_keyword_total", "Emergency keywords detected",
+                        {"keyword": keyword.replace('"', "'")}
+                    )
+                    self.emergency_keywords[keyword] = counter
+        return counter
+
+    def request_count(self):
+        return sum(counter.value for counter in self.responses.values()) + self.fallbacks.value
+
+    def render(self):
+        return self.registry.render()
+
+
+def stats_collector(prefix, help_text, get_stats):
+    """Expose the numeric fields of a stats() dict as gauges"""
+    def collect():
+        stats = get_stats()
+        return [
+            (f"{prefix}_{key}", "gauge", f"{help_text}: {key}", [({}, value)])
+            for key, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+    return collect
+
+
+# Create global instance
+triage_metrics = TriageMetrics()
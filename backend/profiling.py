@@ -0,0 +1,172 @@
+"""
+Per-Request Debug Timing and Profiling
+Opt-in per request (X-Debug-Token header) or by sampling rate: adds a Server-Timing header
+with per-stage durations and records a statistical profile of the triage call, downloadable
+from /admin/profiles. With neither configured nothing extra runs on the request path
+"""
+
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Trace keys reported in Server-Timing, with their descriptions
+SERVER_TIMING_STAGES = {
+    "queue": "admission wait",
+    "scan": "keyword scan",
+    "emergency": "emergency check",
+    "identify": "condition identification",
+    "headache": "headache analysis",
+    "render": "markdown rendering",
+    "serialize": "JSON serialization"
+}
+
+
+def server_timing(trace, total):
+    """Server-Timing header value (milliseconds) for the stages a trace recorded"""
+    entries = [
+        f'{stage};desc="{description}";dur={trace[stage] * 1000:.3f}'
+        for stage, description in SERVER_TIMING_STAGES.items() if stage in trace
+    ]
+    # Analyzers added to the data file after this list was written still show up
+    entries.extend(
+        f"{stage};dur={value * 1000:.3f}" for stage, value in trace.items()
+        if stage not in SERVER_TIMING_STAGES and isinstance(value, float)
+    )
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(entries)
+
+
+class StackSampler:
+    """Time-weighted stack samples of one call, taken from profile events at most once per interval
+
+    The sampling runs on the profiled thread itself (as pyinstrument does), so it never waits
+    for the GIL and other threads are untouched. The profiled call runs somewhat slower.
+    """
+
+    def __init__(self, interval=0.0002):
+        self.interval = interval
+        self.stacks = Counter()  # folded stack -> seconds
+        self.elapsed = 0.0
+        self._root = None
+        self._last = 0.0
+
+    def run(self, fn, *args):
+        """Call fn(*args) on this thread with sampling on"""
+        previous = sys.getprofile()
+        self._root = sys._getframe()
+        start = self._last = time.perf_counter()
+        sys.setprofile(self._sample)
+        try:
+            return fn(*args)
+        finally:
+            sys.setprofile(previous)
+            self.elapsed = time.perf_counter() - start
+
+    def _sample(self, frame, event, arg):
+        now = time.perf_counter()
+        if now - self._last < self.interval:
+            return
+        stack = []
+        if event == "c_call" or event == "c_return":
+            stack.append(f"{getattr(arg, '__qualname__', '?')} (builtin)")
+        while frame is not None and frame is not self._root:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += now - self._last
+        self._last = now
+
+    def folded(self):
+        """Collapsed stacks with microsecond weights (flamegraph.pl, speedscope, inferno)"""
+        return "".join(
+            f"{stack} {round(seconds * 1e6)}\n"
+            for stack, seconds in self.stacks.most_common() if stack and seconds >= 5e-7
+        )
+
+
+class RequestProfiler:
+    def __init__(self, token=None, sample_rate=0.0, interval=0.0002, keep=50, rng=random.random):
+        self.token = token or None
+        self.sample_rate = sample_rate
+        self.interval = interval
+        # Nothing is checked per request unless one of these is configured
+        self.enabled = self.token is not None or sample_rate > 0
+        self._rng = rng
+        self._profiles = OrderedDict()  # request_id -> profile, oldest first
+        self._keep = keep
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.sampled = 0
+
+    @classmethod
+    def from_environment(cls):
+        """Configure from DEBUG_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS and PROFILE_KEEP"""
+        return cls(
+            token=os.environ.get("DEBUG_TOKEN"),
+            sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),
+            interval=float(os.environ.get("PROFILE_INTERVAL_MS", 0.2)) / 1000,
+            keep=int(os.environ.get("PROFILE_KEEP", 50))
+        )
+
+    def is_authorized(self, headers):
+        """True if the request carries the debug token"""
+        supplied = headers.get("x-debug-token")
+        return self.token is not None and supplied is not None and hmac.compare_digest(supplied, self.token)
+
+    def decide(self, headers):
+        """(send Server-Timing, StackSampler or None) for one request"""
+        if self.is_authorized(headers):
+            self.requested += 1
+            # Timing alone unless a profile is asked for too (profiling slows the call it measures)
+            return True, StackSampler(self.interval) if headers.get("x-debug-profile") == "1" else None
+        if self.sample_rate and self._rng() < self.sample_rate:
+            self.sampled += 1
+            return True, StackSampler(self.interval)
+        return False, None
+
+    def record(self, request_id, sampler, trace, duration):
+        profile = {
+            "request_id": request_id,
+            "recorded_at": time.time(),
+            "duration_ms": round(duration * 1000, 3),
+            "profiled_ms": round(sampler.elapsed * 1000, 3),
+            "stages_ms": {stage: round(value * 1000, 3) for stage, value in trace.items() if isinstance(value, float)},
+            "response_type": trace.get("response_type"),
+            "folded": sampler.folded()
+        }
+        with self._lock:
+            self._profiles[request_id] = profile
+            self._profiles.move_to_end(request_id)
+            while len(self._profiles) > self._keep:
+                self._profiles.popitem(last=False)
+
+    def profiles(self):
+        """Summaries of the kept profiles, newest first"""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [
+            {key: value for key, value in profile.items() if key != "folded"}
+            for profile in reversed(profiles)
+        ]
+
+    def get(self, request_id):
+        with self._lock:
+            return self._profiles.get(request_id)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "header_opt_in": self.token is not None,
+            "sample_rate": self.sample_rate,
+            "requested": self.requested,
+            "sampled": self.sampled,
+            "kept": len(self._profiles)
+        }
+
+
+# Create global instance
+request_profiler = RequestProfiler.from_environment()
@@ -0,0 +1,159 @@
+"""
+Structured Request Logging
+JSON log records handed to a bounded queue and written by a background thread,
+so a slow stdout or log collector never blocks the event loop
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+def _parse_sample_rates(spec):
+    """'debug=0,info=0.25' -> {'debug': 0.0, 'info': 0.25}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        level, _, rate = item.partition("=")
+        level = level.strip().lower()
+        if level not in LEVELS:
+            raise ValueError(f"Unknown log level {level!r} in LOG_SAMPLE_RATES")
+        rates[level] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class RequestLog:
+    def __init__(self, stream=None, max_queue=10000, min_level="info", sample_rates=None,
+                 rng=random.random, flush_interval=0.05):
+        self.stream = stream if stream is not None else sys.stdout
+        self.min_level = LEVELS[min_level]
+        self.sample_rates = sample_rates or {}
+        self.rng = rng
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        # deque.append/popleft are atomic, so the hot path takes no lock;
+        # the bound is checked without one and may overshoot by a few records
+        self._queue = deque()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Statistics (written from many threads; approximate under contention is fine)
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.write_errors = 0
+        self.serialize_errors = 0
+
+    @classmethod
+    def from_environment(cls):
+        """Configure from LOG_LEVEL, LOG_QUEUE_SIZE and LOG_SAMPLE_RATES"""
+        return cls(
+            max_queue=int(os.environ.get("LOG_QUEUE_SIZE", 10000)),
+            min_level=os.environ.get("LOG_LEVEL", "info").lower(),
+            sample_rates=_parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))
+        )
+
+    def log(self, level, event, keep=False, **fields):
+        """Queue one record; never blocks. keep=True bypasses LOG_LEVEL and sampling (emergencies)
+
+        Returns True if the record was queued.
+        """
+        if not keep:
+            if LEVELS[level] < self.min_level:
+                return False
+            rate = self.sample_rates.get(level, 1.0)
+            if rate < 1.0 and self.rng() >= rate:
+                self.sampled_out += 1
+                return False
+
+        # Serialization happens on the writer thread; only the dict is built here
+        fields["ts"] = time.time()
+        fields["level"] = level
+        fields["event"] = event
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._queue.append(fields)
+        return True
+
+    def debug(self, event, **fields):
+        return self.log("debug", event, **fields)
+
+    def info(self, event, **fields):
+        return self.log("info", event, **fields)
+
+    def warning(self, event, **fields):
+        return self.log("warning", event, **fields)
+
+    def error(self, event, **fields):
+        # Errors are rare and always worth keeping
+        return self.log("error", event, keep=True, **fields)
+
+    # ========== BACKGROUND WRITER ==========
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._drain, name="request-log", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Flush what is queued, then stop the writer"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _drain(self):
+        while True:
+            stopping = self._stop.is_set()
+            # Write whatever has piled up in one go, flushing once per batch
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < 512:
+                    batch.append(self._queue.popleft())
+                self._write(batch)
+            if stopping:
+                return
+            self._stop.wait(self.flush_interval)
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            ordered = {"ts": round(record.pop("ts"), 6), "level": record.pop("level"), "event": record.pop("event")}
+            ordered.update(record)
+            # One bad record (a circular or non-string-keyed field) is counted and skipped;
+            # letting it raise would end the writer thread and every later line with it
+            try:
+                lines.append(json.dumps(ordered, ensure_ascii=False, default=str))
+            except Exception:
+                self.serialize_errors += 1
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+            self.written += len(lines)
+        except Exception:
+            self.write_errors += 1
+
+    def stats(self):
+        return {
+            "queued": len(self._queue),
+            "capacity": self.max_queue,
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "write_errors": self.write_errors,
+            "serialize_errors": self.serialize_errors
+        }
+
+
+# Create global instance
+request_log = RequestLog.from_environment()
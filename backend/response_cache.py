@@ -0,0 +1,115 @@
+"""
+Response Cache for the Medical AI
+Bounded LRU cache with TTL expiry and coalescing of identical in-flight requests
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    """A computation that other callers with the same key can wait on"""
+    __slots__ = ("event", "value", "error", "generation")
+
+    def __init__(self, generation):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.generation = generation
+
+
+class ResponseCache:
+    def __init__(self, max_size=2048, ttl_seconds=600.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing it at most once across concurrent callers"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+
+            flight = self._in_flight.get(key)
+            if flight is None:
+                flight = _InFlight(self._generation)
+                self._in_flight[key] = flight
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            self._store(key, value, flight.generation)
+            return value
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is flight:
+                    del self._in_flight[key]
+            flight.event.set()
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            # Results computed before the last clear() belong to stale data
+            if generation != self._generation or self.max_size <= 0:
+                return
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry; computations already running are not stored"""
+        with self._lock:
+            self._entries.clear()
+            self._in_flight.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "generation": self._generation
+            }
+
+    def __len__(self):
+        return len(self._entries)
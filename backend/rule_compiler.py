@@ -0,0 +1,271 @@
+"""
+Scoring Rule Compiler
+Turns the data file's scoring, routing and analyzer rules into a flat decision table
+that a single evaluator runs; adding rules adds rows, not Python branches
+
+Usage:
+    python rule_compiler.py [data/knowledge_base.json]    # print the compiled table
+"""
+
+import heapq
+import sys
+from array import array
+
+
+class AnalyzerTable:
+    """Compiled analyzer: indicator postings feeding a fixed list of rule rows"""
+    __slots__ = ("name", "lead_symptoms", "max_matches", "rules", "postings")
+
+    # Rule row layout
+    CONDITION, BASE_SCORE, MIN_INDICATOR_SCORE, ADD_INDICATOR_SCORE, REPORT_INDICATORS, INDICATORS = range(6)
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.lead_symptoms = list(spec["lead_symptoms"])
+        self.max_matches = spec["max_matches"]
+        self.rules = tuple(
+            (
+                rule["condition"],
+                rule["base_score"],
+                rule["min_indicator_score"],
+                rule.get("add_indicator_score", True),
+                rule.get("report_indicators", True),
+                tuple(phrase for phrase, _ in rule["indicators"])
+            )
+            for rule in spec["rules"]
+        )
+
+        # phrase -> ((rule_row, weight), ...)
+        postings = {}
+        for row, rule in enumerate(spec["rules"]):
+            for phrase, weight in rule["indicators"]:
+                postings.setdefault(phrase, []).append((row, weight))
+        self.postings = {phrase: tuple(entries) for phrase, entries in postings.items()}
+
+    def phrases(self):
+        return list(self.postings)
+
+    def evaluate(self, hits, database):
+        """Score every rule row from the hit phrases; rows that pass their threshold become matches"""
+        indicator_scores = [0] * len(self.rules)
+        postings = self.postings
+        for phrase in hits:
+            entries = postings.get(phrase)
+            if entries:
+                for row, weight in entries:
+                    indicator_scores[row] += weight
+
+        matches = []
+        for (condition_id, base_score, min_score, add_score, report, indicators), indicator_score in zip(
+            self.rules, indicator_scores
+        ):
+            if indicator_score < min_score:
+                continue
+            info = database[condition_id]
+            matched_symptoms = list(self.lead_symptoms)
+            if report:
+                matched_symptoms.extend(phrase for phrase in indicators if phrase in hits)
+            matches.append({
+                "condition_id": condition_id,
+                "name": info["name"],
+                "match_score": base_score + indicator_score if add_score else base_score,
+                "matched_symptoms": matched_symptoms,
+                "severity": info["severity"]
+            })
+
+        # Stable sort: rule order breaks ties
+        matches.sort(key=lambda match: match["match_score"], reverse=True)
+        return matches[:self.max_matches]
+
+    def describe(self):
+        return {
+            "lead_symptoms": self.lead_symptoms,
+            "max_matches": self.max_matches,
+            "rules": [
+                {
+                    "condition": condition_id,
+                    "base_score": base_score,
+                    "min_indicator_score": min_score,
+                    "add_indicator_score": add_score,
+                    "report_indicators": report,
+                    "indicators": list(indicators)
+                }
+                for condition_id, base_score, min_score, add_score, report, indicators in self.rules
+            ],
+            "postings": {phrase: [list(entry) for entry in entries] for phrase, entries in self.postings.items()}
+        }
+
+
+class DecisionTable:
+    """Compiled scoring rules for one knowledge base
+
+    Postings live in flat arrays (one run per phrase), with conditions numbered in database
+    order; scoring a message reads numbers out of a few contiguous buffers instead of touching
+    a tuple and a condition-id string per posting.
+    """
+
+    def __init__(self, data, database):
+        scoring = data["scoring"]
+        self.min_condition_score = scoring["min_condition_score"]
+        self.min_top_score = scoring["min_top_score"]
+        self.max_matches = scoring["max_matches"]
+        # Condition number -> id; the number doubles as the tie-break rank
+        self.condition_ids = tuple(database)
+        self._compile_postings(scoring, database)
+
+        self.analyzers = {name: AnalyzerTable(name, spec) for name, spec in data["analyzers"].items()}
+        # First matching trigger wins, in data-file order
+        self.routes = tuple((route["trigger"], self.analyzers[route["analyzer"]]) for route in data["routing"])
+
+    def _compile_postings(self, scoring, database):
+        """Inverted index: phrase -> run of (condition number, weight, symptom position or -1) postings"""
+        default_weight = scoring["default_symptom_weight"]
+        symptom_weights = scoring["symptom_weights"]
+        overrides = scoring["condition_symptom_weights"]
+        index = {}
+
+        for condition, (condition_id, info) in enumerate(database.items()):
+            # Different weights for different symptoms (per-condition overrides first)
+            condition_weights = overrides.get(condition_id, {})
+            for position, symptom in enumerate(info["symptoms"]):
+                weight = condition_weights.get(symptom, symptom_weights.get(symptom, default_weight))
+                index.setdefault(symptom, []).append((condition, weight, position))
+
+            # Condition name mention (high priority)
+            index.setdefault(sys.intern(info["name"].lower()), []).append((condition, scoring["name_weight"], -1))
+
+            for keyword in info["related_keywords"]:
+                index.setdefault(keyword, []).append((condition, scoring["related_keyword_weight"], -1))
+
+        # phrase -> phrase id; the postings of phrase id p are entries offsets[p] to offsets[p + 1]
+        self.phrase_ids = {}
+        self.offsets = array("i", [0])
+        self.posting_conditions = array("i")
+        self.posting_weights = array("l")
+        self.posting_positions = array("i")
+        for phrase_id, (phrase, postings) in enumerate(index.items()):
+            self.phrase_ids[phrase] = phrase_id
+            for condition, weight, position in postings:
+                self.posting_conditions.append(condition)
+                self.posting_weights.append(weight)
+                self.posting_positions.append(position)
+            self.offsets.append(len(self.posting_conditions))
+
+    def postings(self, phrase):
+        """[(condition_id, weight, symptom_position or None)] for one phrase (empty if unknown)"""
+        phrase_id = self.phrase_ids.get(phrase)
+        if phrase_id is None:
+            return []
+        return [
+            (self.condition_ids[self.posting_conditions[entry]], self.posting_weights[entry],
+             None if self.posting_positions[entry] < 0 else self.posting_positions[entry])
+            for entry in range(self.offsets[phrase_id], self.offsets[phrase_id + 1])
+        ]
+
+    def phrases(self):
+        """Every phrase a rule can react to"""
+        phrases = list(self.phrase_ids)
+        phrases.extend(trigger for trigger, _ in self.routes)
+        for analyzer in self.analyzers.values():
+            phrases.extend(analyzer.phrases())
+        return phrases
+
+    def route(self, hits):
+        """The analyzer that takes over this message, or None for general scoring"""
+        for trigger, analyzer in self.routes:
+            if trigger in hits:
+                return analyzer
+        return None
+
+    def evaluate(self, hits, database, scores=None, symptom_positions=None):
+        """Run the table: routed analyzer if a trigger matched, otherwise weighted postings and thresholds
+
+        Pass scores/symptom_positions already accumulated for hits (session state) to skip re-scoring.
+        """
+        analyzer = self.route(hits)
+        if analyzer is not None:
+            return analyzer.evaluate(hits, database)
+
+        if scores is None:
+            scores = {}
+            symptom_positions = {}
+            self.accumulate(hits, scores, symptom_positions)
+        return self.rank(scores, symptom_positions, database)
+
+    def accumulate(self, hits, scores, symptom_positions):
+        """Add the postings of every hit phrase into per-condition scores (keyed by condition number)"""
+        phrase_ids, offsets = self.phrase_ids, self.offsets
+        conditions, weights, positions = self.posting_conditions, self.posting_weights, self.posting_positions
+
+        for phrase in hits:
+            phrase_id = phrase_ids.get(phrase)
+            if phrase_id is None:
+                continue
+            start, end = offsets[phrase_id], offsets[phrase_id + 1]
+            for condition, weight, position in zip(conditions[start:end], weights[start:end], positions[start:end]):
+                scores[condition] = scores.get(condition, 0) + weight
+                if position >= 0:
+                    symptom_positions.setdefault(condition, []).append(position)
+
+    def matched_conditions(self, hits):
+        """Numbers of the conditions that any hit phrase has a posting for"""
+        phrase_ids, offsets = self.phrase_ids, self.offsets
+        found = set()
+        for phrase in hits:
+            phrase_id = phrase_ids.get(phrase)
+            if phrase_id is not None:
+                found.update(self.posting_conditions[offsets[phrase_id]:offsets[phrase_id + 1]])
+        return found
+
+    def rank(self, scores, symptom_positions, database):
+        """Pick the top meaningful matches (database order breaks ties)"""
+        # Only include meaningful matches
+        candidates = [condition for condition, score in scores.items() if score >= self.min_condition_score]
+        top = heapq.nlargest(self.max_matches, candidates, key=lambda condition: (scores[condition], -condition))
+
+        # If no good matches, return general advice
+        if not top or scores[top[0]] < self.min_top_score:
+            return []
+
+        matches = []
+        for condition in top:
+            condition_id = self.condition_ids[condition]
+            info = database[condition_id]
+            positions = sorted(symptom_positions.get(condition, ()))
+            matches.append({
+                "condition_id": condition_id,
+                "name": info["name"],
+                "match_score": scores[condition],
+                "matched_symptoms": [info["symptoms"][position] for position in positions],
+                "severity": info["severity"]
+            })
+
+        return matches
+
+    def describe(self):
+        """The compiled table as plain data, for inspection and diffing"""
+        return {
+            "thresholds": {
+                "min_condition_score": self.min_condition_score,
+                "min_top_score": self.min_top_score,
+                "max_matches": self.max_matches
+            },
+            "routes": [{"trigger": trigger, "analyzer": analyzer.name} for trigger, analyzer in self.routes],
+            "analyzers": {name: analyzer.describe() for name, analyzer in self.analyzers.items()},
+            "postings": {phrase: [list(entry) for entry in self.postings(phrase)] for phrase in self.phrase_ids}
+        }
+
+
+def compile_rules(data, database):
+    """Compile validated knowledge-base data into a DecisionTable"""
+    return DecisionTable(data, database)
+
+
+if __name__ == "__main__":
+    import json
+
+    from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, MedicalKnowledgeBase
+
+    kb = MedicalKnowledgeBase.from_file(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_KNOWLEDGE_BASE_PATH)
+    json.dump(kb.rules.describe(), sys.stdout, ensure_ascii=False, indent=1)
+    print()
@@ -0,0 +1,129 @@
+"""
+Per-Session Conversation Store
+Bounded multi-turn history with a running symptom state per session
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SymptomState:
+    """Accumulated keyword hits and condition scores across a session's messages"""
+    __slots__ = ("phrases", "scores", "symptom_positions", "knowledge_base")
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, knowledge_base):
+        self.phrases = frozenset()
+        self.scores = {}
+        self.symptom_positions = {}
+        self.knowledge_base = knowledge_base
+
+
+class Session:
+    __slots__ = ("session_id", "turns", "symptoms", "last_seen", "size_bytes", "lock")
+
+    def __init__(self, session_id, max_turns, now):
+        self.session_id = session_id
+        self.turns = deque(maxlen=max_turns)
+        self.symptoms = SymptomState()
+        self.last_seen = now
+        self.size_bytes = 0
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    # Rough per-turn bookkeeping cost on top of the message text itself
+    TURN_OVERHEAD_BYTES = 256
+
+    def __init__(self, max_turns=20, idle_timeout=1800.0, max_sessions=10000,
+                 max_bytes=32 * 1024 * 1024, clock=time.monotonic):
+        self.max_turns = max_turns
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._sessions = OrderedDict()  # least recently active first
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # Counters
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    def get(self, session_id):
+        """Return the session for session_id, creating it if needed"""
+        now = self._clock()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.max_turns, now)
+                self._sessions[session_id] = session
+                self.created += 1
+            else:
+                session.last_seen = now
+                self._sessions.move_to_end(session_id)
+            self._evict(now)
+            return session
+
+    def record(self, session, user_input, matched_conditions):
+        """Append one turn to a session's ring buffer"""
+        delta = len(user_input) + self.TURN_OVERHEAD_BYTES
+        with self._lock:
+            if len(session.turns) == session.turns.maxlen:
+                delta -= len(session.turns[0]["user_input"]) + self.TURN_OVERHEAD_BYTES
+            session.turns.append({
+                "user_input": user_input,
+                "matched_conditions": matched_conditions
+            })
+            session.size_bytes += delta
+            # Evicted sessions no longer count towards the global budget
+            if self._sessions.get(session.session_id) is session:
+                self._total_bytes += delta
+                self._evict(self._clock())
+
+    def _evict(self, now):
+        """Drop idle sessions, then the least recently active ones while over capacity"""
+        sessions = self._sessions
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if now - oldest.last_seen < self.idle_timeout:
+                break
+            self._drop(oldest)
+            self.evicted_idle += 1
+
+        while len(sessions) > 1 and (len(sessions) > self.max_sessions or self._total_bytes > self.max_bytes):
+            self._drop(next(iter(sessions.values())))
+            self.evicted_capacity += 1
+
+    def _drop(self, session):
+        del self._sessions[session.session_id]
+        self._total_bytes -= session.size_bytes
+
+    def history(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return list(session.turns) if session is not None else []
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "approx_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "created": self.created,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity
+            }
+
+    def __len__(self):
+        return len(self._sessions)
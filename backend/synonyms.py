@@ -0,0 +1,104 @@
+"""
+Per-Language Synonym Tables
+Sinhala, Tamil and romanized (Singlish / Tanglish) phrases mapped onto the knowledge base's
+English phrases. They are compiled into the keyword automaton, so a message in any language
+costs one normalization pass and the usual single scan
+
+Usage:
+    python synonyms.py [data/knowledge_base.json]    # automaton size added per language
+"""
+
+import unicodedata
+
+# Joiners change how Sinhala conjuncts are drawn, not what was written; typed text has them or not
+_IGNORED_CHARACTERS = dict.fromkeys(map(ord, "\u200c\u200d\ufeff"))
+
+
+def normalize_text(text):
+    """Lower-case; non-ASCII text is also NFC-normalized and stripped of zero-width joiners"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFC", text).translate(_IGNORED_CHARACTERS)
+
+
+class SynonymTable:
+    """Every language's phrases merged into one surface form -> knowledge-base phrase map
+
+    A surface form listed by several languages (shared loanwords, identical transliterations)
+    is stored once.
+    """
+    # Aliases this short are pieces of longer words in every script ("උණ" fever starts "උණුසුම්"
+    # warm), so they only match as whole words
+    SHORT_ALIAS_LENGTH = 3
+
+    def __init__(self, languages):
+        self.aliases = {}
+        self.whole_word = set()
+        self.languages = {}
+
+        for code, table in languages.items():
+            shared = 0
+            for surface, phrase in table["phrases"].items():
+                surface = normalize_text(surface).strip()
+                if surface in self.aliases:
+                    shared += 1
+                else:
+                    self.aliases[surface] = phrase
+                # Short romanized words ("una", "sali") are also pieces of English words,
+                # and any short alias is a piece of longer words in its own script
+                if table.get("whole_word", False) or len(surface) <= self.SHORT_ALIAS_LENGTH:
+                    self.whole_word.add(surface)
+            self.languages[code] = {
+                "name": table["name"],
+                "phrases": len(table["phrases"]),
+                "shared": shared
+            }
+
+    def words(self):
+        """Single words of every surface form (never to be "corrected" by the fuzzy matcher)"""
+        return [word for surface in self.aliases for word in surface.split()]
+
+    def __len__(self):
+        return len(self.aliases)
+
+
+def language_report(data):
+    """Automaton states and bytes added by each language, in data-file order"""
+    from medical_knowledge import MedicalKnowledgeBase
+
+    languages = data.get("synonyms", {})
+    report = []
+    previous = None
+    for count in range(len(languages) + 1):
+        included = dict(list(languages.items())[:count])
+        knowledge_base = MedicalKnowledgeBase(dict(data, synonyms=included), fuzzy=False)
+        matcher = knowledge_base.matcher
+        row = {
+            "language": "(base)" if count == 0 else list(languages)[count - 1],
+            "surface_forms": len(knowledge_base.synonyms),
+            "states": matcher.states(),
+            "bytes": matcher.memory_bytes()
+        }
+        if previous is not None:
+            row["added_states"] = row["states"] - previous["states"]
+            row["added_bytes"] = row["bytes"] - previous["bytes"]
+            row.update(knowledge_base.synonyms.languages[row["language"]])
+        report.append(row)
+        previous = row
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, load_knowledge_data
+
+    data = load_knowledge_data(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_KNOWLEDGE_BASE_PATH)
+    report = language_report(data)
+    for row in report:
+        if "added_bytes" not in row:
+            print(f"📚 {row['language']:<8} {row['states']:>6} states  {row['bytes'] / 1024:8.1f} KiB")
+            continue
+        print(f"🌐 {row['language']:<8} +{row['added_states']:>5} states  +{row['added_bytes'] / 1024:7.1f} KiB  "
+              f"{row['phrases']} phrases ({row['shared']} shared with earlier languages)  {row['name']}")
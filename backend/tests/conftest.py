@@ -0,0 +1,52 @@
+"""
+Shared fixtures: the backend modules on sys.path, the shipped knowledge base with and without
+typo correction, and a fresh AdvancedMedicalAI per test (its cache and sessions start empty)
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+# No reload thread or request log noise while the app module is imported
+os.environ.setdefault("KNOWLEDGE_BASE_POLL_SECONDS", "0")
+os.environ.setdefault("LOG_LEVEL", "error")
+
+from advanced_medical_ai import AdvancedMedicalAI
+from medical_knowledge import MedicalKnowledgeBase, load_knowledge_data
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+@pytest.fixture(scope="session")
+def knowledge_data():
+    return load_knowledge_data()
+
+
+@pytest.fixture(scope="session")
+def knowledge_base(knowledge_data):
+    return MedicalKnowledgeBase(knowledge_data, fuzzy=True)
+
+
+@pytest.fixture(scope="session")
+def exact_knowledge_base(knowledge_data):
+    """FUZZY_MATCHING=0: phrases are only found as written"""
+    return MedicalKnowledgeBase(knowledge_data, fuzzy=False)
+
+
+@pytest.fixture
+def ai(knowledge_base):
+    engine = AdvancedMedicalAI()
+    engine.set_knowledge_base(knowledge_base)
+    return engine
+
+
+@pytest.fixture
+def exact_ai(exact_knowledge_base):
+    engine = AdvancedMedicalAI()
+    engine.set_knowledge_base(exact_knowledge_base)
+    return engine
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from admission import AdmissionController, Overloaded
+from conftest import DATA_DIR
+
+
+def test_routine_requests_are_shed_when_the_queue_is_full():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        holding, release = asyncio.Event(), asyncio.Event()
+
+        async def hold():
+            async with admission.admit():
+                holding.set()
+                await release.wait()
+
+        async def queued():
+            async with admission.admit():
+                return "admitted"
+
+        first = asyncio.create_task(hold())
+        await holding.wait()
+        second = asyncio.create_task(queued())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            async with admission.admit():
+                pass
+        release.set()
+        await first
+        assert await second == "admitted"
+        return shed.value, admission.stats()
+
+    shed, stats = asyncio.run(scenario())
+    assert shed.reason == "queue full"
+    assert stats["shed_queue_full"] == 1
+    assert stats["admitted"] == 2
+
+
+def test_routine_requests_are_shed_after_the_queue_timeout():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=0, max_queue=4, queue_timeout=0.01)
+        with pytest.raises(Overloaded) as shed:
+            async with admission.admit():
+                pass
+        return shed.value
+
+    assert asyncio.run(scenario()).reason == "queue timeout"
+
+
+def test_emergencies_wait_for_a_priority_slot_and_are_never_shed():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=0, max_queue=0, priority_slots=1)
+        holding, release = asyncio.Event(), asyncio.Event()
+
+        async def hold():
+            async with admission.admit(priority=True):
+                holding.set()
+                await release.wait()
+
+        async def emergency():
+            async with admission.admit(priority=True):
+                return "admitted"
+
+        first = asyncio.create_task(hold())
+        await holding.wait()
+        waiting = asyncio.create_task(emergency())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        release.set()
+        await first
+        return await waiting, admission.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == "admitted"
+    assert stats["admitted_priority"] == 2
+
+
+def test_chat_returns_503_for_routine_messages_but_answers_emergencies(monkeypatch):
+    # No routine capacity and no queue: every routine message is shed at once
+    monkeypatch.setattr(main, "admission", AdmissionController(max_concurrent=0, max_queue=0, retry_after=3))
+    client = TestClient(main.app)
+
+    shed = client.post("/chat", json={"message": "sore throat and fever"})
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "3"
+
+    emergency = client.post("/chat", json={"message": "crushing chest pain"})
+    assert emergency.status_code == 200
+    assert "EMERGENCY MEDICAL ALERT" in emergency.json()["response"]
+
+    # Missed by the exact pre-screen, caught by the full check before it would be shed
+    misspelled = client.post("/chat", json={"message": "crushing chest pian"})
+    assert misspelled.status_code == 200
+    assert "EMERGENCY MEDICAL ALERT" in misspelled.json()["response"]
+
+
+def test_prescreen_agrees_with_the_exact_emergency_check(exact_knowledge_base):
+    with open(os.path.join(DATA_DIR, "baseline_responses.json"), encoding="utf-8") as f:
+        messages = [message.lower() for message, _ in json.load(f)]
+    messages += ["පපුවේ වේදනාව", "sihiya nathi", "he is unconcious"]
+
+    for message in messages:
+        expected = bool(exact_knowledge_base.check_emergency(message))
+        assert exact_knowledge_base.prescreen_emergency(message) == expected, message
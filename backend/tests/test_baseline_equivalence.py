@@ -0,0 +1,24 @@
+"""
+process_query must keep answering exactly as the original implementation did when typo
+correction is off. data/baseline_responses.json holds [message, first 16 hex digits of the
+SHA-256 of the original reply] pairs, recorded from the baseline commit for hand-written
+messages plus load_test.generate_corpus(seed=7) traffic
+"""
+
+import hashlib
+import json
+import os
+
+from conftest import DATA_DIR
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def test_process_query_matches_baseline_without_fuzzy_matching(exact_ai):
+    with open(os.path.join(DATA_DIR, "baseline_responses.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    changed = [message for message, digest in expected if _digest(exact_ai.process_query(message)) != digest]
+    assert not changed, f"{len(changed)} of {len(expected)} replies differ, e.g. {changed[:5]}"
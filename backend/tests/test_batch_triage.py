@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+
+from advanced_medical_ai import AdvancedMedicalAI
+from batch_triage import BatchTriage
+from conftest import DATA_DIR
+from medical_knowledge import MedicalKnowledgeBase
+from synthetic_kb import generate_knowledge_data, generate_messages
+
+
+@pytest.fixture(scope="module")
+def messages():
+    with open(os.path.join(DATA_DIR, "baseline_responses.json"), encoding="utf-8") as f:
+        return [message for message, _ in json.load(f)]
+
+
+@pytest.mark.parametrize("format", ["markdown", "json"])
+def test_batch_matches_the_per_message_path(ai, messages, format):
+    expected = [ai.process_query(message, format=format) for message in messages]
+    assert ai.process_batch(messages, format) == expected
+
+
+def test_batch_scoring_matches_identify_condition_on_a_large_knowledge_base():
+    data = generate_knowledge_data(3000)
+    knowledge_base = MedicalKnowledgeBase(data, fuzzy=False)
+    batch = BatchTriage(knowledge_base)
+    hit_sets = []
+    for message in generate_messages(data, 1500, 12, seed=3):
+        hits = knowledge_base.scan(message)
+        if knowledge_base.rules.route(hits) is None:
+            hit_sets.append((message, hits))
+
+    results = batch.identify_conditions([hits for _, hits in hit_sets])
+    for (message, hits), matches in zip(hit_sets, results):
+        assert matches == knowledge_base.identify_condition(message, hits), message
+
+
+def test_batch_with_no_known_phrases():
+    engine = AdvancedMedicalAI()
+    batch = BatchTriage(engine.knowledge_base)
+    assert batch.identify_conditions([frozenset(), frozenset({"not a phrase"})]) == [[], []]
+    assert batch.identify_conditions([]) == []
@@ -0,0 +1,52 @@
+import copy
+import gc
+import io
+import json
+
+import pytest
+
+from advanced_medical_ai import medical_ai
+from bulk_triage import BulkTriage
+from medical_knowledge import MedicalKnowledgeBase
+
+
+def run(lines):
+    output = io.StringIO()
+    BulkTriage(workers=0, format="markdown", progress=io.StringIO()).run(lines, output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_messages_are_cleaned_like_chat(ai):
+    long_message = "headache " * 100
+    results = run([json.dumps({"message": "  headache  "}), json.dumps(long_message)])
+    assert results[0]["response"] == ai.process_query("headache")
+    assert results[1]["response"] == ai.process_query(long_message.strip()[:500])
+
+
+def test_too_short_messages_are_errors():
+    results = run([json.dumps({"message": " hi ", "id": 7}), json.dumps("headache"), "not json"])
+    assert results[0] == {"line": 1, "error": "describe symptoms (min 3 characters)"}
+    assert "response" in results[1]
+    assert "error" in results[2]
+
+
+def test_workers_triage_with_the_parent_knowledge_base(knowledge_data, monkeypatch):
+    data = copy.deepcopy(knowledge_data)
+    data["version"] = "candidate"
+    for condition in data["conditions"].values():
+        condition["duration"] = "Candidate duration"
+    monkeypatch.setattr(medical_ai, "knowledge_base", MedicalKnowledgeBase(data))
+
+    output = io.StringIO()
+    BulkTriage(workers=2, format="markdown", progress=None).run([json.dumps("high fever and dry cough")], output)
+    assert "Candidate duration" in output.getvalue()
+
+
+def test_heap_is_unfrozen_when_a_run_fails():
+    class BrokenOutput(io.StringIO):
+        def write(self, text):
+            raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        BulkTriage(workers=1, progress=None).run([json.dumps("headache")], BrokenOutput())
+    assert gc.get_freeze_count() == 0
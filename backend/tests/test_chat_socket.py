@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_connections_are_stateless_unless_a_session_is_asked_for():
+    client = TestClient(main.app)
+    with client.websocket_connect("/ws/chat") as ws:
+        assert ws.receive_json()["session_id"] is None
+        ws.send_json({"id": 1, "message": "headache"})
+        ws.send_json({"id": 2, "message": "itchy skin rash"})
+        first, second = ws.receive_json(), ws.receive_json()
+    # Each message is triaged on its own, exactly like POST /chat without a session_id
+    assert first["response"] == client.post("/chat", json={"message": "headache"}).json()["response"]
+    assert second["response"] == client.post("/chat", json={"message": "itchy skin rash"}).json()["response"]
+
+    with client.websocket_connect("/ws/chat?session=1") as ws:
+        session_id = ws.receive_json()["session_id"]
+    assert session_id
+    with client.websocket_connect(f"/ws/chat?session_id={session_id}") as ws:
+        assert ws.receive_json()["session_id"] == session_id
@@ -0,0 +1,37 @@
+import shutil
+
+import conditions_catalog
+from conditions_catalog import CatalogCache
+from kb_reloader import KnowledgeBaseReloader
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH
+
+
+def test_reload_builds_the_catalog_before_the_swap(tmp_path, monkeypatch):
+    cache = CatalogCache()
+    monkeypatch.setattr("kb_reloader.catalog_cache", cache)
+    path = tmp_path / "knowledge_base.json"
+    shutil.copy(DEFAULT_KNOWLEDGE_BASE_PATH, path)
+
+    swapped = []
+    reloader = KnowledgeBaseReloader(path=str(path), poll_interval=0, on_swap=swapped.append)
+    assert reloader.reload()
+    assert cache.builds == 1
+
+    # The first request after the swap is served the prepared catalog; nothing is built on the loop
+    def fail(knowledge_base):
+        raise AssertionError("catalog built on the request path")
+    monkeypatch.setattr(conditions_catalog, "ConditionsCatalog", fail)
+    catalog = cache.get(swapped[0])
+    assert catalog.knowledge_base is swapped[0]
+    assert cache.get(swapped[0]) is catalog
+    assert cache.builds == 1
+
+
+def test_old_knowledge_base_keeps_its_catalog_until_the_swap(knowledge_base, exact_knowledge_base):
+    cache = CatalogCache()
+    live = cache.get(knowledge_base)
+    cache.prepare(exact_knowledge_base)
+    # Requests still on the old instance are not rebuilt by the pending one
+    assert cache.get(knowledge_base) is live
+    assert cache.get(exact_knowledge_base).knowledge_base is exact_knowledge_base
+    assert cache.builds == 2
@@ -0,0 +1,74 @@
+import time
+
+from triage_deadline import TriageBudget
+
+
+def expired():
+    """An arrival time whose budget ran out long ago (e.g. spent queued for admission)"""
+    return time.perf_counter() - 60
+
+
+def test_emergencies_are_answered_after_the_budget_is_spent(ai):
+    ai.budget = TriageBudget(seconds=0.001)
+    trace = {}
+    reply = ai.process_query("crushing chest pain", trace=trace, format="json", started=expired())
+    assert reply["type"] == "emergency"
+    assert "degraded" not in trace
+
+
+def test_budget_counts_from_arrival(ai):
+    trace = {}
+    reply = ai.process_query("itchy skin rash", trace=trace, format="json", started=expired())
+    assert reply["type"] == "degraded"
+    assert trace["degraded"] == "identify"
+    # The same message arriving now gets the full analysis
+    assert ai.process_query("itchy skin rash", format="json")["type"] != "degraded"
+
+
+def test_degraded_results_are_not_cached(ai):
+    ai.process_query("itchy skin rash", started=expired())
+    assert len(ai.response_cache) == 0
+    trace = {}
+    ai.process_query("itchy skin rash", trace=trace)
+    assert trace["cache"] == "miss"
+    assert "degraded" not in trace
+
+
+def test_skipped_session_turn_leaves_the_session_untouched(ai):
+    ai.process_query("high fever", session_id="deadline")
+    session = ai.sessions.get("deadline")
+    phrases, scores = set(session.symptoms.phrases), dict(session.symptoms.scores)
+
+    reply = ai.process_query("and a dry cough", session_id="deadline", format="json", started=expired())
+    assert reply["type"] == "degraded"
+    assert set(session.symptoms.phrases) == phrases
+    assert dict(session.symptoms.scores) == scores
+
+
+def test_markdown_degraded_reply(ai):
+    reply = ai.process_query("itchy skin rash", started=expired())
+    assert reply == ai.knowledge_base.degraded_response
+
+
+def test_slow_stages_are_skipped_from_their_moving_average(ai):
+    ai.budget = TriageBudget(seconds=0.5)
+    ai.budget.observe("identify", 100.0)
+    trace = {}
+    assert ai.process_query("itchy skin rash", trace=trace, format="json")["type"] == "degraded"
+    assert trace["degraded"] == "identify"
+
+    ai.budget = TriageBudget(seconds=0.5)
+    ai.budget.observe("render", 100.0)
+    trace = {}
+    # JSON replies are not rendered, so only the markdown reply is cut short
+    assert ai.process_query("itchy skin rash", format="json")["type"] != "degraded"
+    assert ai.process_query("pimples and blackheads", trace=trace) == ai.knowledge_base.degraded_response
+    assert trace["degraded"] == "render"
+
+
+def test_skipped_stage_estimate_decays():
+    budget = TriageBudget(seconds=0.5, smoothing=0.5)
+    budget.observe("identify", 2.0)
+    before = budget.expected("identify")
+    budget.skipped("identify")
+    assert budget.expected("identify") == before / 2
@@ -0,0 +1,50 @@
+import pytest
+
+from fuzzy_matcher import FuzzyMatcher
+
+
+@pytest.mark.parametrize("message, phrase", [
+    ("hedache since morning", "headache"),
+    ("sore throt", "sore throat"),
+    ("diarhea for two days", "diarrhea"),
+    ("runny noze and sneezng", "runny nose"),
+    ("nausia and vomitting", "vomiting"),
+    ("chest pian", "chest pain"),
+])
+def test_typos_are_still_found(knowledge_base, message, phrase):
+    assert phrase in knowledge_base.scan(message)
+
+
+@pytest.mark.parametrize("word", [
+    "some", "sure", "sort", "store", "mind", "hear", "heard", "hearing", "life", "line", "live",
+    "confuse", "paid", "show", "step", "site",
+    # Inflections of everyday words
+    "selling", "smelling", "spelling", "paused", "confuses", "stopped",
+])
+def test_everyday_words_are_not_corrected(knowledge_base, word):
+    assert knowledge_base.fuzzy_matcher.correct_word(word) is None
+
+
+def test_inflections_of_protected_words():
+    matcher = FuzzyMatcher(["sore", "swelling", "passed out"], protected_words=["sure", "sell", "pause"])
+    assert matcher.correct_word("sured") is None
+    assert matcher.correct_word("selling") is None
+    assert matcher.correct_word("paused") is None
+    # Not an inflection of a protected word: still a typo
+    assert matcher.correct_word("sweling") == "swelling"
+
+
+@pytest.mark.parametrize("message", [
+    "i don't want to confuse you but my back hurts",
+    "we covered the poisson distribution today",
+    "i wonder if that shop has some milk",
+])
+def test_corrected_real_words_raise_no_emergency(knowledge_base, message):
+    assert knowledge_base.check_emergency(message) == []
+
+
+def test_misspelled_emergencies_are_found(knowledge_base):
+    # One-word emergencies come from the English misspellings table, not from correction
+    assert knowledge_base.check_emergency("he is unconcious") == ["unconscious"]
+    assert knowledge_base.check_emergency("i feel confussed") == ["confused"]
+    assert "chest pain" in knowledge_base.check_emergency("crushing chest pian")
@@ -0,0 +1,79 @@
+import json
+import time
+
+import pytest
+
+from conditions_catalog import CatalogCache
+from kb_reloader import KnowledgeBaseReloader
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    cache = CatalogCache()
+    monkeypatch.setattr("kb_reloader.catalog_cache", cache)
+    return cache
+
+
+def write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def edited(knowledge_data, version):
+    data = json.loads(json.dumps(knowledge_data))
+    data["version"] = version
+    for condition in data["conditions"].values():
+        condition["duration"] = f"{version} duration"
+    return data
+
+
+def test_swap_clears_the_response_cache_and_changes_the_catalog_etag(ai, catalog, knowledge_data, tmp_path):
+    path = tmp_path / "knowledge_base.json"
+    old_etag = catalog.get(ai.knowledge_base).index.etag
+    ai.process_query("itchy skin rash")
+    assert len(ai.response_cache) == 1
+
+    write(path, edited(knowledge_data, "next"))
+    reloader = KnowledgeBaseReloader(path=str(path), poll_interval=0, on_swap=ai.set_knowledge_base)
+    assert reloader.reload()
+    assert ai.knowledge_base.version == "next"
+    assert len(ai.response_cache) == 0
+    assert catalog.get(ai.knowledge_base).index.etag != old_etag
+    assert "next duration" in ai.process_query("itchy skin rash")
+
+
+@pytest.mark.parametrize("contents", [
+    # Valid JSON, invalid knowledge base
+    lambda data: json.dumps({**data, "emergency_keywords": "chest pain"}),
+    # Half-written file (an editor or deploy caught mid-write)
+    lambda data: json.dumps(data)[:len(json.dumps(data)) // 2],
+    "",
+])
+def test_invalid_file_keeps_the_current_version_serving(ai, catalog, knowledge_data, tmp_path, contents):
+    path = tmp_path / "knowledge_base.json"
+    text = contents(edited(knowledge_data, "broken")) if callable(contents) else contents
+    path.write_text(text, encoding="utf-8")
+    live = ai.knowledge_base
+    ai.process_query("itchy skin rash")
+
+    reloader = KnowledgeBaseReloader(path=str(path), poll_interval=0, on_swap=ai.set_knowledge_base)
+    assert not reloader.reload()
+    assert ai.knowledge_base is live
+    assert len(ai.response_cache) == 1
+    assert reloader.failures == 1
+    assert reloader.last_error
+    assert catalog.builds == 0
+
+
+def test_watcher_swaps_in_an_edited_file(ai, catalog, knowledge_data, tmp_path):
+    path = tmp_path / "knowledge_base.json"
+    write(path, edited(knowledge_data, "first"))
+    reloader = KnowledgeBaseReloader(path=str(path), poll_interval=0.02, on_swap=ai.set_knowledge_base)
+    reloader.start()
+    try:
+        write(path, edited(knowledge_data, "second edit"))
+        deadline = time.monotonic() + 5
+        while reloader.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        reloader.stop()
+    assert ai.knowledge_base.version == "second edit"
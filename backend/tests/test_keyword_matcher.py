@@ -0,0 +1,56 @@
+import json
+import os
+import random
+
+from conftest import DATA_DIR
+from keyword_matcher import KeywordMatcher
+
+
+def substring_hits(phrases, text):
+    """What the original per-phrase `phrase in text` checks found"""
+    return {phrase for phrase in phrases if phrase in text}
+
+
+def test_scan_matches_substring_search_on_messages(exact_knowledge_base):
+    phrases = exact_knowledge_base.matcher.phrases
+    matcher = KeywordMatcher(phrases)
+    with open(os.path.join(DATA_DIR, "baseline_responses.json"), encoding="utf-8") as f:
+        messages = [message.lower().strip() for message, _ in json.load(f)]
+
+    for message in messages:
+        assert matcher.scan(message) == substring_hits(phrases, message), message
+
+
+def test_scan_matches_substring_search_on_overlapping_phrases(exact_knowledge_base):
+    # Phrases glued together and cut mid-word: overlaps, shared prefixes and suffixes
+    phrases = exact_knowledge_base.matcher.phrases
+    matcher = KeywordMatcher(phrases)
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choice(phrases) for _ in range(rng.randint(1, 4)))
+        start = rng.randint(0, len(text) // 3)
+        text = text[start:len(text) - rng.randint(0, len(text) // 3)]
+        assert matcher.scan(text) == substring_hits(phrases, text), text
+
+
+def test_nested_and_repeated_phrases():
+    matcher = KeywordMatcher(["pain", "chest pain", "severe chest pain", "pain"])
+    assert matcher.phrases == ["pain", "chest pain", "severe chest pain"]
+    assert matcher.scan("severe chest pain") == {"pain", "chest pain", "severe chest pain"}
+    assert matcher.scan("chest painpain") == {"pain", "chest pain"}
+    assert matcher.scan("") == frozenset()
+
+
+def test_aliases_report_their_phrase():
+    matcher = KeywordMatcher(["fever", "cough"], {"kaichal": "fever", "fever": "cough"})
+    # An alias that is already a phrase keeps reporting itself
+    assert matcher.scan("kaichal") == {"fever"}
+    assert matcher.scan("fever") == {"fever"}
+
+
+def test_whole_word_aliases_need_word_boundaries():
+    matcher = KeywordMatcher(["fever"], {"una": "fever"}, whole_word={"una"})
+    assert matcher.scan("mata una") == {"fever"}
+    assert matcher.scan("una, and cough") == {"fever"}
+    assert matcher.scan("i was unable to sleep") == frozenset()
+    assert matcher.scan("tuna sandwich") == frozenset()
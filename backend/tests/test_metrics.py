@@ -0,0 +1,39 @@
+import threading
+
+from metrics import Counter, Histogram, MetricsRegistry
+
+
+def run_concurrently(threads, work):
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        work()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def test_sharded_counter_merges_to_the_exact_total():
+    counter = Counter("triage_test_total", "test")
+    run_concurrently(8, lambda: [counter.inc() for _ in range(20000)])
+    assert counter.value == 8 * 20000
+
+
+def test_sharded_histogram_merges_counts_and_sum():
+    histogram = Histogram("triage_test_seconds", "test", buckets=(0.001, 0.01))
+    run_concurrently(8, lambda: [histogram.observe(0.005) for _ in range(5000)])
+    samples = {(name, labels.get("le")): value for name, labels, value in histogram.samples()}
+    assert samples[("triage_test_seconds_bucket", "0.001")] == 0
+    assert samples[("triage_test_seconds_bucket", "0.01")] == 40000
+    assert samples[("triage_test_seconds_count", None)] == 40000
+    assert abs(samples[("triage_test_seconds_sum", None)] - 40000 * 0.005) < 1e-6
+
+
+def test_registry_renders_merged_values():
+    registry = MetricsRegistry()
+    counter = registry.counter("triage_requests_total", "Requests", {"type": "emergency"})
+    run_concurrently(4, lambda: [counter.inc() for _ in range(1000)])
+    assert 'triage_requests_total{type="emergency"} 4000' in registry.render()
@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+
+import main
+from profiling import RequestProfiler, server_timing
+
+
+def stage_names(header):
+    return [entry.split(";")[0].strip() for entry in header.split(",")]
+
+
+def test_server_timing_names_every_trace_stage():
+    trace = {"queue": 0.001, "scan": 0.0002, "emergency": 0.00001, "headache": 0.0003, "render": 0.0004,
+             "cache": "miss", "response_type": "conditions"}
+    header = server_timing(trace, 0.002)
+    assert stage_names(header) == ["queue", "scan", "emergency", "headache", "render", "total"]
+    assert 'scan;desc="keyword scan";dur=0.200' in header
+    # An analyzer added to the data file later still shows up (without a description)
+    assert "sinus;dur=0.500" in server_timing({"sinus": 0.0005}, 0.001)
+
+
+def test_debug_token_adds_server_timing_to_chat(monkeypatch):
+    monkeypatch.setattr(main, "request_profiler", RequestProfiler(token="secret"))
+    client = TestClient(main.app)
+
+    plain = client.post("/chat", json={"message": "itchy skin rash"})
+    assert "server-timing" not in plain.headers
+
+    response = client.post("/chat", json={"message": "itchy skin rash and dry skin"},
+                           headers={"X-Debug-Token": "secret"})
+    assert response.status_code == 200
+    names = stage_names(response.headers["server-timing"])
+    for stage in ("queue", "scan", "emergency", "identify", "render", "serialize", "total"):
+        assert stage in names
@@ -0,0 +1,45 @@
+import io
+import json
+
+from request_log import RequestLog
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_level_and_sampling_filter_routine_records():
+    log = RequestLog(stream=io.StringIO(), min_level="warning", sample_rates={"warning": 0.5}, rng=iter([0.9, 0.1]).__next__)
+    assert not log.info("chat")
+    assert not log.warning("chat_shed")  # sampled out (0.9 >= 0.5)
+    assert log.warning("chat_shed")
+    assert log.sampled_out == 1
+
+
+def test_kept_records_bypass_level_and_sampling():
+    log = RequestLog(stream=io.StringIO(), min_level="warning", sample_rates={"info": 0.0}, rng=lambda: 0.99)
+    assert log.info("chat", keep=True, response_type="emergency")
+    assert log.error("chat_error")
+    assert log.sampled_out == 0
+
+
+def test_writer_survives_a_record_it_cannot_serialize():
+    stream = io.StringIO()
+    log = RequestLog(stream=stream, flush_interval=0.01)
+    log.start()
+    try:
+        circular = {}
+        circular["self"] = circular
+        log.info("bad", details=circular)
+        log.info("good", request_id="after")
+    finally:
+        log.stop()
+    assert [record["event"] for record in lines(stream)] == ["good"]
+    assert log.serialize_errors == 1
+    assert log.written == 1
+
+    # The thread is still usable after the bad record
+    log.start()
+    log.info("later")
+    log.stop()
+    assert lines(stream)[-1]["event"] == "later"
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_after_miss():
+    cache = ResponseCache(max_size=4)
+    calls = []
+    assert cache.get_or_compute("a", lambda: calls.append(1) or "A") == "A"
+    assert cache.get_or_compute("a", lambda: calls.append(1) or "other") == "A"
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_size=2)
+    cache.get_or_compute("a", lambda: "A")
+    cache.get_or_compute("b", lambda: "B")
+    cache.get_or_compute("a", lambda: "A")  # a is now the most recent
+    cache.get_or_compute("c", lambda: "C")
+    assert cache.get_or_compute("a", lambda: "recomputed") == "A"
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+    assert cache.evictions >= 1
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = ResponseCache(max_size=4, ttl_seconds=10, clock=clock)
+    cache.get_or_compute("a", lambda: "old")
+    clock.now = 9.9
+    assert cache.get_or_compute("a", lambda: "new") == "old"
+    clock.now = 10.0
+    assert cache.get_or_compute("a", lambda: "new") == "new"
+    assert cache.expirations == 1
+
+
+def test_concurrent_identical_requests_compute_once():
+    cache = ResponseCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+    follower.start()
+    while cache.coalesced == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == ["value", "value"]
+    assert len(calls) == 1
+    assert cache.coalesced == 1
+
+
+def test_errors_reach_waiters_and_are_not_cached():
+    cache = ResponseCache()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("k", fail)
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+
+def test_clear_during_flight_discards_the_stale_result():
+    cache = ResponseCache()
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        return "built from the old knowledge base"
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+    thread.start()
+    assert started.wait(5)
+    cache.clear()
+    release.set()
+    thread.join(5)
+
+    # The caller still gets its answer, but it is not stored for later ones
+    assert results == ["built from the old knowledge base"]
+    assert len(cache) == 0
+    assert cache.get_or_compute("k", lambda: "fresh") == "fresh"
+    assert cache.stats()["generation"] == 1
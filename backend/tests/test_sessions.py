@@ -0,0 +1,38 @@
+def _top_condition(reply):
+    conditions = reply.get("conditions")
+    return conditions[0]["id"] if conditions else None
+
+
+def test_a_topic_change_is_not_routed_by_an_earlier_headache(ai):
+    turns = [
+        ("headache", "tension_headache"),
+        ("now i have an itchy skin rash", "eczema"),
+        ("pimples and blackheads", "acne"),
+        ("lower back pain backache", "back_pain"),
+    ]
+    for message, expected in turns:
+        in_session = ai.process_query(message, session_id="topic-change", format="json")
+        stateless = ai.process_query(message, format="json")
+        assert _top_condition(stateless) == expected
+        assert _top_condition(in_session) == expected, message
+
+
+def test_follow_ups_add_up_within_a_session(ai):
+    for message in ("i have a high fever", "and a dry cough"):
+        ai.process_query(message, session_id="flu", format="json")
+    reply = ai.process_query("and body aches", session_id="flu", format="json")
+    assert _top_condition(reply) == "influenza"
+    matched = set(reply["conditions"][0]["matched_symptoms"])
+    assert {"high fever", "dry cough", "body aches"} <= matched
+
+
+def test_a_new_headache_turn_uses_the_headache_analyzer(ai):
+    ai.process_query("itchy skin rash", session_id="later-headache")
+    reply = ai.process_query("headache", session_id="later-headache", format="json")
+    assert _top_condition(reply) == "tension_headache"
+
+
+def test_sessions_do_not_share_symptoms(ai):
+    ai.process_query("headache", session_id="a")
+    reply = ai.process_query("itchy skin rash", session_id="b", format="json")
+    assert [condition["id"] for condition in reply["conditions"]] == ["eczema"]
@@ -0,0 +1,14 @@
+import medical_knowledge
+from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, load_snapshot, write_snapshot
+
+
+def test_snapshot_is_reused_only_with_the_same_compiler_sources(tmp_path, monkeypatch):
+    snapshot_path = str(tmp_path / "knowledge_base.snapshot")
+    write_snapshot(DEFAULT_KNOWLEDGE_BASE_PATH, snapshot_path)
+    assert load_snapshot(DEFAULT_KNOWLEDGE_BASE_PATH, snapshot_path) is not None
+
+    # An edited matcher or rule compiler invalidates the snapshot without a SNAPSHOT_FORMAT bump
+    digest = medical_knowledge._compiler_digest()
+    monkeypatch.setattr(medical_knowledge, "_compiler_digest", lambda: "0" * len(digest))
+    assert load_snapshot(DEFAULT_KNOWLEDGE_BASE_PATH, snapshot_path) is None
+
@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.parametrize("message, phrase", [
+    ("මට උණ", "fever"),
+    ("මට උණක් තියෙනවා", "fever"),
+    ("சளி பிடிச்சிருக்கு", "common cold"),
+    ("una thiyenawa", "fever"),
+    ("හිසරදය", "headache"),
+])
+def test_synonyms_are_found(exact_knowledge_base, message, phrase):
+    assert phrase in exact_knowledge_base.scan(message)
+
+
+@pytest.mark.parametrize("message, phrase", [
+    # "උණුසුම් වතුර බිව්වා" (drank warm water) starts with උණ (fever)
+    ("උණුසුම් වතුර බිව්වා", "fever"),
+    ("i was unable to sleep", "fever"),
+])
+def test_short_aliases_only_match_whole_words(exact_knowledge_base, message, phrase):
+    assert phrase not in exact_knowledge_base.scan(message)
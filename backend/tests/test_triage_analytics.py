@@ -0,0 +1,61 @@
+import hashlib
+import random
+from collections import Counter
+
+from triage_analytics import HyperLogLog, SpaceSaving, WindowedCounter
+
+
+def test_window_drops_expired_buckets():
+    counter = WindowedCounter(bucket_seconds=60, buckets=5)
+    counter.add(["flu"], now=0)          # bucket 0
+    counter.add(["flu", "acne"], now=130)  # bucket 2
+    counter.add(["acne"], now=400)       # bucket 6: bucket 0 is now out of the 5-bucket window
+
+    assert counter.window(5, now=400) == Counter({"acne": 2, "flu": 1})
+    assert counter.window(1, now=400) == Counter({"acne": 1})
+    assert [bucket for bucket, _ in counter._buckets] == [2, 6]
+    # Nothing is added later, but time moves on: the window empties, the all-time total does not
+    assert counter.window(5, now=1000) == Counter()
+    assert counter.total == Counter({"flu": 2, "acne": 2})
+
+
+def test_space_saving_error_bound_on_a_skewed_stream():
+    rng = random.Random(0)
+    # Zipf-like: item i is drawn with weight 1 / (i + 1)
+    items = [f"phrase {i}" for i in range(2000)]
+    stream = rng.choices(items, weights=[1 / (i + 1) for i in range(len(items))], k=50000)
+    capacity = 100
+    sketch = SpaceSaving(capacity)
+    for item in stream:
+        sketch.add(item)
+    truth = Counter(stream)
+    bound = len(stream) / capacity
+
+    for item, count in sketch.counts.items():
+        error = sketch.errors[item]
+        assert error <= bound
+        assert truth[item] <= count <= truth[item] + error
+    # Anything more frequent than n / capacity is guaranteed a counter
+    for item, count in truth.items():
+        if count > bound:
+            assert item in sketch.counts
+    assert [entry["phrase"] for entry in sketch.top(3)] == [item for item, _ in truth.most_common(3)]
+
+
+def test_hyperloglog_estimate_within_its_stated_error():
+    sketch = HyperLogLog(precision=12)
+    distinct = 10000
+    for i in range(distinct):
+        value = f"message {i}".encode()
+        # Each distinct message added a few times: duplicates must not count
+        for _ in range(3):
+            sketch.add(int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big"))
+    # Three standard errors (1.04 / sqrt(2^12) = 1.6% each)
+    assert abs(sketch.count() - distinct) <= 3 * sketch.relative_error() * distinct
+
+
+def test_hyperloglog_small_counts_are_exact_enough():
+    sketch = HyperLogLog(precision=12)
+    for i in range(100):
+        sketch.add(int.from_bytes(hashlib.blake2b(str(i).encode(), digest_size=8).digest(), "big"))
+    assert abs(sketch.count() - 100) <= 2
@@ -0,0 +1,21 @@
+import asyncio
+import gc
+
+from advanced_medical_ai import medical_ai
+from triage_executor import TriageExecutor
+
+
+def test_process_workers_are_forked_in_start():
+    executor = TriageExecutor(mode="process", workers=2)
+    try:
+        executor.start()
+        # Forked before start() returns, not on the first request from the event loop
+        assert len(executor._processes._processes) == 2
+
+        async def scenario():
+            return await executor.process_query("headache", format="json")
+        result = asyncio.run(scenario())
+        assert result == medical_ai.process_query("headache", format="json")
+    finally:
+        executor.shutdown()
+        gc.unfreeze()
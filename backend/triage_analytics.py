@@ -0,0 +1,244 @@
+"""
+Streaming Triage Analytics
+Time-windowed counts per condition, emergency keyword and response type, approximate top-k
+symptom phrases (Space-Saving) and distinct-message cardinality (HyperLogLog), in memory that
+does not grow with traffic. Requests only append to a bounded queue; a background thread
+updates the sketches
+"""
+
+import heapq
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# Reported windows, in buckets of WindowedCounter.bucket_seconds
+WINDOWS = {"5m": 5, "1h": 60, "24h": 1440}
+
+
+class WindowedCounter:
+    """Per-key counts in fixed-width time buckets; the oldest bucket is dropped as a new one opens"""
+
+    def __init__(self, bucket_seconds=60, buckets=1440):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self._buckets = deque()  # (bucket number, Counter), oldest first, only buckets that saw traffic
+        self.total = Counter()
+
+    def add(self, keys, now):
+        bucket = int(now // self.bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != bucket:
+            self._buckets.append((bucket, Counter()))
+            while self._buckets[0][0] <= bucket - self.buckets:
+                self._buckets.popleft()
+        counts = self._buckets[-1][1]
+        for key in keys:
+            counts[key] += 1
+            self.total[key] += 1
+
+    def window(self, buckets, now):
+        """Counts over the last `buckets` buckets (the current, partly filled one included)"""
+        first = int(now // self.bucket_seconds) - buckets + 1
+        counts = Counter()
+        for bucket, bucket_counts in reversed(self._buckets):
+            if bucket < first:
+                break
+            counts.update(bucket_counts)
+        return counts
+
+    def report(self, now):
+        report = {name: dict(self.window(buckets, now).most_common()) for name, buckets in WINDOWS.items()}
+        report["total"] = dict(self.total.most_common())
+        return report
+
+
+class SpaceSaving:
+    """Approximate top-k heavy hitters (Metwally et al.) in a fixed number of counters
+
+    Any item seen more than n / capacity times is guaranteed a counter; a reported count
+    overestimates by at most its error.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.seen = 0
+        # (count, item) entries, some stale; the smallest current one is found without a full scan
+        self._heap = []
+
+    def add(self, item):
+        self.seen += 1
+        count = self.counts.get(item)
+        if count is not None:
+            count += 1
+        elif len(self.counts) < self.capacity:
+            count = 1
+            self.errors[item] = 0
+        else:
+            # The newcomer takes over the smallest counter and inherits its count as error
+            smallest = self._pop_smallest()
+            error = self.counts.pop(smallest)
+            del self.errors[smallest]
+            count = error + 1
+            self.errors[item] = error
+        self.counts[item] = count
+        heapq.heappush(self._heap, (count, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_smallest(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item
+
+    def top(self, k):
+        ranked = sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)[:k]
+        return [{"phrase": item, "count": count, "max_error": self.errors[item]} for item, count in ranked]
+
+
+class HyperLogLog:
+    """Distinct-count estimate from 2^precision one-byte registers (Flajolet et al.)"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self._alpha = 0.7213 / (1 + 1.079 / self.size)
+
+    def add(self, hash_value):
+        """Add an item by its 64-bit hash"""
+        hash_value &= 0xFFFFFFFFFFFFFFFF
+        register = hash_value >> (64 - self.precision)
+        remaining = hash_value & ((1 << (64 - self.precision)) - 1)
+        # Position of the first 1 bit in the remaining bits
+        rank = 64 - self.precision - remaining.bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def count(self):
+        estimate = self._alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # Small cardinalities: linear counting over the empty registers is more accurate
+        if estimate <= 2.5 * self.size and zeros:
+            return round(self.size * math.log(self.size / zeros))
+        return round(estimate)
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.size)
+
+
+class TriageAnalytics:
+    def __init__(self, top_k=20, phrase_counters=200, precision=12, max_queue=10000, flush_interval=0.1,
+                 clock=time.time):
+        self.top_k = top_k
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.started_at = clock()
+
+        self.response_types = WindowedCounter()
+        self.conditions = WindowedCounter()
+        self.emergency_keywords = WindowedCounter()
+        self.phrases = SpaceSaving(phrase_counters)
+        self.distinct_messages = HyperLogLog(precision)
+        self.recorded = 0
+        self.dropped = 0
+
+        # Appended to by request handlers without a lock (deque.append is atomic), drained by the thread
+        self._queue = deque()
+        self._lock = threading.Lock()  # sketches: background updates vs /stats reads
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_environment(cls):
+        """Configure from ANALYTICS_TOP_K, ANALYTICS_PHRASE_COUNTERS, ANALYTICS_HLL_PRECISION and ANALYTICS_QUEUE_SIZE"""
+        return cls(
+            top_k=int(os.environ.get("ANALYTICS_TOP_K", 20)),
+            phrase_counters=int(os.environ.get("ANALYTICS_PHRASE_COUNTERS", 200)),
+            precision=int(os.environ.get("ANALYTICS_HLL_PRECISION", 12)),
+            max_queue=int(os.environ.get("ANALYTICS_QUEUE_SIZE", 10000))
+        )
+
+    def record(self, message, trace):
+        """Queue one triaged message's outcome; never blocks, drops (and counts) when the queue is full"""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._queue.append((self.clock(), message, trace))
+        return True
+
+    def _update(self, now, message, trace):
+        self.response_types.add((trace.get("response_type", "unknown"),), now)
+        self.conditions.add(trace.get("conditions", ()), now)
+        self.emergency_keywords.add(trace.get("emergencies", ()), now)
+        for phrase in trace.get("phrases", ()):
+            self.phrases.add(phrase)
+        # Same normalization as the response cache key: case and surrounding space don't make a message new
+        self.distinct_messages.add(hash(message.lower().strip()))
+        self.recorded += 1
+
+    # ========== BACKGROUND UPDATER ==========
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._drain, name="triage-analytics", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _drain(self):
+        while True:
+            stopping = self._stop.is_set()
+            self.flush()
+            if stopping:
+                return
+            self._stop.wait(self.flush_interval)
+
+    def flush(self):
+        """Apply everything queued so far"""
+        while self._queue:
+            with self._lock:
+                for _ in range(min(len(self._queue), 512)):
+                    self._update(*self._queue.popleft())
+
+    def snapshot(self):
+        """The /stats body"""
+        now = self.clock()
+        with self._lock:
+            return {
+                "since": self.started_at,
+                "window_bucket_seconds": self.response_types.bucket_seconds,
+                "messages": self.recorded,
+                "response_types": self.response_types.report(now),
+                "conditions": self.conditions.report(now),
+                "emergency_keywords": self.emergency_keywords.report(now),
+                "top_phrases": self.phrases.top(self.top_k),
+                "distinct_messages": {
+                    "estimate": self.distinct_messages.count(),
+                    "relative_error": round(self.distinct_messages.relative_error(), 4)
+                },
+                "queue": self.stats()
+            }
+
+    def stats(self):
+        return {
+            "queued": len(self._queue),
+            "capacity": self.max_queue,
+            "recorded": self.recorded,
+            "dropped": self.dropped
+        }
+
+
+# Create global instance
+triage_analytics = TriageAnalytics.from_environment()
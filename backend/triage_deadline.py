@@ -0,0 +1,77 @@
+"""
+Triage Time Budget
+A per-request deadline, counted from when the request arrived (admission queueing included),
+that process_query checks between stages. Scanning and the emergency
+check always run to completion; identification and rendering are skipped when the time left
+is less than they have recently taken, and the request gets the precomputed degraded reply
+"""
+
+import os
+import time
+
+
+class DeadlineExceeded(Exception):
+    """A stage was skipped because it would not finish before the deadline"""
+
+    def __init__(self, stage):
+        super().__init__(f"triage deadline reached before {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """The time one request has left; created by TriageBudget.start()"""
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, budget, expires_at):
+        self.budget = budget
+        self.expires_at = expires_at
+
+    def remaining(self):
+        return self.expires_at - time.perf_counter()
+
+    def check(self, stage):
+        """Raise DeadlineExceeded unless stage is expected to finish in the time left"""
+        if time.perf_counter() + self.budget.expected(stage) > self.expires_at:
+            self.budget.skipped(stage)
+            raise DeadlineExceeded(stage)
+
+
+class TriageBudget:
+    # Stages a deadline may skip, in pipeline order
+    STAGES = ("identify", "render")
+
+    def __init__(self, seconds=0.5, smoothing=0.1):
+        self.seconds = seconds  # 0 disables deadlines
+        self.smoothing = smoothing
+        # Stage -> moving average of its recent durations (seconds)
+        self._costs = dict.fromkeys(self.STAGES, 0.0)
+
+    @classmethod
+    def from_environment(cls):
+        """Configure from TRIAGE_DEADLINE_MS"""
+        return cls(seconds=float(os.environ.get("TRIAGE_DEADLINE_MS", 500)) / 1000)
+
+    def start(self, started=None):
+        """A deadline for a request that arrived at started (time.perf_counter(), default now), or None when off"""
+        if self.seconds <= 0:
+            return None
+        return Deadline(self, (time.perf_counter() if started is None else started) + self.seconds)
+
+    def expected(self, stage):
+        return self._costs[stage]
+
+    def observe(self, stage, seconds):
+        """Fold one completed stage's duration into its expected cost"""
+        cost = self._costs[stage]
+        self._costs[stage] = cost + self.smoothing * (seconds - cost)
+
+    def skipped(self, stage):
+        # A skipped stage reports no duration; decay its estimate so one slow run cannot
+        # keep every later request degraded
+        self._costs[stage] *= 1 - self.smoothing
+
+    def stats(self):
+        return {
+            "deadline_ms": self.seconds * 1000,
+            "expected_ms": {stage: round(cost * 1000, 3) for stage, cost in self._costs.items()}
+        }
@@ -0,0 +1,171 @@
+"""
+Triage Execution Modes
+Keeps CPU-bound triage off the event loop: inline, thread pool or process pool
+"""
+
+import asyncio
+import gc
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from advanced_medical_ai import medical_ai
+
+
+# ========== PROCESS POOL WORKER FUNCTIONS ==========
+# Module-level so they can be pickled; each worker process owns its own medical_ai
+
+def _preload_worker():
+    """Build the knowledge base (automaton, index, templates) once per worker"""
+    from advanced_medical_ai import medical_ai as worker_ai
+    worker_ai.process_query("warm up")
+
+
+def _worker_ready():
+    """No-op submitted to every worker by start(), so they are forked before any other thread runs"""
+    return os.getpid()
+
+
+# Data-file signature a worker last loaded (or failed to load), so a bad file is tried once
+_worker_signature = None
+
+def _sync_knowledge_base(version):
+    """Load the data file in this worker if the server has swapped in another version
+
+    Workers run no reloader thread of their own; the server's reloader validates and swaps,
+    and each worker catches up on its next task.
+    """
+    global _worker_signature
+    from advanced_medical_ai import medical_ai as worker_ai
+    if worker_ai.knowledge_base.version == version:
+        return
+    from kb_reloader import install_knowledge_base
+    from medical_knowledge import DEFAULT_KNOWLEDGE_BASE_PATH, MedicalKnowledgeBase
+
+    try:
+        stat = os.stat(DEFAULT_KNOWLEDGE_BASE_PATH)
+    except OSError:
+        return
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if signature == _worker_signature:
+        return
+    _worker_signature = signature
+    try:
+        knowledge_base = MedicalKnowledgeBase.from_file(DEFAULT_KNOWLEDGE_BASE_PATH)
+        knowledge_base.warm_templates()
+    except Exception:
+        return  # The server already reported it; keep serving the current version
+    install_knowledge_base(knowledge_base)
+
+
+def _worker_process_query(message, format="markdown", version=None, started=None):
+    from advanced_medical_ai import medical_ai as worker_ai
+    _sync_knowledge_base(version)
+    trace = {}
+    # perf_counter is the system-wide monotonic clock, so the server's arrival time holds here
+    response = worker_ai.process_query(message, trace=trace, format=format, started=started)
+    return response, trace
+
+
+def _worker_process_batch(messages, format="markdown", version=None):
+    from advanced_medical_ai import medical_ai as worker_ai
+    _sync_knowledge_base(version)
+    return worker_ai.process_batch(messages, format)
+
+
+class TriageExecutor:
+    MODES = ("inline", "thread", "process")
+
+    def __init__(self, mode="thread", workers=None, priority_workers=2):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown execution mode {mode!r}, expected one of {', '.join(self.MODES)}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.priority_workers = priority_workers
+        self._threads = None
+        self._processes = None
+        self._priority_threads = None
+
+    @classmethod
+    def from_environment(cls):
+        """Configure from TRIAGE_EXECUTION_MODE, TRIAGE_WORKERS and TRIAGE_PRIORITY_WORKERS"""
+        workers = os.environ.get("TRIAGE_WORKERS")
+        return cls(
+            mode=os.environ.get("TRIAGE_EXECUTION_MODE", "thread").lower(),
+            workers=int(workers) if workers else None,
+            priority_workers=int(os.environ.get("TRIAGE_PRIORITY_WORKERS", 2))
+        )
+
+    def start(self):
+        """Create the pools; in process mode the workers are forked here, so call this before
+        starting any other thread (a child would inherit its locks in whatever state they were)"""
+        if self.mode == "inline":
+            return
+        if self.mode == "process":
+            # Forked workers share the loaded knowledge base's pages until something writes to them;
+            # moving it out of the collector's generations keeps the workers' collections from doing so
+            gc.collect()
+            gc.freeze()
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("fork"),
+                initializer=_preload_worker
+            )
+            # The pool forks lazily on first use; make it happen now, right after the freeze
+            ready = [self._processes.submit(_worker_ready) for _ in range(self.workers)]
+            for future in ready:
+                future.result()
+        # Session-bound queries always run in this process so their state stays in one place
+        self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="triage")
+        # Emergencies get their own threads so they never wait behind queued routine work
+        self._priority_threads = ThreadPoolExecutor(max_workers=self.priority_workers, thread_name_prefix="triage-priority")
+
+    def shutdown(self):
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._priority_threads is not None:
+            self._priority_threads.shutdown(wait=False, cancel_futures=True)
+            self._priority_threads = None
+
+    async def _run(self, pool, fn, *args):
+        if pool is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, fn, *args)
+
+    async def process_query(self, message, session_id=None, trace=None, priority=False, format="markdown",
+                            sampler=None, started=None):
+        """The reply for one message: markdown, or with format="json" the structured result dict
+
+        started is when the request arrived (time.perf_counter()); its time budget counts from there.
+        With a StackSampler the call is profiled; it then runs on a thread of this process.
+        """
+        args = (message, session_id, trace, format, started)
+        if sampler is not None:
+            pool = self._priority_threads if priority else self._threads
+            return await self._run(pool, sampler.run, medical_ai.process_query, *args)
+        if priority:
+            return await self._run(self._priority_threads, medical_ai.process_query, *args)
+        if self._processes is not None and session_id is None:
+            response, worker_trace = await self._run(
+                self._processes, _worker_process_query, message, format, medical_ai.knowledge_base.version, started
+            )
+            if trace is not None:
+                trace.update(worker_trace)
+            return response
+        return await self._run(self._threads, medical_ai.process_query, *args)
+
+    async def process_batch(self, messages, format="markdown"):
+        if self._processes is not None:
+            return await self._run(
+                self._processes, _worker_process_batch, messages, format, medical_ai.knowledge_base.version
+            )
+        return await self._run(self._threads, medical_ai.process_batch, messages, format)
+
+    def describe(self):
+        if self.mode == "inline":
+            return {"mode": self.mode, "workers": 1, "priority_workers": 0}
+        return {"mode": self.mode, "workers": self.workers, "priority_workers": self.priority_workers}
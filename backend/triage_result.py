@@ -0,0 +1,91 @@
+"""
+Structured Triage Result
+What the engine decided for one message (response type, conditions, scores, matched symptoms,
+advice sections), kept apart from the markdown page, which is rendered only when a client asks for it
+"""
+
+
+class TriageResult:
+    __slots__ = ("knowledge_base", "response_type", "symptoms_text", "conditions", "emergencies",
+                 "general_sections", "phrases", "markdown")
+
+    def __init__(self, knowledge_base, response_type, symptoms_text, conditions=(), emergencies=(),
+                 general_sections=(), phrases=()):
+        self.knowledge_base = knowledge_base
+        self.response_type = response_type  # emergency, single, differential, general or degraded
+        self.symptoms_text = symptoms_text
+        self.conditions = list(conditions)
+        self.emergencies = list(emergencies)
+        self.general_sections = list(general_sections)
+        # Knowledge-base phrases found in this message (for analytics), sorted once here
+        self.phrases = tuple(sorted(phrases))
+        # Filled in on first markdown render; a cached result is rendered at most once
+        self.markdown = None
+
+    @classmethod
+    def from_matches(cls, knowledge_base, symptoms_text, conditions, hits, phrases=None):
+        """Result for a non-emergency message from its matched conditions
+
+        phrases defaults to hits; a session passes its accumulated hits and the message's own phrases.
+        """
+        phrases = hits if phrases is None else phrases
+        if not conditions:
+            return cls(knowledge_base, "general", symptoms_text,
+                       general_sections=knowledge_base.general_advice_sections(hits), phrases=phrases)
+        response_type = "differential" if len(conditions) > 1 else "single"
+        return cls(knowledge_base, response_type, symptoms_text, conditions, phrases=phrases)
+
+    @classmethod
+    def emergency(cls, knowledge_base, symptoms_text, emergencies, phrases=()):
+        return cls(knowledge_base, "emergency", symptoms_text, emergencies=emergencies, phrases=phrases)
+
+    @classmethod
+    def degraded(cls, knowledge_base, symptoms_text):
+        """Stand-in when the time budget ran out before a full result: the precomputed degraded reply"""
+        result = cls(knowledge_base, "degraded", symptoms_text)
+        result.markdown = knowledge_base.degraded_response
+        return result
+
+    def outcome(self):
+        """The fields a request trace records"""
+        if self.response_type == "emergency":
+            return {"response_type": "emergency", "emergencies": self.emergencies, "phrases": self.phrases}
+        return {
+            "response_type": self.response_type,
+            "conditions": [condition["condition_id"] for condition in self.conditions],
+            "phrases": self.phrases
+        }
+
+    def to_dict(self):
+        """JSON form for API clients: the decision and its data, no markdown"""
+        kb = self.knowledge_base
+        result = {
+            "type": self.response_type,
+            "knowledge_base_version": kb.version
+        }
+        if self.response_type == "emergency":
+            result["emergencies"] = self.emergencies
+            result["advice"] = kb.emergency_advice
+            return result
+
+        if self.response_type == "general":
+            result["general_advice"] = self.general_sections
+            return result
+
+        if self.response_type == "degraded":
+            result["message"] = self.markdown
+            return result
+
+        result["conditions"] = [
+            {
+                "id": condition["condition_id"],
+                "name": condition["name"],
+                "score": condition["match_score"],
+                "matched_symptoms": condition["matched_symptoms"],
+                "severity": condition["severity"]
+            }
+            for condition in self.conditions
+        ]
+        # Advice for the most likely condition; the rest are one GET /conditions/{id} away
+        result["advice"] = kb.advice_sections(self.conditions[0]["condition_id"])
+        return result